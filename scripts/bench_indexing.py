@@ -0,0 +1,91 @@
+"""Benchmarks indexing throughput against the local stub embeddings server.
+
+Builds a throwaway synthetic corpus, then runs a full rebuild once per concurrency level
+and prints wall time and chunks/second, so the effect of keeping several embedding
+requests in flight can be measured without an OpenAI key.
+
+    python scripts/bench_indexing.py --files 60 --concurrency 1,4,8 --latency 0.3
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from langchain_openai import OpenAIEmbeddings
+
+from index import run_indexing
+from stub_embedding_server import make_server
+from utils.config import settings
+
+_WORDS = (
+    "revenue risk supply chain demand margin customers regulation competition growth "
+    "cash flow debt semiconductor cloud services inventory litigation currency segment"
+).split()
+
+
+def write_synthetic_corpus(raw_dir: Path, n_files: int, words_per_file: int = 6000) -> None:
+    """Writes `n_files` raw section files plus metadata in the data/raw layout."""
+    rng = random.Random(0)
+    sections = ["business", "risks", "mnda"]
+    for i in range(n_files):
+        ticker = f"T{i // len(sections):03d}"
+        section = sections[i % len(sections)]
+        text = " ".join(rng.choice(_WORDS) for _ in range(words_per_file))
+        (raw_dir / f"{ticker}_{section}.txt").write_text(text, encoding="utf-8")
+        (raw_dir / f"{ticker}_metadata.json").write_text(
+            json.dumps({"ticker": ticker, "accession_number": f"0000-{i:06d}"}), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=60)
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--batch-tokens", type=int, default=settings.EMBEDDING_BATCH_TOKENS)
+    args = parser.parse_args()
+
+    server = make_server(port=0, latency=args.latency, max_concurrent=args.max_concurrent)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.RAW_DATA_DIR = Path(tmp) / "raw"
+        settings.INDEX_DIR = Path(tmp) / "index"
+        settings.RAW_DATA_DIR.mkdir()
+        write_synthetic_corpus(settings.RAW_DATA_DIR, args.files)
+
+        embeddings = OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            api_key="stub",
+            base_url=base_url,
+            check_embedding_ctx_length=False,
+            max_retries=0,  # let the indexer's own 429 backoff do the work
+        )
+
+        results = []
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            start = time.perf_counter()
+            stats = run_indexing(
+                full_rebuild=True,
+                embeddings=embeddings,
+                concurrency=concurrency,
+                batch_tokens=args.batch_tokens,
+            )
+            elapsed = time.perf_counter() - start
+            results.append((concurrency, elapsed, stats["chunks_written"], stats["rate_limited"]))
+
+    server.shutdown()
+
+    baseline = results[0][1]
+    print(f"\n{'concurrency':>11} {'seconds':>9} {'chunks/s':>9} {'speedup':>8} {'429s':>5}")
+    for concurrency, elapsed, chunks, rate_limited in results:
+        print(
+            f"{concurrency:>11} {elapsed:>9.2f} {chunks / elapsed:>9.1f} "
+            f"{baseline / elapsed:>7.2f}x {rate_limited:>5}"
+        )
@@ -0,0 +1,108 @@
+"""Checks EDGAR ingestion throughput, rate limiting and retries against a local stub.
+
+Runs `ingest_sec.run_ingestion` with `fakes.FakeEdgarCompany` in place of edgartools,
+so every filing costs the same HTTP requests as against EDGAR (company, filing list,
+filing index, document) but they go to stub_edgar_server.py. The stub answers 429 above
+`--max-rate` requests per second, like EDGAR, and fails the first request of some
+tickers with a 503. The check fails unless no request was throttled, the sustained
+request rate stayed under `--rate`, and every failed ticker was retried after a backoff.
+
+    python scripts/bench_ingestion.py --tickers 40 --workers 8 --rate 8
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import ingest_sec
+from fakes import FakeEdgarCompany
+from stub_edgar_server import make_server
+
+
+def peak_per_second(times: list[float]) -> int:
+    """Most requests that arrived within any one-second window."""
+    peak, start = 0, 0
+    for end, now in enumerate(times):
+        while times[start] <= now - 1.0:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def retry_delays(requests: list[tuple[float, str, str, int]]) -> list[float]:
+    """Seconds between each failed request and the next request of the same ticker."""
+    delays = []
+    for i, (failed_at, ticker, _, status) in enumerate(requests):
+        if status != 200:
+            retried_at = next((t for t, other, _, _ in requests[i + 1 :] if other == ticker), None)
+            if retried_at is not None:
+                delays.append(retried_at - failed_at)
+    return delays
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=8.0, help="Client requests per second.")
+    parser.add_argument("--max-rate", type=int, default=10, help="Stub (EDGAR) allowance.")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--fail-every", type=int, default=7)
+    args = parser.parse_args()
+
+    server = make_server(
+        port=0, latency=args.latency, max_rate=args.max_rate, fail_every=args.fail_every
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeEdgarCompany.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    ingest_sec.Company = FakeEdgarCompany
+
+    companies = [
+        {"ticker": f"T{i:03d}", "company_name": f"Company {i}", "gics_sector": "Industrials"}
+        for i in range(args.tickers)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        summary = ingest_sec.run_ingestion(
+            companies,
+            max_workers=args.workers,
+            requests_per_second=args.rate,
+            summary_path=Path(tmp) / "ingest_summary.json",
+            history_years=0,
+            folder=Path(tmp) / "raw",
+        )
+        elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    requests = sorted(server.requests)
+    times = [t for t, *_ in requests]
+    statuses = [status for *_, status in requests]
+    # The bucket starts full, so the first `rate` requests may go out at once
+    sustained = (len(times) - args.rate) / (times[-1] - times[0]) if len(times) > 1 else 0.0
+    delays = retry_delays(requests)
+    throttled, failed = statuses.count(429), statuses.count(503)
+
+    print(f"\n{len(companies)} tickers, {len(requests)} requests in {elapsed:.2f}s")
+    print(f"  downloaded {summary['downloaded']}, failed {len(summary['failed'])}")
+    print(f"  sustained {sustained:.2f} req/s (limit {args.rate}), peak {peak_per_second(times)}/s")
+    print(f"  429s {throttled}, injected 503s {failed}, retries {summary['retries']}")
+    if delays:
+        print(f"  backoff before a retry: min {min(delays):.2f}s, max {max(delays):.2f}s")
+
+    problems = []
+    if throttled:
+        problems.append(f"{throttled} requests exceeded the stub's {args.max_rate} req/s")
+    if sustained > args.rate * 1.05:
+        problems.append(f"sustained rate {sustained:.2f} req/s is above {args.rate}")
+    if summary["retries"] < failed or summary["failed"]:
+        problems.append("not every failed ticker was retried to success")
+    if delays and min(delays) < 1.0:
+        problems.append("a retry did not back off for at least a second")
+    for problem in problems:
+        print(f"  ❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("  ✅ rate limit, retries and backoff behave as configured")
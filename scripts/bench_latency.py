@@ -0,0 +1,54 @@
+"""Compares end-to-end graph latency in sequential and speculative mode.
+
+Each question is run through both compiled graphs, alternating which mode goes first so
+API jitter and warm caches (e.g. the query-embedding LRU) favour neither, and the
+per-mode mean / p50 / p95 wall times are printed.
+
+    python scripts/bench_latency.py --repeats 3
+"""
+
+import argparse
+import statistics
+import time
+
+from graph.blueprint import build_graph
+
+DEFAULT_QUESTIONS = [
+    "What are Apple's main risk factors?",
+    "How does NVIDIA generate revenue?",
+    "What does Microsoft say about AI in its MD&A?",
+    "What are the main risks?",  # CLARIFY: speculation is thrown away
+    "What is the weather today?",  # REJECT
+]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("questions", nargs="*", default=DEFAULT_QUESTIONS)
+    args = parser.parse_args()
+
+    graphs = {"sequential": build_graph(speculative=False), "speculative": build_graph(True)}
+    timings: dict[str, list[float]] = {mode: [] for mode in graphs}
+
+    for repeat in range(args.repeats):
+        for i, question in enumerate(args.questions):
+            order = list(graphs.items())
+            if (repeat + i) % 2:
+                order.reverse()
+            for mode, graph in order:
+                start = time.perf_counter()
+                graph.invoke({"question": question})
+                timings[mode].append(time.perf_counter() - start)
+
+    print(f"\n{'mode':<12} {'runs':>5} {'mean':>7} {'p50':>7} {'p95':>7}")
+    for mode, values in timings.items():
+        print(
+            f"{mode:<12} {len(values):>5} {statistics.mean(values):>7.2f} "
+            f"{_percentile(values, 50):>7.2f} {_percentile(values, 95):>7.2f}"
+        )
@@ -0,0 +1,150 @@
+"""Compares recall, latency and memory of the vector store backends on the real index.
+
+Queries are random chunk vectors from the quantized store, perturbed so the source
+chunk is not a trivial match, filtered by that chunk's ticker (and, for every other
+query, its section) like the search node does. Ground truth is an exact float32 scan
+of the same rows. Each backend runs in a fresh subprocess, so its RSS is measured
+without the others' pages.
+
+    python scripts/index.py --shards --quantized   # export the alternative layouts once
+    python scripts/bench_vector_store.py --queries 200 --k 5
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.vector_store import QuantizedStore, default_quantized_dir, open_vector_store
+
+BACKENDS = ("chroma", "sharded", "quantized")
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), or the peak where /proc is unavailable."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def make_queries(n: int, k: int, noise: float, seed: int) -> list[dict]:
+    """Samples filtered queries and their exact top-k ids from the quantized store."""
+    store = QuantizedStore(default_quantized_dir())
+    if not store.load() or not len(store.ids):
+        sys.exit("No quantized store found. Run: python scripts/index.py --quantized")
+
+    rng = np.random.default_rng(seed)
+    partitions = {key: bounds for key, bounds in store.ranges.items() if "_" in key}
+    keys = sorted(partitions)
+    dims = store.float32.shape[1]
+    queries = []
+    for i in range(n):
+        key = keys[rng.integers(len(keys))]
+        start, end = partitions[key]
+        if end == start:
+            continue
+        ticker, section = key.split("_", 1)
+        if i % 2:
+            section = None
+            start, end = store.ranges[ticker]
+
+        perturbation = noise * rng.normal(size=dims) / dims**0.5
+        vector = store.float32[rng.integers(start, end)] + perturbation
+        vector = (vector / np.linalg.norm(vector)).astype(np.float32)
+        exact = store.float32[start:end] @ vector
+        truth = [str(store.ids[start + row]) for row in np.argsort(-exact)[:k]]
+        queries.append(
+            {"vector": vector.tolist(), "ticker": ticker, "section": section, "truth": truth}
+        )
+    return queries
+
+
+def run_worker(backend: str, queries_file: Path, k: int) -> dict:
+    """Runs every query against one backend; executed in its own process."""
+    queries = json.loads(queries_file.read_text())
+    baseline = rss_mb()
+
+    start = time.perf_counter()
+    store = open_vector_store(backend)
+    open_seconds = time.perf_counter() - start
+
+    latencies, recalls = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.search(query["vector"], query["ticker"], query["section"], k)
+        latencies.append(time.perf_counter() - start)
+        found = {chunk_id for chunk_id, _ in hits}
+        recalls.append(len(found & set(query["truth"])) / max(len(query["truth"]), 1))
+
+    return {
+        "backend": backend,
+        "queries": len(queries),
+        "recall": statistics.mean(recalls),
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "open_s": open_seconds,
+        "rss_mb": rss_mb() - baseline,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.5, help="Query perturbation (L2).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON here.")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.queries_file, args.k)))
+        sys.exit(0)
+
+    queries = make_queries(args.queries, args.k, args.noise, args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        queries_file = Path(tmp) / "queries.json"
+        queries_file.write_text(json.dumps(queries))
+        for backend in args.backends:
+            completed = subprocess.run(
+                [sys.executable, __file__, "--worker", backend]
+                + ["--queries-file", str(queries_file), "--k", str(args.k)],
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode:
+                print(f"{backend}: failed\n{completed.stderr[-2000:]}", file=sys.stderr)
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    recall_label = f"recall@{args.k}"
+    print(
+        f"\n{'backend':<10} {recall_label:>9} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'open s':>7} {'RSS MB':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['backend']:<10} {r['recall']:>9.3f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+            f"{r['open_s']:>7.2f} {r['rss_mb']:>8.1f}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
@@ -0,0 +1,293 @@
+"""Offline end-to-end benchmark: index build time and per-node graph latency per corpus size.
+
+For each corpus size a synthetic data/raw tree is written to a temporary directory and
+indexed, then the compiled graph from graph/blueprint.py answers a fixed mix of
+single-company, comparison and sector questions. The OpenAI clients are replaced by
+the deterministic fakes in fakes.py, with a configurable latency, so no API key is
+needed and runs are comparable. Each size runs in a fresh subprocess, so module-level
+state (catalog, vector store, BM25 cache) and peak RSS belong to that corpus only.
+
+Results (per-node p50/p95 from the services/tracing.py spans, end-to-end latency,
+throughput, LLM tokens, peak RSS, index build time) are written as JSON; pass an
+earlier file to --compare to print the p50 deltas.
+
+    python scripts/benchmark.py --sizes 10,50,200 --questions 50 --concurrency 4
+    python scripts/benchmark.py --compare data/benchmarks/20260101-120000.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from fakes import FakeChatModel, FakeEmbeddings
+
+_WORDS = (
+    "revenue risk supply chain demand margin customers regulation competition growth "
+    "cash flow debt semiconductor cloud services inventory litigation currency segment "
+    "pricing capacity backlog subscription interest rates tariffs cybersecurity pension"
+).split()
+_NAME_PARTS = (
+    "Northwind Contoso Fabrikam Tailspin Wingtip Adventure Litware Proseware Lucerne "
+    "Margie Fourth Coffee Alpine Blue Yonder Trey Woodgrove Humongous Graphic Relecloud"
+).split()
+_NAME_SUFFIXES = ("Systems", "Holdings", "Industries", "Group", "Technologies", "Partners")
+_SECTIONS = ("business", "risks", "mnda")
+_SOURCE_ID_PATTERN = re.compile(r"^\[(S\d+)\] ", re.MULTILINE)  # the reply context's SOURCES
+
+
+def company(i: int) -> dict:
+    """Deterministic ticker, name and sector of the i-th synthetic company."""
+    from services.sectors import GICS_SECTORS
+
+    ticker = f"Z{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}"
+    part = _NAME_PARTS[i % len(_NAME_PARTS)]
+    suffix = _NAME_SUFFIXES[i // len(_NAME_PARTS) % len(_NAME_SUFFIXES)]
+    return {
+        "ticker": ticker,
+        "company_name": f"{part} {suffix} {i}",
+        "gics_sector": GICS_SECTORS[i % len(GICS_SECTORS)],
+    }
+
+
+def write_corpus(raw_dir: Path, n_companies: int, words_per_section: int) -> None:
+    """Writes three sections and a metadata file per company in the data/raw layout."""
+    rng = random.Random(0)
+    for i in range(n_companies):
+        meta = company(i)
+        ticker = meta["ticker"]
+        for section in _SECTIONS:
+            text = " ".join(rng.choice(_WORDS) for _ in range(words_per_section))
+            (raw_dir / f"{ticker}_{section}.txt").write_text(text, encoding="utf-8")
+        meta |= {
+            "accession_number": f"0000000000-26-{i:06d}",
+            "filing_url": f"https://www.sec.gov/Archives/edgar/data/{i}/{ticker}-10k.htm",
+            "period_of_report": "2025-12-31",
+        }
+        (raw_dir / f"{ticker}_metadata.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+def make_questions(n_companies: int, n: int) -> list[str]:
+    """Mix of single-company (by name and ticker), comparison and sector questions."""
+    from services.resolver import SECTOR_KEYWORDS
+
+    rng = random.Random(1)
+    topics = ["main risk factors", "revenue growth", "supply chain", "debt and cash flow"]
+    questions = []
+    for i in range(n):
+        a, b = company(rng.randrange(n_companies)), company(rng.randrange(n_companies))
+        topic = rng.choice(topics)
+        kind = i % 5
+        if kind == 3:
+            questions.append(f"Compare {a['ticker']} and {b['ticker']} on {topic}.")
+        elif kind == 4:
+            keyword = SECTOR_KEYWORDS[a["gics_sector"]][0]
+            questions.append(f"How do {keyword} discuss {topic}?")
+        elif kind == 2:
+            questions.append(f"What does {a['ticker']} say about {topic}?")
+        else:
+            questions.append(f"What are {a['company_name']}'s {topic}?")
+    return questions
+
+
+def respond(prompt: str, schema: type[BaseModel] | None) -> Any:
+    """Canned answers for every prompt the graph sends."""
+    if schema is None:
+        source_id = next(iter(_SOURCE_ID_PATTERN.findall(prompt)), None)
+        citation = f" [{source_id}]" if source_id else ""
+        return "According to the filing, revenue grew while supply chain risk rose." + citation
+    fields = schema.model_fields
+    if "next_step" in fields:
+        return schema(next_step="SEARCH")
+    if "tickers" in fields:  # resolver was not confident: echo any ticker-shaped token
+        return schema(tickers=re.findall(r"\bZ[A-Z]{2}\b", prompt)[:2], section=None)
+    raise ValueError(f"No fake response for {schema.__name__}")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _summary(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": _percentile(values, 50) * 1000,
+        "p95_ms": _percentile(values, 95) * 1000,
+        "mean_ms": statistics.mean(values) * 1000,
+    }
+
+
+def run_worker(args: argparse.Namespace) -> dict:
+    """Builds the corpus and index for one size and drives the graph; own process."""
+    from utils.config import settings
+
+    from index import run_indexing
+    from services.embeddings import get_embeddings
+    from services.llm import set_llm_factory
+    from services.tracing import token_usage, trace
+
+    settings.RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    write_corpus(settings.RAW_DATA_DIR, args.worker, args.words)
+
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    start = time.perf_counter()
+    stats = run_indexing(full_rebuild=True, embeddings=embeddings)
+    index_seconds = time.perf_counter() - start
+
+    get_embeddings().underlying = embeddings
+    set_llm_factory(
+        lambda model: FakeChatModel(
+            model=model,
+            respond=respond,
+            latency=args.llm_latency,
+            token_latency=args.token_latency,
+            callbacks=[token_usage],
+        )
+    )
+    from graph.blueprint import build_graph
+
+    graph = build_graph(speculative=args.speculative)
+    questions = make_questions(args.worker, args.questions)
+    for question in questions[: args.warmup]:
+        graph.invoke({"question": question})
+
+    latencies: list[float] = []
+    node_seconds: dict[str, list[float]] = defaultdict(list)
+    tokens: list[float] = []
+
+    def ask(question: str) -> None:
+        # The spans of services/tracing.py give the per-node times and token counts
+        with trace() as request_trace:
+            start = time.perf_counter()
+            graph.invoke({"question": question})
+            latencies.append(time.perf_counter() - start)
+        for span in request_trace.spans:
+            node_seconds[span.node].append(span.seconds)
+        totals = request_trace.totals()
+        tokens.append(totals.get("prompt_tokens", 0) + totals.get("completion_tokens", 0))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(ask, questions))
+    wall = time.perf_counter() - start
+
+    return {
+        "companies": args.worker,
+        "files": stats["files_read"],
+        "chunks": stats["chunks_written"],
+        "index_build_s": index_seconds,
+        "index_chunks_per_s": stats["chunks_written"] / index_seconds,
+        "questions": len(questions),
+        "concurrency": args.concurrency,
+        "throughput_qps": len(questions) / wall,
+        "end_to_end": _summary(latencies),
+        "nodes": {node: _summary(values) for node, values in sorted(node_seconds.items())},
+        "llm_tokens_per_question": statistics.mean(tokens),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _git_commit() -> str | None:
+    completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True)
+    return completed.stdout.decode().strip() or None
+
+
+def print_results(results: list[dict], previous: list[dict] | None = None) -> None:
+    before = {r["companies"]: r for r in previous or []}
+    for r in results:
+        print(
+            f"\n{r['companies']} companies, {r['chunks']} chunks: index {r['index_build_s']:.2f}s"
+            f" ({r['index_chunks_per_s']:.0f} chunks/s), {r['throughput_qps']:.2f} q/s at"
+            f" concurrency {r['concurrency']}, peak RSS {r['peak_rss_mb']:.0f} MB"
+        )
+        print(f"{'node':<14} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'Δp50 ms':>9}")
+        old = before.get(r["companies"], {})
+        rows = list(r["nodes"].items()) + [("end_to_end", r["end_to_end"])]
+        for node, s in rows:
+            old_node = old.get("nodes", {}).get(node) or (node == "end_to_end" and old.get(node))
+            delta = f"{s['p50_ms'] - old_node['p50_ms']:>+9.1f}" if old_node else f"{'':>9}"
+            print(f"{node:<14} {s['count']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {delta}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,50,200", help="Companies per corpus.")
+    parser.add_argument("--words", type=int, default=2000, help="Words per section file.")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed questions first.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per LLM call.")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds per word.")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Seconds per call.")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--rerank", action="store_true", help="Needs the FlashRank model.")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="Earlier results file to diff against.")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        sys.exit(0)
+
+    output = args.output or Path("data/benchmarks") / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                # Offline: the fakes never use these, but Settings requires them
+                "OPENAI_API_KEY": "offline",
+                "EDGAR_IDENTITY": "benchmark benchmark@example.com",
+                "DEEP_FINANCIAL_RESEARCH_PASSWORD": "offline",
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(p for p in sys.path if p),
+                "RAW_DATA_DIR": f"{tmp}/raw",
+                "INDEX_DIR": f"{tmp}/index",
+                "EMBEDDING_CACHE_PATH": f"{tmp}/embeddings.sqlite",
+                "RERANK_ENABLED": str(args.rerank).lower(),
+                "WARMUP_ENABLED": "false",
+                "READINESS_PORT": "0",
+            }
+            print(f"Benchmarking {size} companies...", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, __file__, *sys.argv[1:], "--worker", str(size)],
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+        if completed.returncode:
+            print(f"{size} companies: failed\n{completed.stderr[-3000:]}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    previous = json.loads(args.compare.read_text())["results"] if args.compare else None
+    print_results(results, previous)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("worker", "output", "compare")}
+    output.write_text(
+        json.dumps(
+            {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": _git_commit(),
+                "config": {k: str(v) if isinstance(v, Path) else v for k, v in config.items()},
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"\nResults written to {output}")
@@ -0,0 +1,228 @@
+"""Deterministic, offline stand-ins for the OpenAI chat and embedding clients.
+
+Both sleep for a configurable latency instead of calling the API, so benchmarks measure
+the graph's own overhead plus a known, repeatable model cost. Install them with
+`services.llm.set_llm_factory` and `get_embeddings().underlying` (see benchmark.py).
+
+`FakeEdgarCompany` replaces `edgar.Company` in scripts/ingest_sec.py. It makes real
+HTTP requests to the stub EDGAR server (stub_edgar_server.py), as many per call as
+edgartools does, so the ingestion rate limiting can be checked (see bench_ingestion.py).
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Iterator
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+from stub_embedding_server import stub_vector
+
+
+def prompt_text(messages: Any) -> str:
+    """Flattens a string, prompt value or message list into one string."""
+    if isinstance(messages, str):
+        return messages
+    if hasattr(messages, "to_messages"):
+        messages = messages.to_messages()
+    return "\n".join(str(m.content) for m in messages)
+
+
+def _usage(prompt: str, text: str) -> dict:
+    prompt_tokens, completion_tokens = len(prompt.split()), len(text.split())
+    return {
+        "input_tokens": prompt_tokens,
+        "output_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model whose answers come from `respond(prompt, schema)`.
+
+    `schema` is None for plain completions (return a string) and the pydantic class for
+    `with_structured_output` (return an instance of it). A call sleeps `latency` seconds
+    plus `token_latency` per generated word; streaming spreads the per-word part over
+    the chunks like a real API. Usage metadata counts words as tokens. The async methods
+    await instead of sleeping, so the async graph path waits without holding a thread.
+    """
+
+    model: str = "fake"
+    respond: Callable[[str, type[BaseModel] | None], Any]
+    latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = prompt_text(messages)
+        text = self.respond(prompt, None)
+        time.sleep(self.latency + self.token_latency * len(text.split()))
+        return self._result(prompt, text)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = prompt_text(messages)
+        text = self.respond(prompt, None)
+        await asyncio.sleep(self.latency + self.token_latency * len(text.split()))
+        return self._result(prompt, text)
+
+    def _result(self, prompt: str, text: str) -> ChatResult:
+        message = AIMessage(
+            content=text,
+            usage_metadata=_usage(prompt, text),
+            response_metadata={"model_name": self.model},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt = prompt_text(messages)
+        text = self.respond(prompt, None)
+        time.sleep(self.latency)
+        for word in text.split(" "):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield self._usage_chunk(prompt, text)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        prompt = prompt_text(messages)
+        text = self.respond(prompt, None)
+        await asyncio.sleep(self.latency)
+        for word in text.split(" "):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield self._usage_chunk(prompt, text)
+
+    def _usage_chunk(self, prompt: str, text: str) -> ChatGenerationChunk:
+        # Like OpenAI with stream_usage: a final empty chunk carries the usage
+        return ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                usage_metadata=_usage(prompt, text),
+                response_metadata={"model_name": self.model},
+            )
+        )
+
+    def with_structured_output(self, schema: type[BaseModel], **kwargs: Any) -> Runnable:
+        def structured(messages: Any) -> BaseModel:
+            time.sleep(self.latency)
+            return self.respond(prompt_text(messages), schema)
+
+        async def astructured(messages: Any) -> BaseModel:
+            await asyncio.sleep(self.latency)
+            return self.respond(prompt_text(messages), schema)
+
+        return RunnableLambda(structured, afunc=astructured, name=f"{self.model}:{schema.__name__}")
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic unit vectors (same as the stub server) after a fixed delay per call."""
+
+    def __init__(self, dims: int = 1536, latency: float = 0.0, per_text_latency: float = 0.0):
+        self.dims = dims
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        return [stub_vector(text, self.dims).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency + self.per_text_latency * len(texts))
+        return [stub_vector(text, self.dims).tolist() for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeEdgarFiling:
+    """One 10-K entry; `obj()` fetches the filing index and the document, like edgartools."""
+
+    def __init__(self, base_url: str, ticker: str, entry: dict):
+        self.base_url = base_url
+        self.ticker = ticker
+        self.form = entry["form"]
+        self.accession_number = entry["accession_number"]
+        self.period_of_report = entry["period_of_report"]
+        self.filing_url = f"{base_url}/Archives/{ticker}/{self.accession_number}/document.json"
+
+    def obj(self) -> SimpleNamespace:
+        folder = f"{self.base_url}/Archives/{self.ticker}/{self.accession_number}"
+        for document in _get_json(f"{folder}/index.json")["documents"]:
+            sections = _get_json(f"{folder}/{document}")
+        return SimpleNamespace(**sections)
+
+
+class FakeEdgarFilings(list):
+    """Filing entries, newest first, with edgartools' `latest()`."""
+
+    def latest(self) -> FakeEdgarFiling | None:
+        return self[0] if self else None
+
+
+class FakeEdgarCompany:
+    """`edgar.Company` backed by the stub EDGAR server at `base_url`."""
+
+    base_url = "http://127.0.0.1:8766"
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.name = _get_json(f"{self.base_url}/submissions/{ticker}.json")["name"]
+
+    def get_filings(self, form: str) -> FakeEdgarFilings:
+        entries = _get_json(f"{self.base_url}/filings/{self.ticker}.json")["filings"]
+        return FakeEdgarFilings(
+            FakeEdgarFiling(self.base_url, self.ticker, entry)
+            for entry in entries
+            if entry["form"] == form
+        )
+
+
+def _get_json(url: str) -> dict:
+    response = httpx.get(url, timeout=10)
+    response.raise_for_status()  # 429 and 503 raise httpx.HTTPStatusError, which is retried
+    return response.json()
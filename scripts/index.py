@@ -1,125 +1,798 @@
 """
 Indexing script for SEC filings using LangChain and ChromaDB.
+
+Indexing is incremental: every chunk gets a stable ID derived from its ticker, section,
+accession number and a hash of its text, and a manifest in `data/index` records which
+chunk IDs each raw file produced. Re-runs only embed chunks that are new, delete chunks
+that disappeared, and skip files whose content and filing are unchanged.
+
+With `--changeset`, only the files of tickers in the change set written by
+`scripts/ingest_sec.py --refresh` are read and hashed, so a refresh of a few filings does
+not touch the rest of the universe.
+
+Older 10-Ks (`data/raw/history`, see `ingest_sec.py --history-years`) are indexed the
+same way into the history partition `data/index/history`: a Chroma database, manifest,
+BM25 partitions and filing table of their own, so the latest-year index stays the same
+size however many years are kept.
+
+Files stream through a bounded pipeline (read → split → batch → embed → write), so memory
+use does not grow with the corpus and splitting overlaps with embedding.
 """
 
+import argparse
+import hashlib
 import json
+import queue
+import random
+import shutil
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
 
+import chromadb
+import chromadb.errors
+import openai
 from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from tqdm import tqdm
 
+from services.embeddings import get_embeddings
+from services.filings import (
+    default_changeset_path,
+    default_filings_path,
+    default_history_raw_dir,
+    filing_entry,
+    filing_id,
+    fiscal_year,
+    load_changeset,
+    load_filing_metadata,
+    load_filing_table,
+    write_filing_table,
+)
+from services.lexical import default_bm25_dir, delete_partition, partition_path, write_partition
+from services.sectors import default_centroids_path, update_centroids
+from services.vector_store import (
+    COLLECTION_NAME,
+    build_quantized_store,
+    default_history_dir,
+    default_quantized_dir,
+    default_shard_dir,
+    delete_shard,
+    shard_path,
+    write_shard,
+)
 from utils.config import settings
 from utils.logging import logger
+from utils.tokens import estimate_tokens
+
+MAX_BATCH_INPUTS = 1000  # OpenAIEmbeddings sends at most this many inputs per request
+MAX_RATE_LIMIT_RETRIES = 8
+# 2: chunks carry gics_sector; 3: compact chunks + filings.json; 4: chunks carry fiscal_year
+MANIFEST_VERSION = 4
+MANIFEST_SAVE_EVERY = 25  # changed files between manifest checkpoints
+QUEUE_DEPTH = 4  # batches buffered between pipeline stages
+PROGRESS_INTERVAL = 10.0  # seconds between progress reports
+
+_DONE = object()  # end-of-stream marker passed between pipeline stages
+
+
+def empty_manifest() -> dict:
+    """Manifest describing an empty collection."""
+    return {"version": MANIFEST_VERSION, "collection": COLLECTION_NAME, "files": {}}
+
+
+def load_manifest(index_dir) -> dict:
+    """Loads the indexing manifest, or returns an empty one if missing or outdated."""
+    manifest_path = index_dir / "manifest.json"
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        logger.warning("Manifest version mismatch, ignoring %s", manifest_path)
+    return empty_manifest()
+
+
+def save_manifest(index_dir, manifest: dict) -> None:
+    """Atomically writes the manifest so a crash never leaves a truncated file behind."""
+    index_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = index_dir / "manifest.json"
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    tmp_path.replace(manifest_path)
+
 
-BATCH_SIZE = 100  # chunks per OpenAI embedding call
+def file_hash(file_path) -> str:
+    """SHA-256 of a raw file's bytes."""
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
 
 
-def load_document_metadata(raw_data_dir):
+def metadata_key(file_path) -> str:
+    """Key of a raw file's filing metadata in `load_filing_metadata`.
+
+    `NVDA_risks.txt` → NVDA; `NVDA_risks_2023.txt` (history) → NVDA_2023.
     """
-    Load document metadata containing SEC filing URLs for each ticker.
+    parts = Path(file_path).stem.split("_")
+    return "_".join(parts[:1] + parts[2:])
+
+
+def chunk_ids(chunks: list[Document]) -> list[str]:
+    """Builds stable chunk IDs from ticker, section, accession number and text hash.
+
+    Identical passages within one file get an occurrence suffix so IDs stay unique.
+    """
+    seen: Counter[str] = Counter()
+    ids = []
+    for chunk in chunks:
+        meta = chunk.metadata
+        text_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()[:16]
+        base_id = f"{meta['ticker']}:{meta['section']}:{meta['filing_id']}:{text_hash}"
+        ids.append(base_id if not seen[base_id] else f"{base_id}:{seen[base_id]}")
+        seen[base_id] += 1
+    return ids
+
+
+def build_chunks(file_path, doc_metadata: dict, text_splitter) -> list[Document]:
+    """Loads one raw file and splits it into chunks carrying filter metadata.
 
-    Returns:
-        dict: A dictionary mapping ticker to document metadata
+    Links and other per-filing attributes are not repeated on every chunk: the chunk
+    points to its filing by `filing_id`, and the filing table holds the rest.
     """
-    metadata_map = {}
+    # Extract metadata from filename (e.g., NVDA_risks.txt, or NVDA_risks_2023.txt in history)
+    parts = file_path.stem.split("_")
+    ticker = parts[0]
+    section = parts[1] if len(parts) > 1 else "unknown"
+
+    # Load and split
+    loader = TextLoader(str(file_path))
+    docs = loader.load()
+
+    # Only what retrieval filters on, plus the key into the filing table
+    for doc in docs:
+        doc.metadata = {
+            "ticker": ticker,
+            "section": section,
+            "filing_id": filing_id(ticker, doc_metadata),
+            "fiscal_year": fiscal_year(doc_metadata),
+        }
+
+    return text_splitter.split_documents(docs)
+
+
+@dataclass
+class FilePlan:
+    """Diff of one changed raw file against the manifest, finalized once its chunks are written."""
+
+    name: str
+    file_hash: str
+    accession_number: str | None
+    chunk_ids: list[str]
+    stale_ids: list[str]
+    pending: int  # new chunks not yet written to Chroma
 
-    for metadata_file in raw_data_dir.glob("*_metadata.json"):
+
+@dataclass
+class ChunkBatch:
+    """A group of new chunks travelling through the embed and write stages together."""
+
+    ids: list[str] = field(default_factory=list)
+    texts: list[str] = field(default_factory=list)
+    metadatas: list[dict] = field(default_factory=list)
+    files: list[str] = field(default_factory=list)  # owning raw file of each chunk
+    embeddings: list[list[float]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class PipelineStats:
+    """Thread-safe per-stage counters, reported periodically while indexing runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Counter[str] = Counter()
+
+    def add(self, **deltas: int) -> None:
+        with self._lock:
+            self.counts.update(deltas)
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self.counts)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    """Blocking put that gives up once the pipeline is being torn down."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Blocking get that returns _DONE once the pipeline is being torn down."""
+    while not stop.is_set():
         try:
-            ticker = metadata_file.stem.replace("_metadata", "")
-            with open(metadata_file, "r", encoding="utf-8") as f:
-                metadata = json.load(f)
-                metadata_map[ticker] = metadata
-                logger.info("Loaded URL metadata for %s", ticker)
-        except Exception as e:
-            logger.debug("No metadata file for %s or failed to load: %s", metadata_file, e)
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return _DONE
 
-    return metadata_map
 
+def iter_changed_files(
+    raw_files, manifest: dict, metadata_map: dict, stats: PipelineStats, bm25_dir: Path
+):
+    """Stage 1 (read): yields (file_path, doc_metadata, file_hash) for new or changed files.
 
-def run_indexing():
-    """1. Loads raw text files from data/raw
-    2. Splits them into chunks with metadata including URLs when available
-    3. Indexes them into ChromaDB for retrieval
+    A file whose BM25 partition is missing also counts as changed; its chunk IDs are
+    unchanged, so it is re-split but not re-embedded.
     """
-    # 1. Initialize Embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=settings.OPENAI_API_KEY)
+    for file_path in raw_files:
+        doc_metadata = metadata_map.get(metadata_key(file_path), {})
+        previous = manifest["files"].get(file_path.name)
+        current_hash = file_hash(file_path)
+        stats.add(files_read=1)
+
+        if (
+            previous
+            and previous["file_hash"] == current_hash
+            and previous["accession_number"] == doc_metadata.get("accession_number")
+            and partition_path(bm25_dir, file_path.stem).exists()
+        ):
+            stats.add(unchanged_files=1)
+            continue
+        yield file_path, doc_metadata, current_hash
+
+
+def split_files(
+    changed_files, manifest: dict, text_splitter, stats: PipelineStats, bm25_dir: Path
+):
+    """Stage 2 (split): yields (FilePlan, new chunks, new ids) for each changed file.
+
+    Only one file's chunks are materialized at a time. The file's BM25 partition is
+    rewritten here, from all of its chunks.
+    """
+    for file_path, doc_metadata, current_hash in changed_files:
+        chunks = build_chunks(file_path, doc_metadata, text_splitter)
+        ids = chunk_ids(chunks)
+        write_partition(bm25_dir, file_path.stem, ids, [c.page_content for c in chunks])
+        previous = manifest["files"].get(file_path.name)
+        old_ids = set(previous["chunk_ids"]) if previous else set()
+
+        new = [(chunk, chunk_id) for chunk, chunk_id in zip(chunks, ids) if chunk_id not in old_ids]
+        plan = FilePlan(
+            name=file_path.name,
+            file_hash=current_hash,
+            accession_number=doc_metadata.get("accession_number"),
+            chunk_ids=ids,
+            stale_ids=sorted(old_ids - set(ids)),
+            pending=len(new),
+        )
+        stats.add(chunks_split=len(new), kept_chunks=len(ids) - len(new))
+        yield plan, [chunk for chunk, _ in new], [chunk_id for _, chunk_id in new]
+
+
+def batch_chunks(planned_files, token_budget: int, plans: dict, write_q, stop, stats):
+    """Stage 3 (batch): regroups chunks across files into batches of ~`token_budget` tokens.
+
+    Sizing by tokens rather than chunk count keeps every request near the same cost,
+    whatever the mix of short and long chunks.
+
+    Each FilePlan is registered in `plans` before any of its chunks leave this stage.
+    Files without new chunks go straight to the writer so their stale chunks get deleted.
+    """
+    batch = ChunkBatch()
+    batch_tokens = 0
+    for plan, chunks, ids in planned_files:
+        plans[plan.name] = plan
+        if not chunks:
+            _put(write_q, plan, stop)
+            continue
+        for chunk, chunk_id in zip(chunks, ids):
+            tokens = estimate_tokens(chunk.page_content)
+            if batch and (batch_tokens + tokens > token_budget or len(batch) >= MAX_BATCH_INPUTS):
+                stats.add(batches=1)
+                yield batch
+                batch = ChunkBatch()
+                batch_tokens = 0
+            batch_tokens += tokens
+            batch.ids.append(chunk_id)
+            batch.texts.append(chunk.page_content)
+            batch.metadatas.append({k: v for k, v in chunk.metadata.items() if v is not None})
+            batch.files.append(plan.name)
+    if batch:
+        stats.add(batches=1)
+        yield batch
+
+
+class IndexingPipeline:
+    """Streaming indexer: read → split → batch → embed → write, joined by bounded queues.
+
+    Splitting and batching run in one producer thread, `concurrency` embedding workers
+    keep that many requests in flight, and the calling thread is the single Chroma
+    writer. Only a few batches wait between stages, so memory stays flat regardless of
+    corpus size.
+    """
+
+    def __init__(
+        self,
+        collection,
+        embeddings,
+        manifest: dict,
+        text_splitter,
+        concurrency: int = 1,
+        batch_tokens: int = settings.EMBEDDING_BATCH_TOKENS,
+        index_dir: Path | None = None,
+    ):
+        self.collection = collection
+        self.index_dir = index_dir or settings.INDEX_DIR
+        self.embeddings = embeddings
+        self.manifest = manifest
+        self.text_splitter = text_splitter
+        self.concurrency = concurrency
+        self.batch_tokens = batch_tokens
+        self.stats = PipelineStats()
+        self.plans: dict[str, FilePlan] = {}
+        self.embed_q: queue.Queue = queue.Queue(maxsize=max(QUEUE_DEPTH, concurrency))
+        self.write_q: queue.Queue = queue.Queue(maxsize=max(QUEUE_DEPTH, concurrency))
+        self.stop = threading.Event()
+        self.errors: list[BaseException] = []
+        self._finalized_since_save = 0
+        self._cooldown_lock = threading.Lock()
+        self._cooldown_until = 0.0
+
+    def _produce(self, raw_files, metadata_map: dict) -> None:
+        """Runs the read, split and batch generators and feeds the embed queue."""
+        try:
+            bm25_dir = default_bm25_dir(self.index_dir)
+            changed = iter_changed_files(
+                raw_files, self.manifest, metadata_map, self.stats, bm25_dir
+            )
+            planned = split_files(changed, self.manifest, self.text_splitter, self.stats, bm25_dir)
+            for batch in batch_chunks(
+                planned, self.batch_tokens, self.plans, self.write_q, self.stop, self.stats
+            ):
+                _put(self.embed_q, batch, self.stop)
+        except BaseException as e:  # surfaced by run() in the main thread
+            self.errors.append(e)
+            self.stop.set()
+        finally:
+            for _ in range(self.concurrency):
+                _put(self.embed_q, _DONE, self.stop)
+
+    def _wait_for_cooldown(self) -> None:
+        """Holds every worker back while the API is signalling rate limits."""
+        while (delay := self._cooldown_until - time.monotonic()) > 0 and not self.stop.is_set():
+            time.sleep(min(delay, 0.5))
+
+    def _embed_with_backoff(self, texts: list[str]) -> list[list[float]]:
+        """Embeds one batch, backing off on 429s with a cooldown shared by all workers."""
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self._wait_for_cooldown()
+            try:
+                return self.embeddings.embed_documents(texts)
+            except openai.RateLimitError as e:
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                retry_after = e.response.headers.get("retry-after")
+                delay = float(retry_after) if retry_after else min(60.0, 2**attempt)
+                delay += random.uniform(0, 0.5)
+                with self._cooldown_lock:
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                self.stats.add(rate_limited=1)
+                logger.warning("⏳ Embedding API rate limited, backing off %.1fs", delay)
+        raise AssertionError("unreachable")
+
+    def _embed(self) -> None:
+        """Embeds batches from the embed queue and hands them to the writer."""
+        try:
+            while (batch := _get(self.embed_q, self.stop)) is not _DONE:
+                batch.embeddings = self._embed_with_backoff(batch.texts)
+                self.stats.add(chunks_embedded=len(batch))
+                _put(self.write_q, batch, self.stop)
+        except BaseException as e:
+            self.errors.append(e)
+            self.stop.set()
+        finally:
+            _put(self.write_q, _DONE, self.stop)
+
+    def _finalize(self, plan: FilePlan) -> None:
+        """Deletes a file's stale chunks and records it in the manifest."""
+        if plan.stale_ids:
+            self.collection.delete(ids=plan.stale_ids)
+        self.manifest["files"][plan.name] = {
+            "file_hash": plan.file_hash,
+            "accession_number": plan.accession_number,
+            "chunk_ids": plan.chunk_ids,
+        }
+        del self.plans[plan.name]
+        self.stats.add(changed_files=1, deleted_chunks=len(plan.stale_ids))
+        logger.info(
+            " ✅ Indexed %s (%d chunks, -%d stale)",
+            plan.name,
+            len(plan.chunk_ids),
+            len(plan.stale_ids),
+        )
+        self._finalized_since_save += 1
+        if self._finalized_since_save >= MANIFEST_SAVE_EVERY:
+            save_manifest(self.index_dir, self.manifest)
+            self._finalized_since_save = 0
+
+    def _write(self, item) -> None:
+        """Single writer: upserts embedded batches and finalizes completed files."""
+        if isinstance(item, FilePlan):
+            self._finalize(item)
+            return
+        self.collection.upsert(
+            ids=item.ids,
+            embeddings=item.embeddings,
+            documents=item.texts,
+            metadatas=item.metadatas,
+        )
+        self.stats.add(chunks_written=len(item))
+        for name in item.files:
+            plan = self.plans[name]
+            plan.pending -= 1
+            if plan.pending == 0:
+                self._finalize(plan)
+
+    def _report(self, total_files: int) -> None:
+        """Logs per-stage progress and the number of chunks in flight."""
+        c = self.stats.snapshot()
+        logger.info(
+            "📈 read %d/%d files | split %d | embedded %d | written %d | in flight %d "
+            "(embed queue %d, write queue %d, %d rate limited)",
+            c["files_read"],
+            total_files,
+            c["chunks_split"],
+            c["chunks_embedded"],
+            c["chunks_written"],
+            c["chunks_split"] - c["chunks_written"],
+            self.embed_q.qsize(),
+            self.write_q.qsize(),
+            c["rate_limited"],
+        )
+
+    def run(self, raw_files, metadata_map: dict) -> Counter:
+        """Runs the pipeline to completion and returns the final stage counters."""
+        producer = threading.Thread(
+            target=self._produce, args=(raw_files, metadata_map), name="index-split", daemon=True
+        )
+        embedders = [
+            threading.Thread(target=self._embed, name=f"index-embed-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        producer.start()
+        for embedder in embedders:
+            embedder.start()
+
+        # The split thread queues every plan before signalling the embedders, and each
+        # embedder signals the writer once after that, so the last _DONE arrives last.
+        last_report = time.monotonic()
+        remaining = self.concurrency
+        try:
+            while remaining:
+                item = _get(self.write_q, self.stop)
+                if item is _DONE:
+                    if self.stop.is_set():
+                        break
+                    remaining -= 1
+                    continue
+                self._write(item)
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    self._report(len(raw_files))
+                    last_report = time.monotonic()
+        except BaseException:
+            self.stop.set()
+            raise
+        finally:
+            producer.join()
+            for embedder in embedders:
+                embedder.join()
+
+        if self.errors:
+            raise self.errors[0]
+        self._report(len(raw_files))
+        return self.stats.snapshot()
+
+
+def build_filing_table(manifest: dict, metadata_map: dict, previous: dict) -> dict:
+    """filing_id → attributes for every filing that indexed chunks point to.
+
+    A file whose new filing failed to index still has chunks of the old one; its row is
+    carried over from the previous table.
+    """
+    filings = {}
+    for name, entry in manifest["files"].items():
+        ticker = Path(name).stem.split("_")[0]
+        doc_metadata = metadata_map.get(metadata_key(name), {})
+        key = filing_id(ticker, {"accession_number": entry["accession_number"]})
+        if doc_metadata.get("accession_number") == entry["accession_number"]:
+            filings[key] = filing_entry(ticker, doc_metadata)
+        else:
+            filings.setdefault(key, previous.get(key, {"ticker": ticker}))
+    return filings
+
+
+def open_collection(full_rebuild: bool, history: bool = False):
+    """Opens (or resets) the persistent Chroma collection the search node reads from."""
+    index_dir = default_history_dir() if history else settings.INDEX_DIR
+    client = chromadb.PersistentClient(path=str(index_dir))
+    if full_rebuild:
+        logger.info("🧹 Full rebuild: resetting collection %s in %s", COLLECTION_NAME, index_dir)
+        try:
+            client.delete_collection(COLLECTION_NAME)
+        except (ValueError, chromadb.errors.NotFoundError):
+            pass
+        shutil.rmtree(default_bm25_dir(index_dir), ignore_errors=True)
+        default_filings_path(index_dir).unlink(missing_ok=True)
+        if not history:
+            default_centroids_path().unlink(missing_ok=True)
+            shutil.rmtree(default_shard_dir(), ignore_errors=True)
+            shutil.rmtree(default_quantized_dir(), ignore_errors=True)
+    return client.get_or_create_collection(COLLECTION_NAME, embedding_function=None)
+
+
+def export_shards(collection, names: list[str]) -> None:
+    """Copies the chunks of each raw file from Chroma into its per-file shard.
+
+    Shards are what the `sharded` vector store backend reads (services/vector_store.py).
+    """
+    for name in names:
+        ticker, section = (Path(name).stem.split("_") + ["unknown"])[:2]
+        result = collection.get(
+            where={"$and": [{"ticker": {"$eq": ticker}}, {"section": {"$eq": section}}]},
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not result["ids"]:
+            delete_shard(default_shard_dir(), Path(name).stem)
+            continue
+        write_shard(
+            default_shard_dir(),
+            Path(name).stem,
+            result["ids"],
+            result["embeddings"],
+            result["documents"],
+            result["metadatas"],
+        )
+    if names:
+        logger.info("📦 Exported %d shards to %s", len(names), default_shard_dir())
+
+
+def run_indexing(
+    full_rebuild: bool = False,
+    embeddings=None,
+    concurrency: int = settings.EMBEDDING_CONCURRENCY,
+    batch_tokens: int = settings.EMBEDDING_BATCH_TOKENS,
+    shards: bool = settings.VECTOR_BACKEND == "sharded",
+    quantized: bool = settings.VECTOR_BACKEND == "quantized",
+    changeset: Path | None = None,
+    history: bool = False,
+):
+    """1. Streams raw text files from data/raw
+    2. Splits new or changed files into chunks with compact metadata
+       (ticker, section, filing_id, fiscal_year)
+    3. Embeds and upserts new chunks into ChromaDB and deletes chunks that no longer exist
+    4. Writes the filing table (URLs, accession number, period, sector per filing_id)
+    5. Recomputes the per-company centroids (sector shortlisting) of companies that changed
+    6. Optionally exports per-file shards or the quantized store for the search node
+
+    Args:
+        full_rebuild: drop the collection and manifest and re-embed everything.
+        embeddings: embeddings client to use instead of the shared cached one.
+        concurrency: number of embedding requests kept in flight.
+        batch_tokens: approximate token budget of each embedding request.
+        shards: also keep the per-file shards in data/index/shards up to date.
+        quantized: also rebuild data/index/quantized when anything changed.
+        changeset: only revisit the files of the tickers in this change set
+            (scripts/ingest_sec.py --refresh) instead of every raw file.
+        history: index data/raw/history into the history partition instead; steps 5
+            and 6 only apply to the latest filings.
+    """
+    raw_dir = default_history_raw_dir() if history else settings.RAW_DATA_DIR
+    index_dir = default_history_dir() if history else settings.INDEX_DIR
+
+    # 1. Initialize Embeddings and the persistent collection
+    embeddings = embeddings or get_embeddings()
+    manifest = load_manifest(index_dir)
+    collection = open_collection(full_rebuild, history)
+    if not full_rebuild and not manifest["files"] and collection.count() > 0:
+        # Chunks from a pre-manifest run have random IDs and cannot be diffed
+        logger.warning("Existing collection has no manifest, falling back to a full rebuild.")
+        full_rebuild = True
+        collection = open_collection(full_rebuild, history)
+    if full_rebuild:
+        manifest = empty_manifest()
 
     # 2. Load document metadata containing URLs (if available)
-    metadata_map = load_document_metadata(settings.RAW_DATA_DIR)
+    metadata_map = load_filing_metadata(raw_dir)
 
     # 3. Prepare Splitter
-    # Chunk size 1000 is roughly 2-3 paragraphs; 100 overlap prevents context loss
+    # Chunk size 1000 is roughly 2-3 paragraphs; 100 overlap prevents context loss.
+    # start_index lets the reply context merge neighbouring chunks (services/context_builder.py)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=100,
         length_function=len,
         is_separator_regex=False,
+        add_start_index=True,
     )
 
-    all_documents = []
-    raw_files = list(settings.RAW_DATA_DIR.glob("*.txt"))
+    if changeset is not None and not full_rebuild:
+        pending = load_changeset(changeset)
+        if not pending:
+            logger.info("✅ No pending changes in %s, the index is up to date.", changeset)
+            return
+        raw_files = sorted(
+            f for ticker in pending for f in raw_dir.glob(f"{ticker}_*.txt")
+        )
+        logger.info("🧾 Applying change set %s: %d tickers", changeset, len(pending))
+    else:
+        pending = None
+        raw_files = sorted(raw_dir.glob("*.txt"))
+        if not raw_files:
+            logger.warning("No raw files found in %s. Run ingest_sec.py first!", raw_dir)
+            return
 
-    if not raw_files:
-        logger.warning("No raw files found in data/raw. Run ingest_sec.py first!")
-        return
+    logger.info("📄 Found %d files. Starting streaming indexing...", len(raw_files))
+    previous_hashes = {name: entry["file_hash"] for name, entry in manifest["files"].items()}
 
-    logger.info("📄 Found %d files. Starting processing...", len(raw_files))
-
-    for file_path in raw_files:
-        # Extract metadata from filename (e.g., NVDA_risks.txt)
-        parts = file_path.stem.split("_")
-        ticker = parts[0]
-        section = parts[1] if len(parts) > 1 else "unknown"
-
-        # Get document metadata with URLs if available
-        doc_metadata = metadata_map.get(ticker, {})
-
-        # Load and split
-        loader = TextLoader(str(file_path))
-        docs = loader.load()
-
-        # Add comprehensive metadata to each chunk for links and filtered retrieval
-        for doc in docs:
-            doc.metadata = {
-                "ticker": ticker,
-                "section": section,
-                "source": file_path.name,
-                "file_path": str(file_path),  # Full file path for potential links
-                "document_type": "SEC Filing",  # Could be expanded later
-                "section_display": section.replace(
-                    "_", " "
-                ).title(),  # Human-readable section name
-                # Add SEC document URL information if available
-                "filing_url": doc_metadata.get("filing_url"),
-                "accession_number": doc_metadata.get("accession_number"),
-                "period_of_report": doc_metadata.get("period_of_report"),
-                "homepage_url": doc_metadata.get("homepage_url"),
-            }
-
-        chunks = text_splitter.split_documents(docs)
-        all_documents.extend(chunks)
-        logger.info(" ✅ Processed %s (%d chunks)", file_path.name, len(chunks))
-
-    # 3. Create/Update Vector Store in batches with a progress bar
-    total = len(all_documents)
-    logger.info("📦 Indexing %d chunks into ChromaDB (batch size: %d)...", total, BATCH_SIZE)
-
-    batches = [all_documents[i : i + BATCH_SIZE] for i in range(0, total, BATCH_SIZE)]
-
-    # Initialise the collection with the first batch, then add the rest
-    vector_db = Chroma.from_documents(
-        documents=batches[0],
-        embedding=embeddings,
-        persist_directory=str(settings.INDEX_DIR),
-        collection_name="sec_filings",
+    pipeline = IndexingPipeline(
+        collection,
+        embeddings,
+        manifest,
+        text_splitter,
+        concurrency=concurrency,
+        batch_tokens=batch_tokens,
+        index_dir=index_dir,
     )
-    for batch in tqdm(batches[1:], desc="Embedding batches", unit="batch"):
-        vector_db.add_documents(batch)
+    try:
+        stats = pipeline.run(raw_files, metadata_map)
+    finally:
+        # Files finalized before an error are safely recorded; the rest are retried next run
+        save_manifest(index_dir, manifest)
+
+    # 4. Drop chunks of raw files that no longer exist (of the change set's tickers only)
+    current_names = {f.name for f in raw_files}
+    indexed_names = {
+        name
+        for name in manifest["files"]
+        if pending is None or Path(name).stem.split("_")[0] in pending
+    }
+    for name in sorted(indexed_names - current_names):
+        removed_ids = manifest["files"].pop(name)["chunk_ids"]
+        if removed_ids:
+            collection.delete(ids=removed_ids)
+        delete_partition(default_bm25_dir(index_dir), Path(name).stem)
+        delete_shard(default_shard_dir(), Path(name).stem)
+        stats["removed_files"] += 1
+        stats["deleted_chunks"] += len(removed_ids)
+        logger.info(" 🗑️  Removed %s (%d chunks)", name, len(removed_ids))
+
+    save_manifest(index_dir, manifest)
+
+    # 5. Rewrite the filing table the compact chunk metadata points to
+    filings_path = default_filings_path(index_dir)
+    filings = build_filing_table(manifest, metadata_map, load_filing_table(filings_path))
+    write_filing_table(filings_path, filings)
+    if history:
+        logger.info(
+            "🗄️  History indexed: %d changed, %d unchanged, %d removed files; "
+            "+%d / -%d chunks.",
+            stats["changed_files"],
+            stats["unchanged_files"],
+            stats["removed_files"],
+            stats["chunks_written"],
+            stats["deleted_chunks"],
+        )
+        return stats
+
+    # 6. Refresh the centroids of every company with a new, changed or removed file
+    current_hashes = {name: entry["file_hash"] for name, entry in manifest["files"].items()}
+    changed_names = {
+        name
+        for name in previous_hashes.keys() | current_hashes.keys()
+        if previous_hashes.get(name) != current_hashes.get(name)
+    }
+    stale_centroids = changed_names if default_centroids_path().exists() else current_hashes
+    changed_tickers = {Path(name).stem.split("_")[0] for name in stale_centroids}
+    if changed_tickers:
+        sector_of = {ticker: meta.get("gics_sector") for ticker, meta in metadata_map.items()}
+        update_centroids(default_centroids_path(), collection, changed_tickers, sector_of)
 
-    logger.info("🚀 Indexing complete! Your data is ready for LangGraph.")
+    # 7. Re-export the shards of changed files, and any shard that is missing
+    if shards:
+        export_shards(
+            collection,
+            sorted(
+                name
+                for name in current_hashes
+                if name in changed_names
+                or not shard_path(default_shard_dir(), Path(name).stem).exists()
+            ),
+        )
+
+    # 8. The quantized store is row-ordered by partition, so it is rebuilt as a whole
+    if quantized and (changed_names or not default_quantized_dir().exists()):
+        partitions = sorted(
+            tuple((Path(name).stem.split("_") + ["unknown"])[:2]) for name in current_hashes
+        )
+        build_quantized_store(default_quantized_dir(), collection, partitions)
+
+    # Every pending change is now indexed
+    if changeset is not None:
+        changeset.unlink(missing_ok=True)
+
+    logger.info(
+        "🚀 Indexing complete! %d changed, %d unchanged, %d removed files; "
+        "+%d / -%d chunks (%d reused). Your data is ready for LangGraph.",
+        stats["changed_files"],
+        stats["unchanged_files"],
+        stats["removed_files"],
+        stats["chunks_written"],
+        stats["deleted_chunks"],
+        stats["kept_chunks"],
+    )
+    if hasattr(embeddings, "stats"):
+        logger.info("🧮 Embedding cache: %s", embeddings.stats())
+    return stats
 
 
 if __name__ == "__main__":
-    run_indexing()
+    parser = argparse.ArgumentParser(description="Index raw SEC filings into ChromaDB.")
+    parser.add_argument(
+        "--full", action="store_true", help="Drop the collection and re-embed every chunk."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.EMBEDDING_CONCURRENCY,
+        help="Embedding requests kept in flight.",
+    )
+    parser.add_argument(
+        "--batch-tokens",
+        type=int,
+        default=settings.EMBEDDING_BATCH_TOKENS,
+        help="Approximate token budget per embedding request.",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        default=settings.VECTOR_BACKEND == "sharded",
+        help="Also export per-ticker/section shards for VECTOR_BACKEND=sharded.",
+    )
+    parser.add_argument(
+        "--quantized",
+        action="store_true",
+        default=settings.VECTOR_BACKEND == "quantized",
+        help="Also rebuild the int8 quantized store for VECTOR_BACKEND=quantized.",
+    )
+    parser.add_argument(
+        "--changeset",
+        type=Path,
+        nargs="?",
+        const=default_changeset_path(),
+        help="Only index the tickers in this change set (default: data/changeset.json).",
+    )
+    args = parser.parse_args()
+
+    # Older fiscal years first: the latest pass clears the change set once both are applied
+    if default_history_raw_dir().exists():
+        run_indexing(
+            full_rebuild=args.full,
+            concurrency=args.concurrency,
+            batch_tokens=args.batch_tokens,
+            changeset=args.changeset,
+            history=True,
+        )
+    run_indexing(
+        full_rebuild=args.full,
+        concurrency=args.concurrency,
+        batch_tokens=args.batch_tokens,
+        shards=args.shards,
+        quantized=args.quantized,
+        changeset=args.changeset,
+    )
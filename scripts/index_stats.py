@@ -0,0 +1,151 @@
+"""Size of the index on disk and the latency of metadata-filtered queries.
+
+Reports the Chroma SQLite file, the metadata rows and bytes stored per chunk, the
+filing table and every derived artifact under INDEX_DIR, then times filtered queries
+(ticker + section, like the search node) against the Chroma collection:
+
+    python scripts/index_stats.py --queries 200 --output data/index_stats.json
+
+Point `--index-dir` at two indexes of the same corpus to compare layouts.
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+from services.filings import default_filings_path
+from services.vector_store import COLLECTION_NAME, metadata_filter
+from utils.config import settings
+
+PAGE_SIZE = 5000
+
+
+def _dir_bytes(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def disk_usage(index_dir: Path) -> dict:
+    """Bytes per top-level entry of the index directory, plus the total."""
+    sizes = {entry.name: _dir_bytes(entry) for entry in sorted(index_dir.iterdir())}
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def metadata_stats(collection) -> tuple[dict, Counter]:
+    """Per-chunk metadata keys and JSON bytes, and how many chunks each partition has."""
+    chunks = keys = json_bytes = 0
+    partitions: Counter = Counter()
+    for offset in range(0, collection.count(), PAGE_SIZE):
+        page = collection.get(include=["metadatas"], limit=PAGE_SIZE, offset=offset)
+        for metadata in page["metadatas"]:
+            chunks += 1
+            keys += len(metadata)
+            json_bytes += len(json.dumps(metadata))
+            partitions[(metadata.get("ticker"), metadata.get("section"))] += 1
+    return {
+        "chunks": chunks,
+        "keys_per_chunk": keys / chunks if chunks else 0.0,
+        "metadata_bytes_per_chunk": json_bytes / chunks if chunks else 0.0,
+    }, partitions
+
+
+def sqlite_metadata_rows(index_dir: Path) -> int | None:
+    """Rows in Chroma's embedding_metadata table (one per chunk and key)."""
+    path = index_dir / "chroma.sqlite3"
+    if not path.exists():
+        return None
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+        return conn.execute("SELECT COUNT(*) FROM embedding_metadata").fetchone()[0]
+
+
+def time_filtered_queries(collection, partitions: list, queries: int, k: int, seed: int) -> dict:
+    """Times `queries` filtered top-k searches and metadata-only lookups, in ms."""
+    rng = random.Random(seed)
+    dims = len(collection.get(limit=1, include=["embeddings"])["embeddings"][0])
+    search_ms, lookup_ms = [], []
+    for _ in range(queries):
+        ticker, section = rng.choice(partitions)
+        where = metadata_filter(ticker, section)
+        vector = np.random.default_rng(rng.randrange(2**32)).standard_normal(dims).tolist()
+
+        start = time.perf_counter()
+        collection.query(
+            query_embeddings=[vector], n_results=k, where=where, include=["documents", "metadatas"]
+        )
+        search_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        collection.get(where=where, include=["metadatas"])
+        lookup_ms.append((time.perf_counter() - start) * 1000)
+
+    def summary(values: list[float]) -> dict:
+        return {
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "mean_ms": statistics.mean(values),
+        }
+
+    return {"queries": queries, "search": summary(search_ms), "lookup": summary(lookup_ms)}
+
+
+def index_stats(index_dir: Path, queries: int, k: int, seed: int = 0) -> dict:
+    """Everything above for the index in `index_dir`, as one JSON-serializable dict."""
+    collection = chromadb.PersistentClient(path=str(index_dir)).get_collection(COLLECTION_NAME)
+    metadata, partitions = metadata_stats(collection)
+    filings_path = index_dir / default_filings_path().name
+    stats = {
+        "index_dir": str(index_dir),
+        "disk_bytes": disk_usage(index_dir),
+        "sqlite_metadata_rows": sqlite_metadata_rows(index_dir),
+        "filings": len(json.loads(filings_path.read_text())) if filings_path.exists() else None,
+        **metadata,
+        "partitions": len(partitions),
+    }
+    if queries and partitions:
+        stats["filtered_queries"] = time_filtered_queries(
+            collection, sorted(partitions), queries, k, seed
+        )
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index-dir", type=Path, default=settings.INDEX_DIR)
+    parser.add_argument("--queries", type=int, default=200, help="Filtered queries to time.")
+    parser.add_argument("--k", type=int, default=settings.RETRIEVAL_CANDIDATES)
+    parser.add_argument("--output", type=Path, help="Also write the stats as JSON here.")
+    args = parser.parse_args()
+
+    stats = index_stats(args.index_dir, args.queries, args.k)
+
+    mb = 1024 * 1024
+    print(f"Index {stats['index_dir']}: {stats['chunks']} chunks, {stats['partitions']} partitions")
+    for name, size in stats["disk_bytes"].items():
+        print(f"  {name:<40} {size / mb:>9.2f} MB")
+    print(
+        f"Metadata: {stats['keys_per_chunk']:.1f} keys, "
+        f"{stats['metadata_bytes_per_chunk']:.0f} bytes per chunk; "
+        f"{stats['sqlite_metadata_rows']} SQLite rows; filing table: {stats['filings']} filings"
+    )
+    if "filtered_queries" in stats:
+        for name, s in stats["filtered_queries"].items():
+            if isinstance(s, dict):
+                print(f"Filtered {name:<7} p50 {s['p50_ms']:.2f} ms, p95 {s['p95_ms']:.2f} ms")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(stats, indent=2))
@@ -1,17 +1,43 @@
-"""Fetches the latest 10-K filings for all S&P 500 companies from EDGAR."""
+"""Fetches the latest 10-K filings for all S&P 500 companies from EDGAR.
 
+With `--refresh`, only filings whose accession number changed since the last run are
+downloaded again, companies that left the index are removed, and the changes are
+recorded in a change set that `scripts/index.py --changeset` applies.
+
+With `--history-years N`, the N 10-Ks before the latest one are kept as well, in
+`data/raw/history/` as `{TICKER}_{section}_{FY}.txt` and `{TICKER}_{FY}_metadata.json`.
+"""
+
+import argparse
 import json
 import logging
 import os
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import partial
 from io import StringIO
+from pathlib import Path
+from typing import Callable, Literal
 
+import httpx
 import pandas as pd
 import requests
 from edgar import Company, set_identity
 from edgar.company_reports import TenK
 from edgar.entity.core import CompanyNotFoundError
 
+from services.filings import (
+    default_changeset_path,
+    default_history_raw_dir,
+    fiscal_year,
+    load_changeset,
+    record_changes,
+)
+from services.rate_limit import UpstreamLimiter, get_limiter
 from utils.config import settings
 from utils.logging import logger
 
@@ -47,6 +73,53 @@ def get_sp500_companies() -> list[dict]:
     return result
 
 
+def default_constituents_path() -> Path:
+    return settings.DATA_DIR / "constituents.json"
+
+
+def load_constituents(
+    cache_path: Path | None = None,
+    max_age_hours: float = settings.CONSTITUENTS_MAX_AGE_HOURS,
+) -> list[dict]:
+    """S&P 500 constituents, re-scraped from Wikipedia only when the cached list is stale.
+
+    Membership changes a few times a year, so the list is cached in
+    `data/constituents.json`. If Wikipedia cannot be reached, a stale cache is used.
+    """
+    cache_path = cache_path or default_constituents_path()
+    cached = json.loads(cache_path.read_text(encoding="utf-8")) if cache_path.exists() else None
+    if cached:
+        fetched_at = datetime.fromisoformat(cached["fetched_at"])
+        age_hours = (datetime.now(timezone.utc) - fetched_at).total_seconds() / 3600
+        if age_hours < max_age_hours:
+            logger.info(
+                "📋 Using cached S&P 500 list (%d companies, %.1fh old).",
+                len(cached["companies"]),
+                age_hours,
+            )
+            return cached["companies"]
+
+    try:
+        companies = get_sp500_companies()
+    except (requests.RequestException, ValueError) as e:
+        if not cached:
+            raise
+        logger.warning("⚠️  Could not fetch the S&P 500 list (%s), using the cached one.", e)
+        return cached["companies"]
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".json.tmp")
+    tmp_path.write_text(
+        json.dumps(
+            {"fetched_at": datetime.now(timezone.utc).isoformat(), "companies": companies},
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    tmp_path.replace(cache_path)
+    return companies
+
+
 def _safe_get_section(tenk: TenK, attr: str, ticker: str, section_name: str) -> str | None:
     """Returns a TenK section's text, or None if parsing fails."""
     try:
@@ -56,17 +129,224 @@ def _safe_get_section(tenk: TenK, attr: str, ticker: str, section_name: str) ->
         return None
 
 
-def download_financial_sections(
+# Errors worth retrying: network hiccups and EDGAR throttling. Anything else
+# (unknown ticker, unparsable filing) fails the same way on every attempt.
+TRANSIENT_ERRORS = (OSError, RuntimeError, httpx.HTTPError)
+PERMANENT_ERRORS = (KeyError, ValueError, CompanyNotFoundError)
+
+# Raw file section name → TenK attribute
+SECTIONS = {
+    "business": "business",
+    "risks": "risk_factors",
+    "mnda": "management_discussion",
+}
+
+# Refuse to delete more than this share of the stored companies in one refresh: a
+# constituent list that shrank that much is a scraping problem, not an index change.
+MAX_REMOVED_FRACTION = 0.1
+
+DownloadStatus = Literal["downloaded", "skipped", "missing"]
+RefreshStatus = Literal["added", "updated", "unchanged", "missing"]
+
+
+class ChangeRecorder:
+    """Writes refresh changes to the change set as they happen, under a lock.
+
+    A change is recorded before the raw files it describes are written, so a refresh
+    that crashes halfway never leaves new files on disk that the change set misses.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.changes: dict[str, dict] = {}  # recorded by this run
+        self._lock = threading.Lock()
+
+    def record(self, ticker: str, change: dict) -> None:
+        """Merges `change` into the ticker's entry; history years accumulate."""
+        with self._lock:
+            entry = {"change": "history", **self.changes.get(ticker, {}), **change}
+            years = self.changes.get(ticker, {}).get("history_years", [])
+            if "history_years" in change:
+                entry["history_years"] = sorted({*years, *change["history_years"]})
+            self.changes[ticker] = entry
+            record_changes(self.path, {ticker: entry})
+
+
+# Permits are taken per HTTP request edgartools sends, not per library call: `obj()`
+# alone fetches the filing index and the main document, sometimes exhibits too.
+_edgar_limiter = threading.local()
+_send_request = httpx.HTTPTransport.handle_request
+
+
+def _throttled_send(transport: httpx.HTTPTransport, request: httpx.Request) -> httpx.Response:
+    if (rate_limiter := getattr(_edgar_limiter, "current", None)) is not None:
+        rate_limiter.acquire()
+    return _send_request(transport, request)
+
+
+httpx.HTTPTransport.handle_request = _throttled_send
+
+
+@contextmanager
+def _throttle(rate_limiter: UpstreamLimiter | None):
+    """Makes every HTTP request this thread sends take a permit from `rate_limiter`.
+
+    Responses edgartools serves from its cache never reach the transport, so they
+    cost nothing.
+    """
+    previous = getattr(_edgar_limiter, "current", None)
+    _edgar_limiter.current = rate_limiter or previous
+    try:
+        yield
+    finally:
+        _edgar_limiter.current = previous
+
+
+def list_10ks(ticker: str, rate_limiter: UpstreamLimiter | None = None):
+    """A ticker's 10-K filing entries, newest first (possibly empty).
+
+    Costs two EDGAR requests (company submissions and filing index); documents are
+    only fetched by `save_filing`.
+    """
+    with _throttle(rate_limiter):
+        return Company(ticker).get_filings(form="10-K")
+
+
+def latest_10k(ticker: str, rate_limiter: UpstreamLimiter | None = None):
+    """The latest 10-K filing entry of a ticker, or None."""
+    filings = list_10ks(ticker, rate_limiter)
+    return filings.latest() if filings else None
+
+
+def save_filing(
+    latest_filing,
     ticker: str,
     company_name: str,
     gics_sector: str,
     folder=settings.RAW_DATA_DIR,
+    rate_limiter: UpstreamLimiter | None = None,
+    history: bool = False,
 ) -> None:
+    """Downloads a 10-K and writes its sections and `{TICKER}_metadata.json` to `folder`.
+
+    Section files of an older filing are replaced. The metadata file is written last,
+    so an interrupted download still carries the old accession number and is retried.
+    With `history`, file names carry the fiscal year (`{TICKER}_{section}_{FY}.txt`).
+    """
+    with _throttle(rate_limiter):
+        tenk: TenK = latest_filing.obj()
+        # Sections are parsed lazily and may fetch the document
+        sections = {
+            name: _safe_get_section(tenk, attr, ticker, name) for name, attr in SECTIONS.items()
+        }
+
+    document_metadata = {
+        "ticker": ticker,
+        "company_name": company_name,
+        "gics_sector": gics_sector,
+        "filing_url": latest_filing.filing_url,
+        "accession_number": latest_filing.accession_number,
+        "period_of_report": str(latest_filing.period_of_report),
+        "homepage_url": getattr(latest_filing, "homepage_url", latest_filing.filing_url),
+    }
+    document_metadata["fiscal_year"] = fiscal_year(document_metadata)
+    suffix = f"_{document_metadata['fiscal_year']}" if history else ""
+
+    for section_name, content in sections.items():
+        file_path = folder / f"{ticker}_{section_name}{suffix}.txt"
+        if content:
+            file_path.write_text(content, encoding="utf-8")
+            logger.info("  ✅ Saved %s", file_path.name)
+        else:
+            file_path.unlink(missing_ok=True)
+            logger.warning("  ⚠️  Could not find %s for %s", section_name, ticker)
+
+    metadata_path = folder / f"{ticker}{suffix}_metadata.json"
+    metadata_path.write_text(json.dumps(document_metadata, indent=2), encoding="utf-8")
+    logger.info("  ✅ Saved %s%s metadata.", ticker, suffix)
+
+
+def _stored_history(ticker: str, folder: Path) -> dict[int, str | None]:
+    """Fiscal year → accession number of the history filings already downloaded."""
+    stored = {}
+    for path in folder.glob(f"{ticker}_*_metadata.json"):
+        year = path.stem.split("_")[1]
+        if year.isdigit():
+            metadata = json.loads(path.read_text(encoding="utf-8"))
+            stored[int(year)] = metadata.get("accession_number")
+    return stored
+
+
+def download_history(
+    ticker: str,
+    company_name: str,
+    gics_sector: str,
+    years: int,
+    latest_year: int | None = None,
+    folder: Path | None = None,
+    rate_limiter: UpstreamLimiter | None = None,
+    recorder: ChangeRecorder | None = None,
+) -> list[int]:
+    """Keeps the `years` 10-Ks before the latest one in the history folder.
+
+    Fiscal years already downloaded with the same accession number are skipped, and
+    years that fell out of the window are deleted. When `latest_year` is known and
+    every expected year is on disk, EDGAR is not asked at all. With a `recorder`,
+    each year is recorded in the change set before its files change.
+
+    Returns the fiscal years that were downloaded or deleted.
+    """
+    folder = folder or default_history_raw_dir()
+    os.makedirs(folder, exist_ok=True)
+    stored = _stored_history(ticker, folder)
+    if latest_year is not None and all(
+        latest_year - i in stored for i in range(1, years + 1)
+    ):
+        return []
+
+    filings = list_10ks(ticker, rate_limiter)
+    if not filings:
+        return []
+    wanted = {}  # fiscal year → filing, newest first, skipping the latest filing
+    latest_year = fiscal_year({"period_of_report": str(filings.latest().period_of_report)})
+    for filing in filings:
+        if len(wanted) == years or latest_year is None:
+            break
+        year = fiscal_year({"period_of_report": str(filing.period_of_report)})
+        if filing.form == "10-K" and year is not None and year < latest_year:
+            wanted.setdefault(year, filing)
+
+    changed = []
+    for year, filing in wanted.items():
+        if stored.get(year) != filing.accession_number:
+            logger.info("📚 Fetching %s FY%d 10-K...", ticker, year)
+            if recorder is not None:
+                recorder.record(ticker, {"history_years": [year]})
+            save_filing(filing, ticker, company_name, gics_sector, folder, rate_limiter, True)
+            changed.append(year)
+    for year in stored.keys() - wanted.keys():
+        if recorder is not None:
+            recorder.record(ticker, {"history_years": [year]})
+        remove_ticker(ticker, folder, year)
+        changed.append(year)
+    return sorted(changed)
+
+
+def download_financial_sections(
+    ticker: str,
+    company_name: str,
+    gics_sector: str,
+    folder=settings.RAW_DATA_DIR,
+    rate_limiter: UpstreamLimiter | None = None,
+) -> DownloadStatus:
     """
     Downloads key sections of the latest 10-K for a ticker.
     Saves them as separate .txt files for granular RAG.
     Also saves document metadata including the original SEC filing URL.
     Skips the ticker if already downloaded.
+
+    Every EDGAR round trip first takes a permit from `rate_limiter`, so concurrent
+    workers sharing one bucket stay under EDGAR's request allowance.
     """
     os.makedirs(folder, exist_ok=True)
 
@@ -74,68 +354,402 @@ def download_financial_sections(
     metadata_path = folder / f"{ticker}_metadata.json"
     if metadata_path.exists():
         logger.info("⏭️  Skipping %s (already downloaded).", ticker)
-        return
+        return "skipped"
 
     logger.info("🔍 Fetching 10-K for %s from EDGAR...", ticker)
 
-    edgar_company = Company(ticker)
-    filings = edgar_company.get_filings(form="10-K")
-
-    if not filings:
+    latest_filing = latest_10k(ticker, rate_limiter)
+    if latest_filing is None:
         logger.warning("❌ No 10-K found for %s", ticker)
-        return
+        return "missing"
 
-    latest_filing = filings.latest()
-    tenk: TenK = latest_filing.obj()
+    save_filing(latest_filing, ticker, company_name, gics_sector, folder, rate_limiter)
+    return "downloaded"
 
-    document_metadata = {
-        "ticker": ticker,
-        "company_name": company_name,
-        "gics_sector": gics_sector,
-        "filing_url": latest_filing.filing_url,
+
+def refresh_filing(
+    ticker: str,
+    company_name: str,
+    gics_sector: str,
+    folder=settings.RAW_DATA_DIR,
+    rate_limiter: UpstreamLimiter | None = None,
+    recorder: ChangeRecorder | None = None,
+) -> tuple[RefreshStatus, dict | None]:
+    """Downloads a ticker's latest 10-K only if its accession number differs from the stored one.
+
+    Returns the status and, for an added or updated filing, its change set entry, which
+    a `recorder` writes to the change set before the download starts.
+    """
+    os.makedirs(folder, exist_ok=True)
+    metadata_path = folder / f"{ticker}_metadata.json"
+    stored = (
+        json.loads(metadata_path.read_text(encoding="utf-8")) if metadata_path.exists() else {}
+    )
+
+    latest_filing = latest_10k(ticker, rate_limiter)
+    if latest_filing is None:
+        logger.warning("❌ No 10-K found for %s", ticker)
+        return "missing", None
+    if stored.get("accession_number") == latest_filing.accession_number:
+        return "unchanged", None
+
+    logger.info(
+        "🆕 %s: %s → %s",
+        ticker,
+        stored.get("accession_number", "not downloaded"),
+        latest_filing.accession_number,
+    )
+    status: RefreshStatus = "updated" if stored else "added"
+    change = {
+        "change": status,
         "accession_number": latest_filing.accession_number,
-        "period_of_report": str(latest_filing.period_of_report),
-        "homepage_url": getattr(latest_filing, "homepage_url", latest_filing.filing_url),
+        "previous_accession_number": stored.get("accession_number"),
     }
+    if recorder is not None:
+        recorder.record(ticker, change)
+    save_filing(latest_filing, ticker, company_name, gics_sector, folder, rate_limiter)
+    return status, change
 
-    sections = {
-        "business": _safe_get_section(tenk, "business", ticker, "business"),
-        "risks": _safe_get_section(tenk, "risk_factors", ticker, "risks"),
-        "mnda": _safe_get_section(tenk, "management_discussion", ticker, "mnda"),
-    }
 
-    for section_name, content in sections.items():
-        if content:
-            file_path = folder / f"{ticker}_{section_name}.txt"
-            file_path.write_text(content, encoding="utf-8")
-            logger.info("  ✅ Saved %s_%s.txt", ticker, section_name)
-        else:
-            logger.warning("  ⚠️  Could not find %s for %s", section_name, ticker)
+def remove_ticker(ticker: str, folder=settings.RAW_DATA_DIR, year: int | None = None) -> None:
+    """Deletes the raw files of a company that left the index (or of one history year)."""
+    suffix = f"_{year}" if year is not None else ""
+    for section_name in SECTIONS:
+        (folder / f"{ticker}_{section_name}{suffix}.txt").unlink(missing_ok=True)
+    (folder / f"{ticker}{suffix}_metadata.json").unlink(missing_ok=True)
+    logger.info("🗑️  Removed raw files of %s%s", ticker, suffix)
 
-    metadata_path.write_text(json.dumps(document_metadata, indent=2), encoding="utf-8")
-    logger.info("  ✅ Saved %s metadata.", ticker)
 
+def _latest_year(ticker: str, folder=settings.RAW_DATA_DIR) -> int | None:
+    metadata_path = folder / f"{ticker}_metadata.json"
+    if not metadata_path.exists():
+        return None
+    return fiscal_year(json.loads(metadata_path.read_text(encoding="utf-8")))
 
-if __name__ == "__main__":
-    sp500 = get_sp500_companies()
 
-    failed: list[str] = []
-    for i, entry in enumerate(sp500, start=1):
-        t = entry["ticker"]
-        logger.info("--- [%d/%d] %s ---", i, len(sp500), t)
+def _download(
+    entry: dict,
+    rate_limiter: UpstreamLimiter,
+    history_years: int = 0,
+    folder=settings.RAW_DATA_DIR,
+) -> DownloadStatus:
+    status = download_financial_sections(
+        ticker=entry["ticker"],
+        company_name=entry["company_name"],
+        gics_sector=entry["gics_sector"],
+        folder=folder,
+        rate_limiter=rate_limiter,
+    )
+    if history_years and status != "missing":
+        download_history(
+            entry["ticker"],
+            entry["company_name"],
+            entry["gics_sector"],
+            history_years,
+            latest_year=_latest_year(entry["ticker"], folder),
+            folder=default_history_raw_dir(folder),
+            rate_limiter=rate_limiter,
+        )
+    return status
+
+
+def _refresh(
+    entry: dict,
+    rate_limiter: UpstreamLimiter,
+    recorder: ChangeRecorder,
+    history_years: int = 0,
+    folder=settings.RAW_DATA_DIR,
+) -> tuple[RefreshStatus, dict | None]:
+    status, _ = refresh_filing(
+        ticker=entry["ticker"],
+        company_name=entry["company_name"],
+        gics_sector=entry["gics_sector"],
+        folder=folder,
+        rate_limiter=rate_limiter,
+        recorder=recorder,
+    )
+    if history_years and status != "missing":
+        download_history(
+            entry["ticker"],
+            entry["company_name"],
+            entry["gics_sector"],
+            history_years,
+            latest_year=_latest_year(entry["ticker"], folder),
+            folder=default_history_raw_dir(folder),
+            rate_limiter=rate_limiter,
+            recorder=recorder,
+        )
+    return status, recorder.changes.get(entry["ticker"])
+
+
+def _with_retry(task: Callable, entry: dict, rate_limiter: UpstreamLimiter, max_retries: int):
+    """Runs `task` for one ticker, retrying transient failures with exponential backoff.
+
+    Returns the task's result and the number of retries that were needed.
+    """
+    for attempt in range(max_retries + 1):
         try:
-            download_financial_sections(
-                ticker=t,
-                company_name=entry["company_name"],
-                gics_sector=entry["gics_sector"],
+            return task(entry, rate_limiter), attempt
+        except TRANSIENT_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            # 1s, 2s, 4s, ... plus jitter so retrying workers don't stampede together
+            delay = 2**attempt + random.uniform(0, 1)
+            logger.warning(
+                "🔁 %s failed (%s), retry %d/%d in %.1fs",
+                entry["ticker"],
+                e,
+                attempt + 1,
+                max_retries,
+                delay,
             )
-        except (OSError, RuntimeError, KeyError, ValueError, CompanyNotFoundError) as e:
-            logger.error("❌ Failed for %s: %s", t, e)
-            failed.append(t)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
 
-        # Respect EDGAR's rate limits (10 req/sec max, be conservative)
-        time.sleep(0.5)
 
-    logger.info("✅ Done. %d/%d tickers succeeded.", len(sp500) - len(failed), len(sp500))
+def _run_pool(
+    task: Callable,
+    companies: list[dict],
+    rate_limiter: UpstreamLimiter,
+    max_workers: int,
+    max_retries: int,
+) -> tuple[dict[str, object], list[str], int]:
+    """Runs `task` for every company on a worker pool sharing `rate_limiter`.
+
+    Returns ticker → result for the tickers that succeeded, the failed tickers and
+    the total number of retries.
+    """
+    results: dict[str, object] = {}
+    failed: list[str] = []
+    retries = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="edgar") as pool:
+        futures = {
+            pool.submit(_with_retry, task, entry, rate_limiter, max_retries): entry["ticker"]
+            for entry in companies
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            ticker = futures[future]
+            try:
+                result, attempts = future.result()
+                results[ticker] = result
+                retries += attempts
+                status = result[0] if isinstance(result, tuple) else result
+                logger.info("--- [%d/%d] %s: %s ---", i, len(companies), ticker, status)
+            except (*TRANSIENT_ERRORS, *PERMANENT_ERRORS) as e:
+                logger.error("❌ Failed for %s: %s", ticker, e)
+                failed.append(ticker)
+    return results, sorted(failed), retries
+
+
+def _write_summary(summary_path: Path, summary: dict) -> None:
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    logger.info("📊 Throughput summary written to %s", summary_path)
+
+
+def run_ingestion(
+    companies: list[dict],
+    max_workers: int = settings.EDGAR_MAX_WORKERS,
+    requests_per_second: float = settings.EDGAR_REQUESTS_PER_SECOND,
+    max_retries: int = settings.EDGAR_MAX_RETRIES,
+    summary_path=settings.DATA_DIR / "ingest_summary.json",
+    history_years: int = settings.HISTORY_YEARS,
+    folder=settings.RAW_DATA_DIR,
+) -> dict:
+    """Downloads all companies into `folder` with a worker pool sharing the EDGAR limiter.
+
+    With `history_years`, each company's earlier 10-Ks are kept in `folder`/history too.
+    Writes a throughput summary to `summary_path` and returns it.
+    """
+    rate_limiter = get_limiter("edgar", requests_per_second)
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+
+    logger.info(
+        "🚚 Ingesting %d tickers with %d workers at %.1f req/s...",
+        len(companies),
+        max_workers,
+        requests_per_second,
+    )
+    task = partial(_download, history_years=history_years, folder=folder)
+    results, failed, retries = _run_pool(task, companies, rate_limiter, max_workers, max_retries)
+    counts = {"downloaded": 0, "skipped": 0, "missing": 0}
+    for status in results.values():
+        counts[status] += 1
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "started_at": started_at.isoformat(),
+        "elapsed_seconds": round(elapsed, 2),
+        "max_workers": max_workers,
+        "requests_per_second": requests_per_second,
+        "total": len(companies),
+        **counts,
+        "failed": failed,
+        "retries": retries,
+        "tickers_per_second": round(len(companies) / elapsed, 3) if elapsed else None,
+        "downloads_per_second": round(counts["downloaded"] / elapsed, 3) if elapsed else None,
+    }
+
+    logger.info(
+        "✅ Done in %.1fs. %d/%d tickers succeeded (%d downloaded, %d skipped), %d retries.",
+        elapsed,
+        len(companies) - len(failed),
+        len(companies),
+        counts["downloaded"],
+        counts["skipped"],
+        retries,
+    )
     if failed:
         logger.warning("Failed tickers: %s", failed)
+    _write_summary(summary_path, summary)
+    return summary
+
+
+def run_refresh(
+    companies: list[dict],
+    max_workers: int = settings.EDGAR_MAX_WORKERS,
+    requests_per_second: float = settings.EDGAR_REQUESTS_PER_SECOND,
+    max_retries: int = settings.EDGAR_MAX_RETRIES,
+    folder=settings.RAW_DATA_DIR,
+    summary_path=settings.DATA_DIR / "ingest_summary.json",
+    changeset_path: Path | None = None,
+    history_years: int = settings.HISTORY_YEARS,
+) -> dict:
+    """Brings `folder` up to date with the constituent list and EDGAR's latest 10-Ks.
+
+    1. Diffs the stored tickers against `companies`: new constituents are downloaded,
+       companies that left the index have their raw files removed.
+    2. For every other company, compares the latest 10-K accession number (two cheap
+       EDGAR requests) with the stored one and re-downloads only the filings that changed.
+       With `history_years`, the earlier 10-Ks are brought up to date as well; only
+       companies whose latest filing changed or whose history is incomplete cost
+       extra EDGAR requests.
+    3. Merges the added, updated and removed tickers (and those with new history) into
+       the pending change set that `scripts/index.py --changeset` applies, each one
+       before its raw files change, so an interrupted refresh loses no change.
+
+    Writes a summary to `summary_path` and returns it.
+    """
+    recorder = ChangeRecorder(changeset_path or default_changeset_path(folder))
+    rate_limiter = get_limiter("edgar", requests_per_second)
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+
+    stored = {path.stem.removesuffix("_metadata"): path for path in folder.glob("*_metadata.json")}
+    current = {entry["ticker"] for entry in companies}
+    removed = sorted(stored.keys() - current)
+    logger.info(
+        "🔄 Refreshing %d tickers (%d stored, %d new, %d left the index) "
+        "with %d workers at %.1f req/s...",
+        len(companies),
+        len(stored),
+        len(current - stored.keys()),
+        len(removed),
+        max_workers,
+        requests_per_second,
+    )
+
+    task = partial(_refresh, recorder=recorder, history_years=history_years, folder=folder)
+    results, failed, retries = _run_pool(task, companies, rate_limiter, max_workers, max_retries)
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "missing": 0, "removed": 0}
+    for status, _ in results.values():
+        counts[status] += 1
+
+    if stored and len(removed) > MAX_REMOVED_FRACTION * len(stored):
+        logger.error(
+            "❌ %d of %d stored companies are missing from the constituent list; "
+            "not removing any. Check data/constituents.json.",
+            len(removed),
+            len(stored),
+        )
+    else:
+        for ticker in removed:
+            previous = json.loads(stored[ticker].read_text(encoding="utf-8"))
+            recorder.record(
+                ticker,
+                {
+                    "change": "removed",
+                    "accession_number": None,
+                    "previous_accession_number": previous.get("accession_number"),
+                },
+            )
+            remove_ticker(ticker, folder)
+            history_dir = default_history_raw_dir(folder)
+            for year in _stored_history(ticker, history_dir):
+                remove_ticker(ticker, history_dir, year)
+            counts["removed"] += 1
+
+    changes = recorder.changes
+    if changes:
+        logger.info(
+            "🧾 Recorded %d changes; %d tickers pending in %s",
+            len(changes),
+            len(load_changeset(recorder.path)),
+            recorder.path,
+        )
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "mode": "refresh",
+        "started_at": started_at.isoformat(),
+        "elapsed_seconds": round(elapsed, 2),
+        "max_workers": max_workers,
+        "requests_per_second": requests_per_second,
+        "total": len(companies),
+        **counts,
+        "failed": failed,
+        "retries": retries,
+        "changes": changes,
+        "tickers_per_second": round(len(companies) / elapsed, 3) if elapsed else None,
+    }
+
+    logger.info(
+        "✅ Refresh done in %.1fs: %d added, %d updated, %d unchanged, %d removed, "
+        "%d failed, %d retries.",
+        elapsed,
+        counts["added"],
+        counts["updated"],
+        counts["unchanged"],
+        counts["removed"],
+        len(failed),
+        retries,
+    )
+    if failed:
+        logger.warning("Failed tickers: %s", failed)
+    _write_summary(summary_path, summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=settings.EDGAR_MAX_WORKERS)
+    parser.add_argument("--rate", type=float, default=settings.EDGAR_REQUESTS_PER_SECOND)
+    parser.add_argument("--retries", type=int, default=settings.EDGAR_MAX_RETRIES)
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-download only filings with a new accession number and write a change set.",
+    )
+    parser.add_argument(
+        "--history-years",
+        type=int,
+        default=settings.HISTORY_YEARS,
+        help="Also keep this many earlier 10-Ks per company in data/raw/history.",
+    )
+    parser.add_argument(
+        "--constituents-max-age",
+        type=float,
+        default=settings.CONSTITUENTS_MAX_AGE_HOURS,
+        help="Hours before the cached S&P 500 list is fetched again (0 always fetches).",
+    )
+    args = parser.parse_args()
+
+    run = run_refresh if args.refresh else run_ingestion
+    run(
+        load_constituents(max_age_hours=args.constituents_max_age),
+        max_workers=args.workers,
+        requests_per_second=args.rate,
+        max_retries=args.retries,
+        history_years=args.history_years,
+    )
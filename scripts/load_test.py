@@ -0,0 +1,189 @@
+"""Load test: throughput of the sync graph path against the async one as concurrency grows.
+
+Builds a small synthetic corpus (see benchmark.py) and replaces the OpenAI clients with
+the fakes in fakes.py, so every LLM and embedding call only waits its configured
+latency. Each round runs `--concurrency` closed-loop clients over the same questions:
+
+- sync: each client calls `app.invoke` in its own thread. At most `--sync-slots`
+  requests run at once, like Cloud Run's `--concurrency` with one blocking thread each.
+- async: each client is a coroutine awaiting `app.ainvoke` on the shared event loop
+  (services/event_loop.py), the path the chat uses with ASYNC_GRAPH.
+
+    python scripts/load_test.py --concurrency 5,20,50 --questions 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")  # the fakes never call the API
+os.environ.setdefault("EDGAR_IDENTITY", "load-test load-test@example.com")
+os.environ.setdefault("DEEP_FINANCIAL_RESEARCH_PASSWORD", "offline")
+
+from benchmark import make_questions, respond, write_corpus  # noqa: E402
+from fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from utils.config import settings  # noqa: E402
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class ThreadSampler:
+    """Records the peak number of live threads while a round runs."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_sync(app, questions: list[str], clients: int, slots: int) -> list[float]:
+    """`clients` threads share the questions; at most `slots` are inside the graph."""
+    pending = iter(questions)
+    lock, gate = threading.Lock(), threading.BoundedSemaphore(slots)
+    latencies: list[float] = []
+
+    def client():
+        while True:
+            with lock:
+                question = next(pending, None)
+            if question is None:
+                return
+            start = time.perf_counter()
+            with gate:
+                app.invoke({"question": question})
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+async def run_async(app, questions: list[str], clients: int) -> list[float]:
+    """`clients` coroutines share the questions on one event loop."""
+    pending = iter(questions)
+    latencies: list[float] = []
+
+    async def client():
+        for question in pending:  # shared iterator: each question is asked once
+            start = time.perf_counter()
+            await app.ainvoke({"question": question})
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies
+
+
+def measure(mode: str, clients: int, fn) -> dict:
+    with ThreadSampler() as threads:
+        start = time.perf_counter()
+        latencies = fn()
+        wall = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "concurrency": clients,
+        "questions": len(latencies),
+        "throughput_qps": len(latencies) / wall,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "peak_threads": threads.peak,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="5,20,50")
+    parser.add_argument("--questions", type=int, default=200, help="Questions per round.")
+    parser.add_argument("--companies", type=int, default=30)
+    parser.add_argument("--sync-slots", type=int, default=5, help="Concurrent sync requests.")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per LLM call.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per word.")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Seconds per call.")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON here.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before the graph modules are imported: some read these paths at import time
+        settings.RAW_DATA_DIR = Path(tmp) / "raw"
+        settings.INDEX_DIR = Path(tmp) / "index"
+        settings.EMBEDDING_CACHE_PATH = Path(tmp) / "embeddings.sqlite"
+        settings.RERANK_ENABLED = False
+        settings.RAW_DATA_DIR.mkdir()
+        write_corpus(settings.RAW_DATA_DIR, args.companies, 1000)
+
+        from index import run_indexing
+        from services.embeddings import get_embeddings
+        from services.event_loop import run
+        from services.llm import set_llm_factory
+        from services.tracing import token_usage
+
+        run_indexing(full_rebuild=True, embeddings=FakeEmbeddings())
+        get_embeddings().underlying = FakeEmbeddings(latency=args.embed_latency)
+        set_llm_factory(
+            lambda model: FakeChatModel(
+                model=model,
+                respond=respond,
+                latency=args.llm_latency,
+                token_latency=args.token_latency,
+                callbacks=[token_usage],
+            )
+        )
+        from graph.blueprint import app
+
+        results = []
+        for clients in [int(c) for c in args.concurrency.split(",")]:
+            # Fresh questions per round, so the query-embedding LRU favours neither mode
+            questions = make_questions(args.companies, args.questions)
+            suffix = f" (round {clients})"
+            sync_questions = [q + suffix + " [sync]" for q in questions]
+            async_questions = [q + suffix + " [async]" for q in questions]
+            print(f"Concurrency {clients}...", file=sys.stderr)
+            results.append(
+                measure(
+                    "sync",
+                    clients,
+                    lambda: run_sync(app, sync_questions, clients, min(clients, args.sync_slots)),
+                )
+            )
+            results.append(
+                measure("async", clients, lambda: run(run_async(app, async_questions, clients)))
+            )
+
+    print(
+        f"\n{'mode':<6} {'clients':>7} {'q/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'threads':>7} {'gain':>6}"
+    )
+    for sync, async_ in zip(results[::2], results[1::2]):
+        for r in (sync, async_):
+            gain = r["throughput_qps"] / sync["throughput_qps"]
+            print(
+                f"{r['mode']:<6} {r['concurrency']:>7} {r['throughput_qps']:>8.2f} "
+                f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['peak_threads']:>7} {gain:>5.1f}x"
+            )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
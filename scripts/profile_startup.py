@@ -0,0 +1,69 @@
+"""Profiles cold start: import time per module, then init time per warm-up step.
+
+Imports are measured with `python -X importtime` in a fresh interpreter, so nothing is
+already cached in sys.modules; the warm-up steps (services/warmup.py) then run in this
+process and report how long each singleton took to create.
+
+    python scripts/profile_startup.py --top 25
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+FIRST_PARTY = ("components", "graph", "nodes", "services", "tools", "utils")
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every module imported by `module`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)},
+    )
+    if completed.returncode:
+        sys.exit(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _print_rows(title: str, rows: list[tuple[str, int, int]]) -> None:
+    print(f"\n{title}\n{'module':<50} {'self ms':>9} {'cumul. ms':>10}")
+    for name, self_us, cumulative_us in rows:
+        print(f"{name:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="graph.blueprint", help="Module to import.")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--no-warmup", action="store_true", help="Only profile the imports.")
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total_ms = max(cumulative for _, _, cumulative in rows) / 1000
+    by_cumulative = sorted(rows, key=lambda row: -row[2])
+    top_level = [row for row in by_cumulative if "." not in row[0]]
+    first_party = [row for row in by_cumulative if row[0].split(".")[0] in FIRST_PARTY]
+
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(rows)} modules")
+    _print_rows("Top-level packages by cumulative import time", top_level[: args.top])
+    _print_rows("Project modules by cumulative import time", first_party[: args.top])
+
+    if not args.no_warmup:
+        from services.warmup import run_warmup
+
+        snapshot = run_warmup()
+        print(f"\n{'warm-up step':<15} {'status':<8} {'seconds':>8}")
+        for name, step in snapshot["steps"].items():
+            print(f"{name:<15} {step['status']:<8} {step['seconds'] or 0:>8.2f}")
+            if "error" in step:
+                print(f"    {step['error']}")
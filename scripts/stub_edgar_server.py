@@ -0,0 +1,123 @@
+"""Local stand-in for EDGAR, for offline checks of the ingestion rate limiting.
+
+Serves a company's filing list, a filing index and a 10-K document for any ticker, with a
+configurable latency. Like EDGAR, it answers 429 once more than `--max-rate` requests
+arrived in the last second, and it can fail the first request of every `--fail-every`-th
+ticker with a 503 so that retries and backoff are exercised. Every request is logged with
+its arrival time and status (`server.requests`). `fakes.FakeEdgarCompany` is the client.
+
+    python scripts/stub_edgar_server.py --port 8766 --max-rate 10
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DOCUMENT = {
+    "business": "We design, manufacture and sell products and services. " * 40,
+    "risk_factors": "Our results depend on demand, supply and regulation. " * 40,
+    "management_discussion": "Revenue grew while margins narrowed. " * 40,
+}
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8766,
+    latency: float = 0.02,
+    max_rate: int = 10,
+    fail_every: int = 0,
+) -> ThreadingHTTPServer:
+    """Builds (but does not start) a stub EDGAR server.
+
+    `server.requests` lists (arrival time, ticker, path, status) for every request.
+    """
+    lock = threading.Lock()
+    recent: deque[float] = deque()  # arrival times of the last second
+    requests: list[tuple[float, str, str, int]] = []
+    failed_once: set[str] = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # keep check output readable
+            pass
+
+        def _reply(self, status: int, body: dict) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _status(self, ticker: str) -> int:
+            now = time.monotonic()
+            with lock:
+                while recent and recent[0] <= now - 1.0:
+                    recent.popleft()
+                recent.append(now)
+                if len(recent) > max_rate:
+                    status = 429
+                elif (
+                    fail_every
+                    and ticker not in failed_once
+                    and sum(map(ord, ticker)) % fail_every == 0
+                ):
+                    failed_once.add(ticker)
+                    status = 503
+                else:
+                    status = 200
+                requests.append((now, ticker, self.path, status))
+            return status
+
+        def do_GET(self):
+            # /submissions/{T}.json, /filings/{T}.json, /Archives/{T}/{acc}/index.json
+            # and /Archives/{T}/{acc}/document.json
+            parts = self.path.strip("/").split("/")
+            ticker = parts[1].removesuffix(".json") if len(parts) > 1 else ""
+            if (status := self._status(ticker)) != 200:
+                self._reply(status, {"error": "Request rate threshold exceeded"})
+                return
+            time.sleep(latency)
+
+            if parts[0] == "submissions":
+                self._reply(200, {"ticker": ticker, "name": f"{ticker} Inc."})
+            elif parts[0] == "filings":
+                self._reply(
+                    200,
+                    {
+                        "filings": [
+                            {
+                                "form": "10-K",
+                                "accession_number": f"0000000000-{year % 100}-{ticker}",
+                                "period_of_report": f"{year}-12-31",
+                            }
+                            for year in (2025, 2024, 2023, 2022)
+                        ]
+                    },
+                )
+            elif parts[0] == "Archives" and parts[-1] == "index.json":
+                self._reply(200, {"documents": ["document.json"]})
+            elif parts[0] == "Archives":
+                self._reply(200, _DOCUMENT)
+            else:
+                self._reply(404, {"error": "not found"})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.requests = requests  # type: ignore[attr-defined]
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per request.")
+    parser.add_argument("--max-rate", type=int, default=10, help="Requests per second.")
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.max_rate, args.fail_every)
+    print(f"Stub EDGAR server on http://{args.host}:{args.port}")
+    server.serve_forever()
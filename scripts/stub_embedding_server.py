@@ -0,0 +1,115 @@
+"""Local stand-in for the OpenAI embeddings endpoint, for offline indexing benchmarks.
+
+Serves `POST /v1/embeddings` with deterministic unit vectors, a configurable latency per
+request and per token, and 429 responses once more than `--max-concurrent` requests are
+in flight, so the indexer's concurrency and backoff can be exercised without an API key.
+
+    python scripts/stub_embedding_server.py --port 8765 --latency 0.3
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def stub_vector(text: str, dims: int) -> np.ndarray:
+    """Deterministic unit vector for `text`."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dims, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    latency: float = 0.3,
+    per_token_latency: float = 0.0,
+    max_concurrent: int = 8,
+    dims: int = 1536,
+) -> ThreadingHTTPServer:
+    """Builds (but does not start) a stub embeddings server."""
+    slots = threading.BoundedSemaphore(max_concurrent)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # keep benchmark output readable
+            pass
+
+        def _reply(self, status: int, body: dict, headers: dict | None = None) -> None:
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/embeddings"):
+                self._reply(404, {"error": {"message": "not found"}})
+                return
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+            if not slots.acquire(blocking=False):
+                self._reply(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests"}},
+                    {"Retry-After": "1"},
+                )
+                return
+            try:
+                inputs = request["input"]
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                # Token-id inputs are hashed by their ids; text inputs by their content
+                texts = [x if isinstance(x, str) else ",".join(map(str, x)) for x in inputs]
+                tokens = sum(len(x) // 4 if isinstance(x, str) else len(x) for x in inputs)
+                time.sleep(latency + tokens * per_token_latency)
+
+                base64_output = request.get("encoding_format") == "base64"
+                data = []
+                for i, text in enumerate(texts):
+                    vector = stub_vector(text, request.get("dimensions") or dims)
+                    embedding = (
+                        base64.b64encode(vector.tobytes()).decode("ascii")
+                        if base64_output
+                        else vector.tolist()
+                    )
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+            finally:
+                slots.release()
+
+            self._reply(
+                200,
+                {
+                    "object": "list",
+                    "data": data,
+                    "model": request.get("model", "stub"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                },
+            )
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per request.")
+    parser.add_argument("--per-token-latency", type=float, default=0.0)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--dims", type=int, default=1536)
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port, args.latency, args.per_token_latency, args.max_concurrent, args.dims
+    )
+    print(f"Stub embeddings server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
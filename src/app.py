@@ -3,13 +3,21 @@
 import streamlit as st
 
 from components.auth import check_password
-from components.chat import render_chat
 from components.header import render_header
+from services.warmup import start_warmup
 
 st.set_page_config(page_title="Deep Financial Research", page_icon="📈")
 
-if not check_password():
+authenticated = check_password()
+
+# The login page is on screen; load the graph, index and models while the user signs in
+start_warmup()
+
+if not authenticated:
     st.stop()
 
+# Imported here so the first paint does not wait for LangChain, Chroma and the graph
+from components.chat import render_chat  # noqa: E402
+
 render_header()
 render_chat()
@@ -1,21 +1,44 @@
 """Chat interface component."""
 
+import time
 import traceback
+import uuid
 
 import streamlit as st
 
 from graph.blueprint import app
-from services.rate_limit import check_rate_limit
+from nodes.reply import citation_filter_for
+from services.answer_cache import answer_cache
+from services.event_loop import iterate, run
+from services.metrics import registry
+from services.rate_limit import admission, check_rate_limit
+from services.tracing import trace
+from utils.config import settings
 from utils.logging import logger
 
 STATUS_MESSAGES = {
     "supervisor": "🤔 Analyzing your question...",
     "extractor": "🏢 Identifying company and filing section...",
+    "prefetch": "🏢 Identifying company and filing section...",
     "search": "🔍 Searching SEC filings for relevant data...",
+    "merge": "📚 Combining results across companies...",
     "reply": "✍️ Generating detailed response...",
     "clarify": "💡 Processing clarification...",
 }
 
+# Nodes whose LLM tokens are streamed straight into the chat
+STREAMED_NODES = {"reply", "clarify"}
+
+time_to_first_token = registry.histogram(
+    "reply_time_to_first_token_seconds",
+    "Seconds from submitting a question to the first streamed answer token.",
+)
+
+CACHE_LABELS = {
+    "exact": "⚡ Answer served from cache",
+    "semantic": "⚡ Answer served from cache (similar question)",
+}
+
 
 def _init_session_state():
     """Initialize session state variables for the chat."""
@@ -25,6 +48,8 @@ def _init_session_state():
         st.session_state.is_processing = False
     if "pending_prompt" not in st.session_state:
         st.session_state.pending_prompt = None
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex  # admission control's fairness key
 
 
 def _display_chat_history():
@@ -49,46 +74,140 @@ def _handle_input():
         st.rerun()
 
 
+def _stream_graph(inputs: dict, status, executed_steps: list, graph_state: dict, started: float):
+    """Runs the graph and yields reply text as it is generated.
+
+    Node updates drive the status panel and accumulate into `graph_state`; LLM tokens
+    from the reply/clarify nodes are yielded as they arrive, with reply tokens passed
+    through the same citation filter reply_node applies to the final answer.
+    """
+    citation_filter = None
+    streamed_any = False
+
+    stream_mode = ["updates", "messages"]
+    if settings.ASYNC_GRAPH:  # on the shared event loop; this thread only relays chunks
+        stream = iterate(app.astream(inputs, stream_mode=stream_mode))
+    else:
+        stream = app.stream(inputs, stream_mode=stream_mode)
+
+    for mode, payload in stream:
+        if mode == "updates":
+            for node_name, output in payload.items():
+                if node_name in STATUS_MESSAGES:
+                    status.update(label=STATUS_MESSAGES[node_name], state="running")
+                graph_state.update(output or {})
+            continue
+
+        message, metadata = payload
+        node_name = metadata.get("langgraph_node")
+        if node_name not in STREAMED_NODES or not isinstance(message.content, str):
+            continue
+
+        text = message.content
+        if node_name == "reply":
+            if citation_filter is None:
+                citation_filter = citation_filter_for(graph_state.get("search_results") or [])
+            text = citation_filter.feed(text)
+        if not text:
+            continue
+
+        if not streamed_any:
+            ttft = time.perf_counter() - started
+            time_to_first_token.observe(ttft, node=node_name)
+            executed_steps.append(f"First token after {ttft:.2f}s")
+            logger.info("Time to first token: %.2fs", ttft)
+            streamed_any = True
+        yield text
+
+    if citation_filter is not None and (rest := citation_filter.flush()):
+        yield rest
+
+    # Paths without a streamed LLM reply (UNSUPPORTED, unknown company, no results)
+    if not streamed_any and graph_state.get("final_response"):
+        yield graph_state["final_response"]
+
+
 def _run_graph(prompt: str) -> str | None:
-    """Execute the LangGraph pipeline and return the final response."""
+    """Execute the LangGraph pipeline, streaming the reply, and return the final response."""
     executed_steps = []
 
-    with st.status("🤔 Analyzing your question...", expanded=False) as status:
-        try:
-            inputs = {"question": prompt}
-            final_result = None
-            executed_steps.append("Started analysis")
-
-            for chunk in app.stream(inputs):
-                for node_name, output in chunk.items():
-                    if node_name in STATUS_MESSAGES:
-                        status.update(label=STATUS_MESSAGES[node_name], state="running")
-                        executed_steps.append(f"Executed: {node_name}")
+    if settings.ANSWER_CACHE_ENABLED and (hit := answer_cache.lookup(prompt)):
+        entry, match = hit
+        with st.status(CACHE_LABELS[match], state="complete", expanded=False):
+            st.write("**Execution Steps:**")
+            st.write(f"- Cache hit ({match} match), graph skipped")
+            if match == "semantic":
+                st.write(f"- Matched earlier question: *{entry.question}*")
+        st.markdown(entry.final_response)
+        st.session_state.is_processing = False
+        return entry.final_response
 
-                    if "final_response" in output:
-                        final_result = output
+    ticket, rejection = admission.admit(st.session_state.session_id)
+    if ticket is None:
+        st.warning(rejection)
+        st.session_state.is_processing = False
+        return None
+
+    status = st.status("🤔 Analyzing your question...", expanded=False)
+    final_result = None
+    try:
+        if not ticket.granted:
+            status.update(
+                label=f"⏳ Waiting for a free slot (about {ticket.estimated_wait:.0f}s)...",
+                state="running",
+            )
+            if not ticket.wait(settings.ADMISSION_MAX_WAIT_SECONDS):
+                status.update(label="Server busy", state="error")
+                st.warning("The service is busy right now. Please try again in a minute.")
+                return None
+            executed_steps.append(
+                f"Queued {time.monotonic() - ticket.enqueued_at:.1f}s for a free slot"
+            )
+            status.update(label="🤔 Analyzing your question...", state="running")
+
+        inputs = {"question": prompt}
+        graph_state = dict(inputs)  # accumulated node updates
+        executed_steps.append("Started analysis")
+
+        with trace() as request_trace:
+            st.write_stream(
+                _stream_graph(inputs, status, executed_steps, graph_state, time.perf_counter())
+            )
+            if "final_response" in graph_state:
+                final_result = graph_state
 
             if final_result is None:
                 status.update(label="🔄 Completing analysis...", state="running")
-                final_result = app.invoke(inputs)
+                if settings.ASYNC_GRAPH:
+                    final_result = run(app.ainvoke(inputs))
+                else:
+                    final_result = app.invoke(inputs)
+                st.markdown(final_result.get("final_response", ""))
                 executed_steps.append("Completed fallback processing")
 
-            status.update(label="✅ Analysis complete", state="complete")
-            executed_steps.append("Analysis finished successfully")
+        # Per-node timing, tokens, embeddings and vector store hits of this request
+        executed_steps.extend(request_trace.lines())
 
-            st.write("**Execution Steps:**")
-            for step in executed_steps:
-                st.write(f"- {step}")
+        if settings.ANSWER_CACHE_ENABLED:
+            answer_cache.store(prompt, final_result)
 
-        except Exception as e:
-            status.update(label="Error occurred", state="error")
-            st.error(f"An error occurred: {e}")
-            logger.error(f"App Error: {e}")
-            logger.error(traceback.format_exc())
-            final_result = None
+        status.update(label="✅ Analysis complete", state="complete")
+        executed_steps.append("Analysis finished successfully")
 
-        finally:
-            st.session_state.is_processing = False
+        status.write("**Execution Steps:**")
+        for step in executed_steps:
+            status.write(f"- {step}")
+
+    except Exception as e:
+        status.update(label="Error occurred", state="error")
+        st.error(f"An error occurred: {e}")
+        logger.error(f"App Error: {e}")
+        logger.error(traceback.format_exc())
+        final_result = None
+
+    finally:
+        ticket.release()
+        st.session_state.is_processing = False
 
     if final_result:
         return final_result.get("final_response", "I'm sorry, I couldn't process that.")
@@ -107,11 +226,11 @@ def _process_pending_prompt():
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    answer = _run_graph(prompt)
+    # The answer is streamed into the assistant bubble as it is generated
+    with st.chat_message("assistant"):
+        answer = _run_graph(prompt)
 
     if answer:
-        with st.chat_message("assistant"):
-            st.markdown(answer)
         st.session_state.messages.append({"role": "assistant", "content": answer})
 
     st.rerun()
@@ -2,14 +2,21 @@
 It sets up the nodes, edges, and conditional logic for our financial research assistant.
 """
 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
 
 from graph.state import GraphState
-from nodes.clarify import clarify_node
-from nodes.extractor import extractor_node
-from nodes.reply import reply_node
-from nodes.search import search_node
-from nodes.supervisor import supervisor_node
+from nodes.clarify import aclarify_node, clarify_node
+from nodes.extractor import aextractor_node, extractor_node
+from nodes.merge import merge_node
+from nodes.reply import areply_node, reply_node
+from nodes.search import asearch_node, search_node
+from nodes.shortlist import shortlist_node
+from nodes.speculative import aprefetch_node, dispatch_node, prefetch_node
+from nodes.supervisor import asupervisor_node, supervisor_node
+from services.tracing import traced
+from utils.config import settings
 
 
 def route_decision(state: GraphState):
@@ -26,29 +33,122 @@ def route_decision(state: GraphState):
         return END  # UNSUPPORTED: final_response already set, go straight to END
 
 
-builder = StateGraph(GraphState)
+def route_extraction(state: GraphState):
+    """Fans out the searches, shortlisting companies first for a sector question.
 
-# Add our nodes
-builder.add_node("supervisor", supervisor_node)
-builder.add_node("extractor", extractor_node)
-builder.add_node("search", search_node)
-builder.add_node("reply", reply_node)
-builder.add_node("clarify", clarify_node)
+    Ends the graph when the extractor matched no ticker from the indexed universe.
+    """
+    if not state.get("tickers") and not state.get("ticker") and state.get("sector"):
+        return "shortlist"
+    return route_searches(state)
 
-# Set the entry point
-builder.add_edge(START, "supervisor")
 
-# Define the Conditional Logic
-builder.add_conditional_edges(
-    "supervisor",
-    route_decision,
-    {"extractor": "extractor", "clarify": "clarify", "reply": "reply", END: END},
-)
+def route_searches(state: GraphState):
+    """Fans out one search per ticker and fiscal year; they run in parallel in the same step.
 
-# extractor feeds into search, search feeds into reply
-builder.add_edge("extractor", "search")
-builder.add_edge("search", "reply")
-builder.add_edge("reply", END)
+    A year-over-year question searches the same section of each period's filing.
+    """
+    tickers = state.get("tickers") or ([state["ticker"]] if state.get("ticker") else [])
+    if not tickers:
+        return END  # final_response already set by the extractor or shortlist node
+    return [
+        Send(
+            "search",
+            {
+                "question": state["question"],
+                "ticker": ticker,
+                "section": state.get("section"),
+                "fiscal_year": fiscal_year,
+            },
+        )
+        for ticker in tickers
+        for fiscal_year in state.get("fiscal_years") or [None]
+    ]
 
-# Compile the graph
-app = builder.compile()
+
+def route_dispatch(state: GraphState):
+    """Routes after the speculative join: SEARCH skips straight to search."""
+    if state.get("next_step") == "SEARCH":
+        return route_extraction(state)
+    return route_decision(state)
+
+
+def _node(name: str, func, afunc=None):
+    """A traced node; with `afunc`, `app.ainvoke` / `astream` run the async variant."""
+    if afunc is None:
+        return traced(name, func)
+    return RunnableLambda(traced(name, func), afunc=traced(name, afunc), name=name)
+
+
+def build_graph(speculative: bool = settings.SPECULATIVE_EXECUTION):
+    """Builds and compiles the research graph.
+
+    Sequential mode runs supervisor → extractor → [shortlist →] search (one per ticker
+    and fiscal year) → merge; the shortlist step only runs for sector questions.
+    Speculative mode starts the extractor and query embedding (prefetch) alongside the
+    supervisor and joins both in the dispatch node, so SEARCH questions pay for
+    max(supervisor, extractor) instead of their sum.
+    """
+    builder = StateGraph(GraphState)
+
+    # Add our nodes, each timed and traced (services/tracing.py); the I/O-bound ones
+    # also have an async variant for app.ainvoke / app.astream
+    builder.add_node("supervisor", _node("supervisor", supervisor_node, asupervisor_node))
+    builder.add_node("search", _node("search", search_node, asearch_node))
+    builder.add_node("shortlist", _node("shortlist", shortlist_node))
+    builder.add_node("merge", _node("merge", merge_node))
+    builder.add_node("reply", _node("reply", reply_node, areply_node))
+    builder.add_node("clarify", _node("clarify", clarify_node, aclarify_node))
+
+    if speculative:
+        builder.add_node("prefetch", _node("prefetch", prefetch_node, aprefetch_node))
+        builder.add_node("dispatch", _node("dispatch", dispatch_node))
+
+        # Supervisor and prefetch run in the same step; dispatch waits for both
+        builder.add_edge(START, "supervisor")
+        builder.add_edge(START, "prefetch")
+        builder.add_edge(["supervisor", "prefetch"], "dispatch")
+        builder.add_conditional_edges(
+            "dispatch",
+            route_dispatch,
+            {
+                "search": "search",
+                "shortlist": "shortlist",
+                "clarify": "clarify",
+                "reply": "reply",
+                END: END,
+            },
+        )
+    else:
+        builder.add_node("extractor", _node("extractor", extractor_node, aextractor_node))
+
+        # Set the entry point
+        builder.add_edge(START, "supervisor")
+
+        # Define the Conditional Logic
+        builder.add_conditional_edges(
+            "supervisor",
+            route_decision,
+            {"extractor": "extractor", "clarify": "clarify", "reply": "reply", END: END},
+        )
+
+        # extractor feeds into search (unless no indexed company matched)
+        builder.add_conditional_edges(
+            "extractor",
+            route_extraction,
+            {"search": "search", "shortlist": "shortlist", END: END},
+        )
+
+    # sector questions: the shortlisted companies get the same per-ticker fan-out
+    builder.add_conditional_edges("shortlist", route_searches, {"search": "search", END: END})
+
+    # all per-ticker searches are merged under one context budget, then reply
+    builder.add_edge("search", "merge")
+    builder.add_edge("merge", "reply")
+    builder.add_edge("reply", END)
+
+    # Compile the graph
+    return builder.compile()
+
+
+app = build_graph()
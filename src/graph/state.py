@@ -1,6 +1,7 @@
 """Defines the structure of the graph's state."""
 
-from typing import Dict, List, Optional, TypedDict
+import operator
+from typing import Annotated, Dict, List, Optional, TypedDict
 
 
 class DocumentChunk(TypedDict):
@@ -15,8 +16,14 @@ class GraphState(TypedDict):
 
     question: str  # The user's original query
     reformulated_question: Optional[str]  # The "cleaner" version for the DB
-    ticker: Optional[str]  # Extracted company ticker, e.g. "AAPL"
+    ticker: Optional[str]  # Extracted company ticker, e.g. "AAPL" (the first of `tickers`)
+    tickers: Optional[List[str]]  # Every extracted ticker, e.g. ["AAPL", "MSFT"] for a comparison
+    sector: Optional[str]  # GICS sector of a sector-wide question, e.g. "Utilities"
     section: Optional[str]  # Extracted section intent: "risks", "business", "mnda", or None
+    fiscal_years: Optional[List[int]]  # Periods to compare, e.g. [2022, 2025]; empty = latest
+    fiscal_year: Optional[int]  # The fiscal year one search is filtered on (None = latest)
+    ticker_results: Annotated[List[DocumentChunk], operator.add]  # Per-ticker search fan-out
     search_results: Optional[List[DocumentChunk]]  # The retrieved chunks with metadata
     final_response: Optional[str]  # The actual answer to the user
     next_step: str  # A flag to tell LangGraph where to go next
+    speculative_extraction: Optional[dict]  # Prefetched extractor output, speculative mode only
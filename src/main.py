@@ -1,10 +1,56 @@
+"""Command-line interface: one question, or a batch of questions from JSONL.
+
+    python src/main.py "What is the state of NVDA?"
+    python src/main.py --batch questions.jsonl --output answers.jsonl --concurrency 8
+"""
+
+import argparse
+import json
+from pathlib import Path
+
 from graph.blueprint import app
+from services.answer_cache import cached_invoke
+from services.tracing import trace
+from utils.config import settings
+
+DEFAULT_QUESTION = "What is the state of NVDA?"
+
+
+def answer_one(question: str) -> None:
+    with trace() as request_trace:
+        output = cached_invoke(app, {"question": question})
+
+    print("\n--- TRACE ---")
+    print("\n".join(request_trace.lines()))
+
+    print("\n--- FINAL OUTPUT ---")
+    print(output["final_response"])
+
 
-# Simulate a user question
-input_state = {"question": "What is the state of NVDA?"}
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ask the research agent from the command line.")
+    parser.add_argument("question", nargs="?", default=DEFAULT_QUESTION)
+    parser.add_argument("--batch", type=Path, help="JSONL file of {id, question} to answer.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSONL answers and timings; also the checkpoint a re-run resumes from.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.BATCH_CONCURRENCY,
+        help="Questions answered in parallel.",
+    )
+    args = parser.parse_args()
 
-# Run the graph
-output = app.invoke(input_state)
+    if args.batch is None:
+        answer_one(args.question)
+    else:
+        from services.batch import run_batch
+        from services.warmup import run_warmup
 
-print("\n--- FINAL OUTPUT ---")
-print(output["final_response"])
+        run_warmup()  # load the index and clients before the first question, not during it
+        output = args.output or args.batch.with_name(f"{args.batch.stem}.answers.jsonl")
+        summary = run_batch(app, args.batch, output, args.concurrency)
+        print(json.dumps(summary, indent=2))
@@ -1,26 +1,13 @@
 from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
 
 from graph.state import GraphState
-from utils.config import settings
+from services.llm import get_llm
 from utils.logging import logger
 
-llm = ChatOpenAI(model="gpt-4.1-mini", api_key=settings.OPENAI_API_KEY)
+MODEL = "gpt-4.1-mini"
 
 
-def clarify_node(state: GraphState):
-    """This node is triggered when the supervisor determines that the user's question is too vague to answer directly.
-
-    Args:
-        state (GraphState): The current state of the graph.
-
-    Returns:
-        dict: A dictionary containing the clarification response.
-    """
-    logger.info("--- NODE: ASKING FOR CLARIFICATION ---")
-
-    question = state["question"]
-
+def _build_messages(question: str) -> list[SystemMessage]:
     prompt = f"""
     The user asked: "{question}"
     
@@ -34,9 +21,30 @@ def clarify_node(state: GraphState):
     
     Keep your response brief and helpful.
     """
+    return [SystemMessage(content=prompt)]
 
-    response = llm.invoke([SystemMessage(content=prompt)])
+
+def clarify_node(state: GraphState):
+    """This node is triggered when the supervisor determines that the user's question is too vague to answer directly.
+
+    Args:
+        state (GraphState): The current state of the graph.
+
+    Returns:
+        dict: A dictionary containing the clarification response.
+    """
+    logger.info("--- NODE: ASKING FOR CLARIFICATION ---")
+
+    response = get_llm(MODEL).invoke(_build_messages(state["question"]))
 
     # We put the clarification into 'final_response' because this is
     # the end of the current graph run.
     return {"final_response": response.content}
+
+
+async def aclarify_node(state: GraphState):
+    """Async variant of clarify_node, used when the graph runs with ainvoke/astream."""
+    logger.info("--- NODE: ASKING FOR CLARIFICATION ---")
+
+    response = await get_llm(MODEL).ainvoke(_build_messages(state["question"]))
+    return {"final_response": response.content}
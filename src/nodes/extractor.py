@@ -1,42 +1,181 @@
 """Extractor node — identifies the company ticker and filing section from the user's question."""
 
+import threading
 from typing import Optional
 
 from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
 from graph.state import GraphState
+from services.filings import catalog
+from services.llm import get_structured_llm
+from services.resolver import EntityResolver, resolve_fiscal_years
+from services.sectors import GICS_SECTORS
 from utils.config import settings
 from utils.logging import logger
 
+_UNKNOWN_COMPANY_MESSAGE = (
+    "I couldn't match your question to a company in the indexed S&P 500 filings. "
+    "Please name the company or its ticker (e.g. 'What are Apple's main risks?')."
+)
+
+_SECTIONS = {"risks", "business", "mnda"}
+_SECTOR_CHOICES = ", ".join(f'"{sector}"' for sector in GICS_SECTORS)
+
 
 class ExtractionResult(BaseModel):
     """Structured output for company and section extraction."""
 
-    ticker: str  # Standard stock ticker symbol, e.g. "AAPL"
+    tickers: list[str]  # Standard stock ticker symbols, e.g. ["AAPL"] or ["AAPL", "MSFT"]
     section: Optional[str] = None  # "risks", "business", "mnda", or null
+    sector: Optional[str] = None  # GICS sector, only for questions about a whole sector
+
+
+Extraction = tuple[list[str], str | None, str | None]  # tickers, section, sector
 
+MODEL = "gpt-4.1-nano"
 
-llm = ChatOpenAI(model="gpt-4.1-nano", api_key=settings.OPENAI_API_KEY)
-structured_llm = llm.with_structured_output(ExtractionResult, method="json_schema")
+_resolver: EntityResolver | None = None
+_resolver_filings: dict | None = None  # the catalog snapshot the resolver was built from
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> EntityResolver:
+    """Built from the *_metadata.json files; only these tickers are searchable.
+
+    Rebuilt whenever the catalog reloads them, so refreshed, renamed and new companies
+    resolve without a restart.
+    """
+    global _resolver, _resolver_filings
+    filings = catalog.filings()
+    with _resolver_lock:
+        if _resolver is None or filings is not _resolver_filings:
+            _resolver, _resolver_filings = EntityResolver(filings), filings
+        return _resolver
 
 
 def extractor_node(state: GraphState):
-    """Extracts the company ticker and relevant filing section from the user's question.
+    """Extracts the company tickers and relevant filing section from the user's question.
 
-    This node runs only when the supervisor has decided to SEARCH.
+    This node runs only when the supervisor has decided to SEARCH. The local resolver
+    handles most questions in well under a millisecond; the LLM is only asked when the
+    resolver is not confident. Tickers outside the indexed universe are dropped, and
+    comparisons are capped at MAX_COMPARE_TICKERS companies. Questions about a whole
+    GICS sector return the sector instead, for the shortlist node to pick companies.
+    Years in the question ("since 2022", "year over year") select the fiscal years to
+    search, relative to the first company's latest filing.
 
     Returns:
-        dict: ticker and section to be used as Chroma filters in the search node.
+        dict: tickers (and the first as ticker), section and fiscal_years to be used as
+        Chroma filters by the per-ticker searches, or sector and section for a sector
+        question, or a final_response when no indexed company matches.
     """
     logger.info("--- NODE: EXTRACTING COMPANY & SECTION ---")
     question = state["question"]
 
+    if (resolved := _resolve_locally(question)) is None:
+        resolved = _known_only(*_extract_with_llm(question))
+    return _extraction_update(question, *resolved)
+
+
+async def aextractor_node(state: GraphState):
+    """Async variant of extractor_node, used when the graph runs with ainvoke/astream."""
+    logger.info("--- NODE: EXTRACTING COMPANY & SECTION ---")
+    question = state["question"]
+
+    if (resolved := _resolve_locally(question)) is None:
+        resolved = _known_only(*await _aextract_with_llm(question))
+    return _extraction_update(question, *resolved)
+
+
+def _resolve_locally(question: str) -> Extraction | None:
+    """The resolver's answer when it is confident, else None (ask the LLM)."""
+    resolution = get_resolver().resolve(question)
+    if resolution.confidence < settings.RESOLVER_CONFIDENCE or not (
+        resolution.tickers or resolution.sector
+    ):
+        return None
+    tickers, section, sector = resolution.tickers, resolution.section, resolution.sector
+    logger.info(
+        "Resolved locally (%s): tickers: %s | sector: %s | section: %s",
+        resolution.method,
+        tickers,
+        sector,
+        section,
+    )
+    return tickers, section, sector
+
+
+def _known_only(tickers: list[str], section: str | None, sector: str | None) -> Extraction:
+    """Drops LLM-extracted tickers that are not in the indexed universe."""
+    resolver = get_resolver()
+    unknown = [ticker for ticker in tickers if not resolver.is_known(ticker)]
+    if unknown:
+        logger.warning("Dropping tickers outside the indexed universe: %s", unknown)
+    tickers = [ticker for ticker in tickers if ticker not in unknown]
+    logger.info("Extracted tickers: %s | sector: %s | section: %s", tickers, sector, section)
+    return tickers, section, sector
+
+
+def _extraction_update(
+    question: str, tickers: list[str], section: str | None, sector: str | None
+) -> dict:
+    if tickers:
+        tickers = tickers[: settings.MAX_COMPARE_TICKERS]
+        fiscal_years = resolve_fiscal_years(
+            question,
+            catalog.fiscal_year(tickers[0]),
+            settings.MAX_COMPARE_YEARS,
+            settings.HISTORY_YEARS,
+        )
+        if fiscal_years:
+            logger.info("Fiscal years: %s", fiscal_years)
+        return {
+            "ticker": tickers[0],
+            "tickers": tickers,
+            "sector": None,
+            "section": section,
+            "fiscal_years": fiscal_years,
+        }
+    if sector:
+        return {
+            "ticker": None,
+            "tickers": [],
+            "sector": sector,
+            "section": section,
+            "fiscal_years": [],
+        }
+    return {
+        "ticker": None,
+        "tickers": [],
+        "sector": None,
+        "section": None,
+        "fiscal_years": [],
+        "final_response": _UNKNOWN_COMPANY_MESSAGE,
+    }
+
+
+def _extract_with_llm(question: str) -> Extraction:
+    """Falls back to a structured-output LLM call for questions the resolver can't place."""
+    llm = get_structured_llm(MODEL, ExtractionResult)
+    return _parse_extraction(llm.invoke(_extraction_messages(question)))  # type: ignore[arg-type]
+
+
+async def _aextract_with_llm(question: str) -> Extraction:
+    llm = get_structured_llm(MODEL, ExtractionResult)
+    response = await llm.ainvoke(_extraction_messages(question))
+    return _parse_extraction(response)  # type: ignore[arg-type]
+
+
+def _extraction_messages(question: str) -> list[SystemMessage]:
     prompt = f"""
-    Extract the company and filing section from this financial question: "{question}"
+    Extract the companies and filing section from this financial question: "{question}"
 
-    - ticker: the standard stock ticker symbol (e.g. "AAPL", "NVDA", "MSFT").
+    - tickers: the standard stock ticker symbol of every company mentioned, in order
+      (e.g. ["AAPL"], or ["AAPL", "MSFT"] for a comparison). Empty if no company is named.
+    - sector: only when no company is named and the question is about a whole sector,
+      the GICS sector it targets, using ONLY one of: {_SECTOR_CHOICES}.
+      Otherwise null.
     - section: the most relevant SEC filing section, or null if the question spans multiple sections.
       Use ONLY these exact values: "risks", "business", "mnda", or null.
       - "risks"    → risk factors, threats, challenges
@@ -44,11 +183,16 @@ def extractor_node(state: GraphState):
       - "mnda"     → revenue, profits, financials, management discussion & analysis
       - null       → general questions that do not clearly target one section
     """
+    return [SystemMessage(content=prompt)]
 
-    response = structured_llm.invoke([SystemMessage(content=prompt)])
-    ticker = response.ticker  # type: ignore[union-attr]
-    section = response.section  # type: ignore[union-attr]
 
-    logger.info("Extracted ticker: %s | section: %s", ticker, section)
+def _parse_extraction(response: ExtractionResult) -> Extraction:
+    tickers = [ticker.upper().replace(".", "-") for ticker in response.tickers]
+    section = response.section
+    sector = response.sector
 
-    return {"ticker": ticker, "section": section}
+    return (
+        list(dict.fromkeys(tickers)),
+        section if section in _SECTIONS else None,
+        sector if sector in GICS_SECTORS else None,
+    )
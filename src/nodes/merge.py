@@ -0,0 +1,55 @@
+"""Merge node — joins the per-ticker (and per-year) searches into one reply context."""
+
+from graph.state import GraphState
+from utils.config import settings
+from utils.logging import logger
+from utils.tokens import estimate_tokens
+
+
+def merge_node(state: GraphState):
+    """Interleaves the per-ticker results under a shared context token budget.
+
+    Chunks are taken round-robin in each ticker's rank order, so every company in a
+    comparison gets its best chunks in before any company gets its fifth. A ticker
+    stops contributing once its next chunk no longer fits the remaining budget.
+    For a question about several fiscal years, each (ticker, year) search is its own
+    queue, so every period is represented.
+
+    Returns:
+        dict: search_results for the reply node.
+    """
+    logger.info("--- NODE: MERGING SEARCH RESULTS ---")
+    tickers = state.get("tickers") or [state.get("ticker")]
+    fiscal_years = state.get("fiscal_years") or [None]
+
+    ranked: dict[tuple, list] = {(t, year): [] for t in tickers if t for year in fiscal_years}
+    for chunk in state.get("ticker_results") or []:
+        metadata = chunk["metadata"]
+        year = metadata.get("fiscal_year") if state.get("fiscal_years") else None
+        ranked.setdefault((metadata.get("ticker", "Unknown"), year), []).append(chunk)
+
+    queued = {key: len(chunks) for key, chunks in ranked.items()}
+    budget = settings.CONTEXT_TOKEN_BUDGET
+    used = 0
+    merged = []
+    queues = [chunks for chunks in ranked.values() if chunks]
+    while queues:
+        still_open = []
+        for chunks in queues:
+            cost = estimate_tokens(chunks[0]["content"])
+            if used + cost > budget:
+                continue
+            merged.append(chunks.pop(0))
+            used += cost
+            if chunks:
+                still_open.append(chunks)
+        queues = still_open
+
+    # Queues were consumed in place, so what is left in `ranked` did not fit
+    per_search = {
+        f"{ticker} FY{year}" if year else ticker: queued[(ticker, year)] - len(chunks)
+        for (ticker, year), chunks in ranked.items()
+    }
+    logger.info("Merged %d chunks (~%d tokens): %s", len(merged), used, per_search)
+
+    return {"search_results": merged}
@@ -1,92 +1,154 @@
+"""Reply node — answers from the retrieved SEC filing chunks with inline citation links."""
+
 import re
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
 from graph.state import GraphState
-from utils.config import settings
+from services.context_builder import build_context
+from services.llm import get_llm
 from utils.logging import logger
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4.1-nano", api_key=settings.OPENAI_API_KEY)
+MODEL = "gpt-4.1-nano"
 
+NO_RESULTS_MESSAGE = (
+    "I'm sorry, I couldn't find any specific information in the SEC filings to answer that question."
+)
 
-def reply_node(state: GraphState):
-    """Replies to the user's question based on the retrieved search results from ChromaDB.
+# Inline citations shown to the user, e.g. "[🔗](https://www.sec.gov/...)"
+markdown_link_pattern = r"\[🔗\]\((https?://[^\s)]+)\)"
+_CITATION_PREFIXES = ("[🔗](https://", "[🔗](http://")
 
-    Args:
-        state (GraphState): The current state of the graph.
+# Citation IDs the model is asked to produce instead, e.g. "[S1]" or "[S1, S3]"
+citation_id_pattern = r"\[(S\d+(?:,\s*S\d+)*)\]"
+_CITATION_ID_PREFIX = re.compile(r"\[S\d*(?:,\s*(?:S\d*)?)*$")
 
-    Returns:
-        dict: A dictionary containing the final response with document links.
+
+def _could_become_citation(text: str, with_ids: bool = False) -> bool:
+    """Whether `text` (starting at "[") may still grow into a complete citation link."""
+    if with_ids and _CITATION_ID_PREFIX.match(text):
+        return True
+    for prefix in _CITATION_PREFIXES:
+        if prefix.startswith(text):
+            return True
+        if text.startswith(prefix):
+            url = text[len(prefix) :]
+            return not any(ch.isspace() or ch == ")" for ch in url)
+    return False
+
+
+class CitationFilter:
+    """Expands citation IDs into links and strips links whose URL was not retrieved.
+
+    `sources` maps the citation IDs of the prompt context to filing URLs; an ID
+    expands to its link only if that URL is also in `valid_urls`, so IDs get the same
+    check as links the model wrote out in full.
+
+    Works incrementally: text is released as soon as it cannot be part of a citation,
+    and a possible citation is held back only until it is complete (or clearly isn't
+    one), so streamed replies never show a link that would later be removed.
     """
-    logger.info("--- NODE: GENERATING FINAL REPLY ---")
 
+    def __init__(self, valid_urls: set[str], sources: dict[str, str] | None = None):
+        self.valid_urls = valid_urls
+        self.sources = sources or {}
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        """Adds streamed text and returns the part that is safe to display."""
+        self._pending += text
+        out = []
+        while self._pending:
+            start = self._pending.find("[")
+            if start == -1:
+                out.append(self._pending)
+                self._pending = ""
+                break
+            out.append(self._pending[:start])
+            self._pending = self._pending[start:]
+
+            match = re.match(markdown_link_pattern, self._pending)
+            if match:
+                url = match.group(1)
+                if url in self.valid_urls:
+                    out.append(match.group(0))
+                else:
+                    logger.warning(
+                        "The response contains a URL that was not in the retrieved search results: %s",
+                        url,
+                    )
+                self._pending = self._pending[match.end() :]
+            elif self.sources and (match := re.match(citation_id_pattern, self._pending)):
+                out.append(self._expand(match.group(1)))
+                self._pending = self._pending[match.end() :]
+            elif _could_become_citation(self._pending, with_ids=bool(self.sources)):
+                break  # wait for more text
+            else:
+                out.append("[")
+                self._pending = self._pending[1:]
+        return "".join(out)
+
+    def _expand(self, ids: str) -> str:
+        links = []
+        for citation_id in re.split(r",\s*", ids):
+            url = self.sources.get(citation_id)
+            if url in self.valid_urls:
+                links.append(f"[🔗]({url})")
+            else:
+                logger.warning("The response cites an unknown source: %s", citation_id)
+        return " ".join(dict.fromkeys(links))
+
+    def flush(self) -> str:
+        """Releases whatever is still held back once the stream has ended."""
+        rest, self._pending = self._pending, ""
+        return rest
+
+    def apply(self, text: str) -> str:
+        """Filters a complete text in one go."""
+        return self.feed(text) + self.flush()
+
+
+def collect_urls(search_results: list) -> set[str]:
+    """Filing URLs of the retrieved chunks — the only links a reply may cite."""
+    return {r["metadata"]["filing_url"] for r in search_results if r["metadata"].get("filing_url")}
+
+
+def citation_filter_for(search_results: list) -> CitationFilter:
+    """The filter for a reply over `search_results`, with the citation IDs of its context."""
+    return CitationFilter(collect_urls(search_results), build_context(search_results).sources)
+
+
+def build_reply_messages(state: GraphState) -> list[BaseMessage]:
+    """Builds the reply prompt from the question and the packed retrieval context."""
     question = state["question"]
+    packed = build_context(state.get("search_results") or [])
+    context = packed.text
+    logger.info(
+        "Packed %d chunks into %d passages (~%d tokens, %d sources, %d duplicates, "
+        "%d over budget)",
+        packed.chunks_in,
+        len(packed.passages),
+        packed.tokens,
+        len(packed.sources),
+        packed.duplicates,
+        packed.over_budget,
+    )
 
-    # Use enhanced search results with metadata if available, otherwise fall back to basic text
-    search_results = state.get("search_results", [])
-
-    if not search_results:
-        return {
-            "final_response": "I'm sorry, I couldn't find any specific information in the SEC filings to answer that question."
-        }
-
-    # Build context from search results with URLs for inline linking
-    context_parts = []
-    document_sources = set()
-    document_urls = {}  # Track URLs for each ticker
-    source_url_map = {}  # Map source descriptions to URLs
-    urls_set = set()  # To track unique URLs for the links section
-
-    if search_results:
-        for result in search_results:
-            content = result["content"]
-            metadata = result["metadata"]
-
-            # Track sources for links section
-            ticker = metadata.get("ticker", "Unknown")
-            section = metadata.get("section", "unknown")
-            source = metadata.get("source", "Unknown")
-            filing_url = metadata.get("filing_url")
-            urls_set.add(filing_url)
-
-            document_sources.add((ticker, section, source))
-
-            # Store URL for this ticker if available
-            if filing_url and ticker != "Unknown":
-                document_urls[ticker] = filing_url
-                # Create a source reference for inline linking
-                section_display = section.replace("_", " ").title()
-                source_key = f"{ticker}'s {section_display}"
-                source_url_map[source_key] = filing_url
-
-            # Add content with enhanced source attribution including URL info
-            section_display = section.replace("_", " ").title()
-            source_info = f"[Source: {ticker} - {section_display}"
-            if filing_url:
-                source_info += f" - URL: {filing_url}"
-            source_info += "]"
-
-            context_parts.append(f"{source_info}\n{content}")
-    else:
-        context_parts.append("No relevant information found in the SEC filings.")
-
-    context = "\n\n---\n\n".join(context_parts)
-
-    # Enhanced prompt with instruction to use inline source links
+    # Enhanced prompt with instruction to cite sources inline by their ID
     prompt = f"""
     You are a Senior Financial Analyst. Answer the user's question using ONLY the provided SEC filing context.
-    Each piece of context is labeled with its source document and includes the URL to the original SEC filing.
+    The SOURCES list gives each SEC filing a short ID, and each passage is labeled with the ID of its filing.
     
     Guidelines:
     1. If the information is not in the context, state that you don't have enough data.
     2. Use a professional, objective tone.
-    3. IMPORTANT: When citing information, create inline markdown links to the specific SEC filing.
-       Format: "[🔗](URL)"
+    3. IMPORTANT: When citing information, cite the filing by its source ID in square brackets.
+       Format: "[S1]" (several sources: "[S1, S2]")
     4. Use bullet points for readability if listing risks or financial data.
-    5. Extract the URL from the context source information to create proper markdown links.
-    6. Always link to the source when mentioning specific information from that source.
+    5. Only use source IDs listed under SOURCES; never write out the URLs.
+    6. Always cite the source when mentioning specific information from that source.
+    7. If the context covers several companies, address each one and compare them directly.
+    8. If passages come from several fiscal years (FY labels), compare the periods and say what changed.
     
     CONTEXT:
     {context}
@@ -95,34 +157,52 @@ def reply_node(state: GraphState):
     {question}
     """
 
-    response = llm.invoke(
-        [
-            SystemMessage(
-                content="You are a helpful financial analyst that answers based on provided SEC documents. Create inline markdown links when citing specific sources. Always provide clickable links to the SEC filings when referencing information."
-            ),
-            HumanMessage(content=prompt),
-        ]
-    )
+    return [
+        SystemMessage(
+            content="You are a helpful financial analyst that answers based on provided SEC documents. Cite specific sources inline by their source ID, e.g. [S1]. Always cite the SEC filings when referencing information."
+        ),
+        HumanMessage(content=prompt),
+    ]
+
+
+def reply_node(state: GraphState):
+    """Replies to the user's question based on the retrieved search results from ChromaDB.
+
+    When the graph is streamed with stream_mode="messages", the tokens of this LLM call
+    reach the UI as they are generated; the UI runs them through the same CitationFilter.
+
+    Args:
+        state (GraphState): The current state of the graph.
 
-    # Combine the main response with additional info
-    final_response = response.content
-    assert isinstance(final_response, str), f"Unexpected response type: {type(final_response)}"
+    Returns:
+        dict: A dictionary containing the final response with document links.
+    """
+    logger.info("--- NODE: GENERATING FINAL REPLY ---")
+
+    search_results = state.get("search_results", [])
+
+    if not search_results:
+        return {"final_response": NO_RESULTS_MESSAGE}
+
+    response = get_llm(MODEL).invoke(build_reply_messages(state))
+    return _final_response(response.content, search_results)
+
+
+async def areply_node(state: GraphState):
+    """Async variant of reply_node, used when the graph runs with ainvoke/astream."""
+    logger.info("--- NODE: GENERATING FINAL REPLY ---")
+
+    search_results = state.get("search_results", [])
+
+    if not search_results:
+        return {"final_response": NO_RESULTS_MESSAGE}
 
-    # Add a verification step to ensure that the links included in the response
-    # are in urls_set and in the correct markdown format
+    response = await get_llm(MODEL).ainvoke(build_reply_messages(state))
+    return _final_response(response.content, search_results)
 
-    # Extract URLs from the response using a simple regex for markdown links
-    markdown_link_pattern = r"\[🔗\]\((https?://[^\s)]+)\)"
-    extracted_urls = re.findall(markdown_link_pattern, final_response)
 
-    # Verify that all extracted URLs are in the urls_set
-    # if not, we can log a warning and remove any links that are not valid
-    for url in extracted_urls:
-        if url not in urls_set:
-            logger.warning(
-                "The response contains a URL that was not in the retrieved search results: %s", url
-            )
-            # Remove the invalid link from the final response
-            final_response = re.sub(rf"\[🔗\]\({re.escape(url)}\)", "", final_response)
+def _final_response(content, search_results: list) -> dict:
+    assert isinstance(content, str), f"Unexpected response type: {type(content)}"
 
-    return {"final_response": final_response}
+    # Expand citation IDs and verify that every cited URL is among the retrieved filings
+    return {"final_response": citation_filter_for(search_results).apply(content)}
@@ -2,71 +2,223 @@
 This module defines the search_node function.
 """
 
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+import asyncio
+import time
+from contextvars import ContextVar
 
 from graph.state import GraphState
+from services.embeddings import get_embeddings
+from services.filings import catalog, get_filing_table
+from services.lexical import LexicalIndex, default_bm25_dir, reciprocal_rank_fusion
+from services.metrics import registry
+from services.rerank import rerank
+from services.tracing import annotate, record_vector_query
+from services.vector_store import default_history_dir, get_history_store, get_vector_store
 from utils.config import settings
 from utils.logging import logger
+from utils.single_flight import SingleFlight
 
-# Initialised once at module load — the HNSW index is loaded into memory here
-# and shared across all requests, instead of being reloaded on every search call.
-_embeddings = OpenAIEmbeddings(model="text-embedding-3-small", api_key=settings.OPENAI_API_KEY)
-_vector_db = Chroma(
-    persist_directory=str(settings.INDEX_DIR),
-    embedding_function=_embeddings,
-    collection_name="sec_filings",
+# Partitions are only read on demand; the vector store is opened on first use
+# (services/vector_store.get_vector_store) and shared across all requests.
+_lexical_index = LexicalIndex(default_bm25_dir())
+_history_lexical_index = LexicalIndex(default_bm25_dir(default_history_dir()))
+
+# Set for the duration of a batch run (services/batch.py): identical (ticker, section,
+# question) retrievals across the batch then run once and share their results.
+shared_retrievals: ContextVar[SingleFlight | None] = ContextVar("shared_retrievals", default=None)
+
+retrieval_seconds = registry.histogram(
+    "retrieval_seconds",
+    "Latency of each retrieval path (dense / lexical) in search_node.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
 )
 
 
+def _dense_search(
+    vector: list[float],
+    k: int,
+    ticker: str | None,
+    section: str | None,
+    fiscal_year: int | None = None,
+):
+    """Vector similarity search; returns (chunk id, chunk) pairs, best first.
+
+    With a `fiscal_year`, searches that year's filing in the history partition.
+    """
+    start = time.perf_counter()
+    if fiscal_year is None:
+        hits = get_vector_store().search(vector, ticker, section, k)
+    else:
+        hits = get_history_store().search(vector, ticker, section, k, fiscal_year=fiscal_year)
+    elapsed = time.perf_counter() - start
+    retrieval_seconds.observe(elapsed, path="dense")
+    record_vector_query(elapsed, len(hits))
+    logger.info("Dense search: %d hits in %.1f ms", len(hits), elapsed * 1000)
+    return hits
+
+
+def _lexical_search(
+    question: str,
+    k: int,
+    ticker: str | None,
+    section: str | None,
+    fiscal_year: int | None = None,
+) -> list[str]:
+    """BM25 search within the ticker/section (and history year) partitions; returns chunk ids."""
+    start = time.perf_counter()
+    if fiscal_year is None:
+        hits = _lexical_index.search(question, ticker, section, k)
+    else:
+        hits = _history_lexical_index.search(question, ticker, section, k, fiscal_year)
+    elapsed = time.perf_counter() - start
+    retrieval_seconds.observe(elapsed, path="lexical")
+    logger.info("Lexical search: %d hits in %.1f ms", len(hits), elapsed * 1000)
+    return [chunk_id for chunk_id, _ in hits]
+
+
 def search_node(state: GraphState):
-    """Searches the Chroma database for relevant documents based on the user's question.
+    """Searches the vector store for relevant documents based on the user's question.
+
+    The graph sends one search per extracted ticker (LangGraph `Send`), so the searches
+    of a comparison run in parallel; their results accumulate in `ticker_results` and
+    are combined by the merge node. A question about earlier filings gets one search
+    per ticker and fiscal year; years before the latest filing are read from the
+    history partition.
+
+    Dense vector results and BM25 results (which catch exact terms, segment names and
+    figures that embeddings miss) are fused with reciprocal rank fusion. The fused
+    candidates are then reranked by a local cross-encoder, and only the best are kept.
 
     Args:
-        state (GraphState): The current state of the graph, containing the user's question.
+        state (GraphState): The question plus the ticker, section and fiscal year to
+            filter on.
 
     Returns:
-        dict: A dictionary containing the search results with text content and metadata.
+        dict: ticker_results, the retrieved chunks with text content and metadata.
     """
 
-    logger.info("--- NODE: SEARCHING CHROMA DATABASE  ---")
+    logger.info("--- NODE: SEARCHING VECTOR STORE ---")
 
-    # Build metadata filter from extracted ticker / section
+    # Filter on the extracted ticker / section (and fiscal year)
     ticker = state.get("ticker")
     section = state.get("section")
+    fiscal_year = state.get("fiscal_year")
 
-    if ticker and section:
-        where = {"$and": [{"ticker": {"$eq": ticker}}, {"section": {"$eq": section}}]}
-    elif ticker:
-        where = {"ticker": {"$eq": ticker}}
-    else:
-        where = None
+    logger.info(
+        "Search filter: ticker=%s section=%s fiscal_year=%s", ticker, section, fiscal_year
+    )
+    annotate(ticker=ticker, section=section, fiscal_year=fiscal_year)
+
+    vector = get_embeddings().embed_query(state["question"])
+    return _shared_retrieve(state["question"], vector, ticker, section, fiscal_year)
 
-    logger.info("Search filter: %s", where)
 
-    # Perform filtered vector search (top 5 most similar chunks)
-    docs = _vector_db.similarity_search(
-        query=state["question"],
-        k=5,
-        filter=where,
+async def asearch_node(state: GraphState):
+    """Async variant of search_node, used when the graph runs with ainvoke/astream.
+
+    Only the query embedding is network I/O. Reading the local index and reranking are
+    CPU-bound, so they run in a worker thread to keep the event loop free.
+    """
+    logger.info("--- NODE: SEARCHING VECTOR STORE ---")
+    ticker = state.get("ticker")
+    section = state.get("section")
+    fiscal_year = state.get("fiscal_year")
+
+    logger.info(
+        "Search filter: ticker=%s section=%s fiscal_year=%s", ticker, section, fiscal_year
     )
+    annotate(ticker=ticker, section=section, fiscal_year=fiscal_year)
 
-    # 4. Extract text and metadata from the Document objects
-    retrieved_texts = []
-    search_results = []
+    vector = await get_embeddings().aembed_query(state["question"])
+    return await asyncio.to_thread(
+        _shared_retrieve, state["question"], vector, ticker, section, fiscal_year
+    )
 
-    for i, doc in enumerate(docs):
-        logger.info("Chunk %d Source: %s", i + 1, doc.metadata.get("source", "Unknown"))
-        logger.info("Chunk %d Content Preview: %s", i + 1, doc.page_content[:200])
 
-        # Keep backward compatibility
-        retrieved_texts.append(doc.page_content)
+def _shared_retrieve(
+    question: str,
+    vector: list[float],
+    ticker: str | None,
+    section: str | None,
+    fiscal_year: int | None = None,
+):
+    """`_retrieve`, deduplicated across the questions of a batch run if one is active."""
+    memo = shared_retrievals.get()
+    if memo is None:
+        return _retrieve(question, vector, ticker, section, fiscal_year)
+    key = (ticker, section, fiscal_year, question)
+    return memo.get(key, lambda: _retrieve(question, vector, ticker, section, fiscal_year))
+
+
+def _retrieve(
+    question: str,
+    vector: list[float],
+    ticker: str | None,
+    section: str | None,
+    fiscal_year: int | None = None,
+):
+    """Dense + lexical retrieval, fusion and reranking for one ticker / section filter.
+
+    The latest filing's year (or no year) searches the main index as before; any other
+    year searches that year's filing in the history partition.
+    """
+    if fiscal_year is not None and fiscal_year == catalog.fiscal_year(ticker):
+        fiscal_year = None
+    top_k = settings.RETRIEVAL_TOP_K
+    # Over-fetch when the cross-encoder gets to pick the final top_k
+    pool_size = max(settings.RERANK_CANDIDATES, top_k) if settings.RERANK_ENABLED else top_k
+
+    if settings.HYBRID_SEARCH:
+        per_path = max(settings.RETRIEVAL_CANDIDATES, pool_size)
+        dense_hits = _dense_search(vector, per_path, ticker, section, fiscal_year)
+        lexical_ids = _lexical_search(question, per_path, ticker, section, fiscal_year)
+
+        chunks_by_id = dict(dense_hits)
+        fused_ids = reciprocal_rank_fusion(
+            [[chunk_id for chunk_id, _ in dense_hits], lexical_ids], k=settings.RRF_K
+        )[:pool_size]
+
+        # Lexical-only hits still need their text and metadata from the vector store
+        missing = [chunk_id for chunk_id in fused_ids if chunk_id not in chunks_by_id]
+        if missing:
+            start = time.perf_counter()
+            store = get_vector_store() if fiscal_year is None else get_history_store()
+            fetched = store.get(missing)
+            record_vector_query(time.perf_counter() - start, len(fetched))
+            chunks_by_id.update(fetched)
+
+        candidates = [chunks_by_id[chunk_id] for chunk_id in fused_ids if chunk_id in chunks_by_id]
+    else:
+        # Perform filtered vector search (top k most similar chunks)
+        dense_hits = _dense_search(vector, pool_size, ticker, section, fiscal_year)
+        candidates = [chunk for _, chunk in dense_hits]
+
+    if settings.RERANK_ENABLED:
+        candidates = rerank(
+            question,
+            candidates,
+            top_n=top_k,
+            batch_size=settings.RERANK_BATCH_SIZE,
+            latency_budget_ms=settings.RERANK_LATENCY_BUDGET_MS,
+        )
+
+    # Chunks only carry their filing_id; join the filing's URLs and attributes back on
+    index_dir = None if fiscal_year is None else default_history_dir()
+    candidates = get_filing_table(index_dir).hydrate(candidates)
+
+    search_results = []
+
+    for i, doc in enumerate(candidates):
+        logger.info("Chunk %d Source: %s", i + 1, doc["metadata"].get("source", "Unknown"))
+        logger.info("Chunk %d Content Preview: %s", i + 1, doc["content"][:200])
 
-        # Add enhanced results with metadata
-        search_results.append({"content": doc.page_content, "metadata": doc.metadata})
+        search_results.append(doc)
 
-    logger.info("Retrieved %d chunks directly from ChromaDB.", len(retrieved_texts))
+    logger.info(
+        "Retrieved %d chunks for %s (%s).", len(search_results), ticker, fiscal_year or "latest"
+    )
+    logger.info("Embedding cache: %s", get_embeddings().stats())
 
     return {
-        "search_results": search_results,
+        "ticker_results": search_results,
     }
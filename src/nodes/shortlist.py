@@ -0,0 +1,42 @@
+"""Shortlist node — picks the companies of a sector worth a full search."""
+
+from graph.state import GraphState
+from services.embeddings import get_embeddings
+from services.sectors import CentroidIndex, default_centroids_path
+from services.tracing import annotate
+from utils.config import settings
+from utils.logging import logger
+
+_NO_SECTOR_INDEX_MESSAGE = (
+    "I couldn't find indexed companies for that sector. "
+    "Please name specific companies (e.g. 'Compare Apple and Microsoft risks')."
+)
+
+# Reloaded automatically whenever scripts/index.py rewrites the centroid file
+_centroids = CentroidIndex(default_centroids_path())
+
+
+def shortlist_node(state: GraphState):
+    """Ranks the sector's companies by similarity of their centroid to the question.
+
+    Only SECTOR_SHORTLIST_SIZE centroids win a full filtered search, so a sector
+    question costs one embedding plus a few hundred dot products before the usual
+    per-ticker fan-out, instead of a scan over every chunk in the sector.
+
+    Returns:
+        dict: tickers (and the first as ticker) for the per-ticker searches,
+        or a final_response when the sector has no indexed companies.
+    """
+    logger.info("--- NODE: SHORTLISTING SECTOR COMPANIES ---")
+    sector, section = state["sector"], state.get("section")
+    annotate(sector=sector)
+
+    query = get_embeddings().embed_query(state["question"])
+    ranked = _centroids.shortlist(query, sector, section, k=settings.SECTOR_SHORTLIST_SIZE)
+    if not ranked:
+        logger.warning("No centroids for sector %s", sector)
+        return {"tickers": [], "final_response": _NO_SECTOR_INDEX_MESSAGE}
+
+    logger.info("Shortlisted %s: %s", sector, ", ".join(f"{t} ({s:.3f})" for t, s in ranked))
+    tickers = [ticker for ticker, _ in ranked]
+    return {"ticker": tickers[0], "tickers": tickers}
@@ -0,0 +1,52 @@
+"""Speculative execution nodes — overlap extraction and query embedding with the supervisor.
+
+SEARCH is by far the most common route, so in speculative mode the extractor and the
+(unfiltered) query embedding start at the same time as the supervisor instead of after
+it. The dispatch node keeps that work on SEARCH and throws it away otherwise.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from graph.state import GraphState
+from nodes.extractor import aextractor_node, extractor_node
+from services.embeddings import get_embeddings
+from utils.logging import logger
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative")
+
+
+def prefetch_node(state: GraphState):
+    """Runs the extractor and warms the query-embedding cache in parallel.
+
+    The extraction is parked under `speculative_extraction` rather than written to
+    ticker/section directly, because the supervisor may still decide not to search.
+    The embedding lands in the query LRU, where the search node will find it.
+    """
+    logger.info("--- NODE: SPECULATIVE PREFETCH ---")
+    embedding = _pool.submit(get_embeddings().embed_query, state["question"])
+    extraction = extractor_node(state)
+    embedding.result()
+    return {"speculative_extraction": extraction}
+
+
+async def aprefetch_node(state: GraphState):
+    """Async variant of prefetch_node: both tasks run concurrently on the event loop."""
+    logger.info("--- NODE: SPECULATIVE PREFETCH ---")
+    _, extraction = await asyncio.gather(
+        get_embeddings().aembed_query(state["question"]), aextractor_node(state)
+    )
+    return {"speculative_extraction": extraction}
+
+
+def dispatch_node(state: GraphState):
+    """Joins supervisor and prefetch: adopts the extraction on SEARCH, discards it otherwise."""
+    decision = state.get("next_step")
+    extraction = state.get("speculative_extraction") or {}
+
+    if decision == "SEARCH":
+        logger.info("Speculation hit: using prefetched extraction %s", extraction)
+        return {**extraction, "speculative_extraction": None}
+
+    logger.info("Speculation discarded (decision: %s)", decision)
+    return {"speculative_extraction": None}
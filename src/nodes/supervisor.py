@@ -4,11 +4,10 @@ import warnings
 from typing import Literal
 
 from langchain_core.messages import SystemMessage
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
 from graph.state import GraphState
-from utils.config import settings
+from services.llm import get_structured_llm
 from utils.logging import logger
 
 # Filter out the specific Pydantic serialization warning
@@ -17,9 +16,9 @@ warnings.filterwarnings(
 )
 
 _UNSUPPORTED_MESSAGE = (
-    "This tool currently supports searches about a **single company** in the S&P 500 at a time. "
-    "Queries about multiple companies or entire sectors will be supported in a future update. "
-    "Please ask about a specific company (e.g. 'What are Apple's main risks?')."
+    "This tool only covers the SEC filings of S&P 500 companies. "
+    "Please ask about specific S&P 500 companies or a sector "
+    "(e.g. 'Compare Apple and Microsoft risks' or 'How do utilities discuss climate risk?')."
 )
 
 
@@ -29,20 +28,10 @@ class SupervisorDecision(BaseModel):
     next_step: Literal["CLARIFY", "SEARCH", "REJECT", "UNSUPPORTED"]
 
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4.1-nano", api_key=settings.OPENAI_API_KEY)
-structured_llm = llm.with_structured_output(SupervisorDecision, method="json_schema")
+MODEL = "gpt-4.1-nano"
 
 
-def supervisor_node(state: GraphState):
-    """Analyzes the user's question and decides the next step in the research graph.
-
-    Returns:
-        dict: next_step. For UNSUPPORTED, also sets final_response directly.
-    """
-    logger.info("--- SUPERVISOR DECIDING PATH ---")
-    question = state["question"]
-
+def _build_messages(question: str) -> list[SystemMessage]:
     prompt = f"""
     You are a financial research assistant routing user questions about SEC filings.
     Analyze the question: "{question}"
@@ -54,22 +43,24 @@ def supervisor_node(state: GraphState):
 
     2. UNSUPPORTED — the question mentions a specific entity but it is NOT an S&P 500 publicly
                      traded company (e.g. a university, government body, private company, or
-                     non-US company), OR it asks about more than one company, OR it asks about
-                     a sector/industry as a whole.
-                     Examples: "Harvard University risks", "compare Apple and Microsoft",
-                     "how do tech companies discuss AI risk?"
+                     non-US company).
+                     Examples: "Harvard University risks", "Toyota's main risks"
 
-    3. CLARIFY     — the question is about finance/business but does not mention any specific
-                     company at all (too vague to search).
+    3. CLARIFY     — the question is about finance/business but mentions neither a specific
+                     company nor a sector/industry (too vague to search).
                      Example: "What are the main risks?" (no company mentioned)
 
-    4. SEARCH      — the question is about the financials of exactly ONE specific S&P 500
-                     publicly traded company.
-                     Example: "What are Apple's main risk factors?"
+    4. SEARCH      — the question is about the financials of one or more specific, named S&P 500
+                     publicly traded companies, including comparisons between them, OR about
+                     S&P 500 companies of a sector/industry as a whole.
+                     Examples: "What are Apple's main risk factors?",
+                     "compare Apple and Microsoft risks", "how do tech companies discuss AI risk?"
     """
+    return [SystemMessage(content=prompt)]
+
 
-    response = structured_llm.invoke([SystemMessage(content=prompt)])
-    decision = response.next_step  # type: ignore[union-attr]
+def _route(response: SupervisorDecision) -> dict:
+    decision = response.next_step
 
     logger.info("Supervisor decision: %s", decision)
 
@@ -77,3 +68,21 @@ def supervisor_node(state: GraphState):
         return {"next_step": "UNSUPPORTED", "final_response": _UNSUPPORTED_MESSAGE}
 
     return {"next_step": decision}
+
+
+def supervisor_node(state: GraphState):
+    """Analyzes the user's question and decides the next step in the research graph.
+
+    Returns:
+        dict: next_step. For UNSUPPORTED, also sets final_response directly.
+    """
+    logger.info("--- SUPERVISOR DECIDING PATH ---")
+    llm = get_structured_llm(MODEL, SupervisorDecision)
+    return _route(llm.invoke(_build_messages(state["question"])))  # type: ignore[arg-type]
+
+
+async def asupervisor_node(state: GraphState):
+    """Async variant of supervisor_node, used when the graph runs with ainvoke/astream."""
+    logger.info("--- SUPERVISOR DECIDING PATH ---")
+    llm = get_structured_llm(MODEL, SupervisorDecision)
+    return _route(await llm.ainvoke(_build_messages(state["question"])))  # type: ignore[arg-type]
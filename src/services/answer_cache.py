@@ -0,0 +1,199 @@
+"""Response cache in front of the compiled LangGraph app.
+
+A question is first matched exactly (after normalization), then against earlier
+questions by query-embedding similarity. Entries expire after a TTL, are evicted
+least-recently-used, and are dropped as soon as the filing they were answered from
+is replaced by a newer one (its accession number changes).
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+from services.embeddings import get_embeddings
+from services.filings import catalog
+from utils.config import settings
+from utils.logging import logger
+
+MatchType = Literal["exact", "semantic"]
+
+_WORD_PATTERN = re.compile(r"[\w$%.&-]+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip(" ?!.")
+
+
+def entity_signature(question: str) -> frozenset[str]:
+    """Capitalized words and numbers after the first word, e.g. {"apple", "2024"}.
+
+    Two questions can embed almost identically while naming different companies or
+    years ("Apple's risks" vs "Nvidia's risks"), so semantic hits also require the
+    same signature.
+    """
+    words = _WORD_PATTERN.findall(question)[1:]
+    return frozenset(
+        re.sub(r"'s$", "", word.lower())
+        for word in words
+        if any(ch.isupper() or ch.isdigit() for ch in word)
+    )
+
+
+@dataclass
+class CachedAnswer:
+    """One cached graph result."""
+
+    question: str
+    final_response: str
+    accessions: dict[str, str | None]  # ticker → accession number the answer was built from
+    created_at: float
+    signature: frozenset[str]
+    embedding: np.ndarray | None = None
+
+
+class AnswerCache:
+    """Thread-safe exact + semantic answer cache with TTL, LRU eviction and filing invalidation."""
+
+    def __init__(
+        self,
+        embeddings=None,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 512,
+        similarity_threshold: float = 0.97,
+    ):
+        self.embeddings = embeddings
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_valid(self, entry: CachedAnswer) -> bool:
+        if time.time() - entry.created_at > self.ttl_seconds:
+            return False
+        return all(
+            catalog.accession_number(ticker) == accession
+            for ticker, accession in entry.accessions.items()
+        )
+
+    def _embed(self, question: str) -> np.ndarray | None:
+        if self.embeddings is None:
+            return None
+        if callable(self.embeddings):  # factory: create the client on first use
+            self.embeddings = self.embeddings()
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, question: str) -> tuple[CachedAnswer, MatchType] | None:
+        """Returns a fresh cached answer for `question` and how it matched, if any."""
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_valid(entry):
+                    self._entries.move_to_end(key)
+                    return entry, "exact"
+                del self._entries[key]
+            if not any(e.embedding is not None for e in self._entries.values()):
+                return None
+
+        # Embedding happens outside the lock; search_node reuses it via the query LRU
+        query = self._embed(question)
+        if query is None:
+            return None
+        signature = entity_signature(question)
+
+        with self._lock:
+            candidates = [
+                (k, e)
+                for k, e in self._entries.items()
+                if e.embedding is not None and e.signature == signature
+            ]
+            if not candidates:
+                return None
+            scores = np.stack([e.embedding for _, e in candidates]) @ query
+            best = int(np.argmax(scores))
+            best_key, entry = candidates[best]
+            if scores[best] < self.similarity_threshold:
+                return None
+            if not self._is_valid(entry):
+                del self._entries[best_key]
+                return None
+            self._entries.move_to_end(best_key)
+            logger.info(
+                "Semantic cache hit (%.3f): %r ~ %r", scores[best], question, entry.question
+            )
+            return entry, "semantic"
+
+    def store(self, question: str, result: dict) -> None:
+        """Caches a completed graph result if it produced a final response."""
+        final_response = result.get("final_response")
+        if not final_response:
+            return
+
+        accessions: dict[str, str | None] = {}
+        for ticker in result.get("tickers") or [result.get("ticker")]:
+            if ticker:
+                accessions[ticker] = catalog.accession_number(ticker)
+        for chunk in result.get("search_results") or []:
+            metadata = chunk["metadata"]
+            ticker, year = metadata.get("ticker"), metadata.get("fiscal_year")
+            # Chunks of earlier fiscal years (history partition) carry older accessions
+            if ticker and year in (None, catalog.fiscal_year(ticker)):
+                accessions[ticker] = metadata.get("accession_number")
+
+        entry = CachedAnswer(
+            question=question,
+            final_response=final_response,
+            accessions=accessions,
+            created_at=time.time(),
+            signature=entity_signature(question),
+            embedding=self._embed(question),
+        )
+        with self._lock:
+            self._entries[normalize_question(question)] = entry
+            self._entries.move_to_end(normalize_question(question))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_ticker(self, ticker: str) -> int:
+        """Drops every entry built from `ticker`'s filings. Returns the number removed."""
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if ticker in e.accessions]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+answer_cache = AnswerCache(
+    embeddings=get_embeddings,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+)
+
+
+def cached_invoke(app, inputs: dict) -> dict:
+    """`app.invoke` with the answer cache in front. Cache hits skip the graph entirely."""
+    if settings.ANSWER_CACHE_ENABLED and (hit := answer_cache.lookup(inputs["question"])):
+        entry, match = hit
+        return {
+            "question": inputs["question"],
+            "final_response": entry.final_response,
+            "cache": match,
+        }
+
+    result = app.invoke(inputs)
+    if settings.ANSWER_CACHE_ENABLED:
+        answer_cache.store(inputs["question"], result)
+    return result
@@ -0,0 +1,174 @@
+"""Batch question answering: questions from JSONL in, answers and timings to JSONL out.
+
+Each input line is a JSON object with a `question` and an optional `id` (defaults to
+the line number); any other fields are copied to the output. Questions run through
+the graph (behind the answer cache) on a bounded thread pool. Across the batch:
+
+- identical (ticker, section, question) retrievals run once (nodes/search.py);
+- identical query embeddings are computed once (services/embeddings.py coalesces
+  concurrent calls and caches the rest);
+- exact and near-duplicate questions reuse earlier answers (services/answer_cache.py).
+
+The output file is the checkpoint: every finished question is appended and flushed
+to disk at once, and a re-run skips the ids whose latest record succeeded, so a
+crashed run resumes where it stopped and failed questions are retried.
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from nodes.search import shared_retrievals
+from services.answer_cache import cached_invoke
+from services.tracing import trace
+from utils.logging import logger
+from utils.single_flight import SingleFlight
+
+
+def read_questions(path: Path) -> list[dict]:
+    """Parses the input JSONL; ids must be unique because they key the checkpoint."""
+    entries, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not entry.get("question"):
+                raise ValueError(f"{path}:{line_no}: missing 'question'")
+            entry["id"] = str(entry.get("id", line_no))
+            if entry["id"] in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id {entry['id']!r}")
+            seen.add(entry["id"])
+            entries.append(entry)
+    return entries
+
+
+def completed_ids(output_path: Path) -> set[str]:
+    """Ids whose latest record in `output_path` succeeded; a truncated last line is ignored."""
+    if not output_path.exists():
+        return set()
+    status: dict[str, str] = {}
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # the run crashed mid-write
+            status[record["id"]] = record["status"]
+    return {id_ for id_, s in status.items() if s == "ok"}
+
+
+class CheckpointWriter:
+    """Appends one JSON line per finished question and forces it to disk."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        if self._file.tell() and not path.read_bytes().endswith(b"\n"):
+            self._file.write("\n")  # end a line cut off by a crash; it is skipped on resume
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def answer_question(app, entry: dict, memo: SingleFlight) -> dict:
+    """Runs one question and returns its output record (never raises)."""
+    token = shared_retrievals.set(memo)  # pool threads do not inherit the caller's context
+    start = time.perf_counter()
+    try:
+        with trace() as request_trace:
+            result = cached_invoke(app, {"question": entry["question"]})
+        record = {
+            "id": entry["id"],
+            **entry,
+            "status": "ok",
+            "final_response": result.get("final_response"),
+            "cache": result.get("cache"),
+        }
+    except Exception as e:
+        logger.error("Question %s failed: %s", entry["id"], e)
+        record = {"id": entry["id"], **entry, "status": "error", "error": repr(e)}
+    finally:
+        shared_retrievals.reset(token)
+
+    totals = request_trace.totals()
+    node_ms: dict[str, float] = {}
+    for span in request_trace.spans:
+        node_ms[span.node] = node_ms.get(span.node, 0.0) + span.seconds * 1000
+    record.update(
+        seconds=time.perf_counter() - start,
+        node_ms=node_ms,
+        prompt_tokens=int(totals.get("prompt_tokens", 0)),
+        completion_tokens=int(totals.get("completion_tokens", 0)),
+        cost_usd=totals.get("cost_usd", 0.0),
+    )
+    return record
+
+
+def run_batch(app, input_path: Path, output_path: Path, concurrency: int) -> dict:
+    """Answers every question of `input_path` not yet answered in `output_path`.
+
+    Returns a summary (counts, throughput, latency percentiles, shared retrievals).
+    """
+    entries = read_questions(input_path)
+    done = completed_ids(output_path)
+    pending = [entry for entry in entries if entry["id"] not in done]
+    logger.info(
+        "📋 Batch: %d questions, %d already answered, %d to run with %d workers",
+        len(entries),
+        len(entries) - len(pending),
+        len(pending),
+        concurrency,
+    )
+
+    memo = SingleFlight()
+    writer = CheckpointWriter(output_path)
+    counts = {"ok": 0, "error": 0}
+    latencies: list[float] = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(answer_question, app, entry, memo) for entry in pending]
+            for i, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                writer.write(record)
+                counts[record["status"]] += 1
+                latencies.append(record["seconds"])
+                logger.info(
+                    "[%d/%d] %s %s in %.1fs",
+                    i,
+                    len(pending),
+                    record["id"],
+                    record["status"],
+                    record["seconds"],
+                )
+    finally:
+        writer.close()
+
+    wall = time.perf_counter() - start
+    summary = {
+        "questions": len(entries),
+        "skipped": len(entries) - len(pending),
+        **counts,
+        "wall_seconds": wall,
+        "questions_per_second": len(pending) / wall if wall else 0.0,
+        "shared_retrievals": memo.stats(),
+    }
+    if latencies:
+        ordered = sorted(latencies)
+        summary.update(
+            p50_seconds=statistics.median(ordered),
+            p95_seconds=ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        )
+    return summary
@@ -0,0 +1,214 @@
+"""Packs retrieved chunks into the context of the reply prompt.
+
+Chunks are split with a 100-character overlap (scripts/index.py), so neighbouring chunks
+of one file repeat text, and several chunks often come from the same filing. The builder:
+
+1. merges chunks of the same file that overlap or sit next to each other into one
+   passage (by `start_index` when the index recorded it, by matching text otherwise);
+2. drops passages that are near-duplicates of a better-ranked one of the same year
+   (passages of different fiscal years are all kept: unchanged text is itself an
+   answer to "what changed");
+3. gives every filing URL a short citation ID (S1, S2, ...) listed once, instead of
+   repeating the URL in front of every chunk;
+4. adds passages in rank order while they fit the token budget.
+
+The reply model cites `[S1]`; nodes/reply.py expands the IDs back into filing links.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from utils.config import settings
+from utils.tokens import estimate_tokens
+
+MIN_TEXT_OVERLAP = 20  # characters; shorter suffix/prefix matches are coincidences
+MAX_TEXT_OVERLAP = 300  # the splitter overlaps 100 characters, plus whitespace slack
+MAX_GAP = 4  # characters stripped between adjacent chunks (e.g. a paragraph break)
+SHINGLE_WORDS = 5
+DUPLICATE_SIMILARITY = 0.8  # Jaccard similarity of word shingles
+
+SEPARATOR = "\n\n---\n\n"
+
+
+@dataclass
+class Passage:
+    """One or more merged chunks of a single file."""
+
+    text: str
+    metadata: dict
+    rank: int  # best (lowest) retrieval rank among its chunks
+    start: int | None = None  # character offset in the raw file, when known
+    chunks: int = 1
+    citation_id: str | None = None
+
+    @property
+    def end(self) -> int | None:
+        return None if self.start is None else self.start + len(self.text)
+
+    def header(self) -> str:
+        ticker = self.metadata.get("ticker", "Unknown")
+        section = self.metadata.get("section", "unknown").replace("_", " ").title()
+        year = self.metadata.get("fiscal_year")
+        label = f"{ticker} · FY{year} · {section}" if year else f"{ticker} · {section}"
+        return f"[{self.citation_id} · {label}]" if self.citation_id else f"[{label}]"
+
+
+@dataclass
+class PackedContext:
+    """Prompt context plus the citation IDs it uses."""
+
+    text: str
+    sources: dict[str, str] = field(default_factory=dict)  # citation ID -> filing URL
+    passages: list[Passage] = field(default_factory=list)
+    tokens: int = 0
+    chunks_in: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that starts `right`, or 0."""
+    for k in range(min(len(left), len(right), MAX_TEXT_OVERLAP), MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def _join(first: Passage, second: Passage) -> str | None:
+    """Text of `first` and `second` as one passage, or None if they are not contiguous."""
+    if first.start is not None and second.start is not None:
+        if second.start < first.start:
+            first, second = second, first
+        gap = second.start - first.end
+        if gap > MAX_GAP:
+            return None
+        if gap >= 0:
+            return first.text + "\n\n" + second.text if gap else first.text + second.text
+        return first.text + second.text[-gap:] if second.end > first.end else first.text
+
+    if second.text in first.text:
+        return first.text
+    if first.text in second.text:
+        return second.text
+    if k := _text_overlap(first.text, second.text):
+        return first.text + second.text[k:]
+    if k := _text_overlap(second.text, first.text):
+        return second.text + first.text[k:]
+    return None
+
+
+def merge_passages(search_results: list) -> list[Passage]:
+    """Merges overlapping or adjacent chunks of the same file, best rank first."""
+    by_file: dict[str, list[Passage]] = {}
+    for rank, result in enumerate(search_results):
+        metadata = result["metadata"]
+        # Every fiscal year's filing has the same section file name, so key on the filing too
+        source = metadata.get("file_path") or metadata.get("source") or f"#{rank}"
+        key = f"{metadata.get('filing_id', '')}/{source}"
+        start = metadata.get("start_index")
+        passage = Passage(result["content"], metadata, rank, None if start is None else int(start))
+
+        passages = by_file.setdefault(key, [])
+        # A new chunk can bridge two passages, so keep absorbing until nothing joins
+        absorbed = True
+        while absorbed:
+            absorbed = False
+            for other in passages:
+                if (text := _join(other, passage)) is not None:
+                    passages.remove(other)
+                    starts = [s for s in (other.start, passage.start) if s is not None]
+                    passage = Passage(
+                        text,
+                        metadata,
+                        min(other.rank, passage.rank),
+                        min(starts) if len(starts) == 2 else None,
+                        other.chunks + passage.chunks,
+                    )
+                    absorbed = True
+                    break
+        passages.append(passage)
+
+    return sorted((p for ps in by_file.values() for p in ps), key=lambda p: p.rank)
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {tuple(words)}
+    return {tuple(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _is_duplicate(shingles: set, of: set) -> bool:
+    common = len(shingles & of)
+    # Nearly the same words, or everything already said by the better-ranked passage
+    return common == len(shingles) or common / len(shingles | of) >= DUPLICATE_SIMILARITY
+
+
+def drop_near_duplicates(passages: list[Passage]) -> tuple[list[Passage], int]:
+    """Keeps each passage unless a better-ranked one of its year has (almost) the same words."""
+    kept: list[tuple[Passage, set]] = []
+    for passage in passages:
+        shingles = _shingles(passage.text)
+        year = passage.metadata.get("fiscal_year")
+        if not any(
+            _is_duplicate(shingles, other)
+            for p, other in kept
+            if p.metadata.get("fiscal_year") == year
+        ):
+            kept.append((passage, shingles))
+    return [p for p, _ in kept], len(passages) - len(kept)
+
+
+def _source_line(citation_id: str, passage: Passage) -> str:
+    metadata = passage.metadata
+    period = metadata.get("period_of_report")
+    filing = f"{metadata.get('ticker', 'Unknown')} 10-K" + (f" ({period})" if period else "")
+    return f"[{citation_id}] {filing}: {metadata['filing_url']}"
+
+
+def build_context(search_results: list, budget_tokens: int | None = None) -> PackedContext:
+    """Merges, deduplicates and packs `search_results` (in rank order) into the budget.
+
+    Citation IDs are numbered in the order their filing first appears in the packed
+    context, so the same results always produce the same IDs.
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    passages, duplicates = drop_near_duplicates(merge_passages(search_results))
+
+    id_of: dict[str, str] = {}  # filing URL -> citation ID
+    source_lines: list[str] = []
+    packed: list[Passage] = []
+    used = over_budget = 0
+    for passage in passages:
+        url = passage.metadata.get("filing_url")
+        new_source = bool(url) and url not in id_of
+        passage.citation_id = f"S{len(id_of) + 1}" if new_source else id_of.get(url)
+
+        cost = estimate_tokens(passage.header() + "\n" + passage.text)
+        if new_source:
+            source_line = _source_line(passage.citation_id, passage)
+            cost += estimate_tokens(source_line)
+        if used + cost > budget:
+            passage.citation_id = None
+            over_budget += 1
+            continue
+
+        used += cost
+        packed.append(passage)
+        if new_source:
+            id_of[url] = passage.citation_id
+            source_lines.append(source_line)
+
+    text = "SOURCES:\n" + "\n".join(source_lines) + "\n\n" if source_lines else ""
+    text += SEPARATOR.join(f"{p.header()}\n{p.text}" for p in packed)
+    sources = {citation_id: url for url, citation_id in id_of.items()}
+
+    return PackedContext(
+        text=text,
+        sources=sources,
+        passages=packed,
+        tokens=used,
+        chunks_in=len(search_results),
+        duplicates=duplicates,
+        over_budget=over_budget,
+    )
@@ -0,0 +1,303 @@
+"""Cached OpenAI embeddings shared by the indexer and query-time search.
+
+Vectors are cached on disk in SQLite, keyed by a hash of the model name and the text,
+so re-indexing unchanged chunks and repeating a question never pay for a second
+network round trip. Query embeddings also go through a small in-memory LRU. Calls that
+do reach the API first take a permit from the shared embeddings bucket
+(services/rate_limit.py).
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from services.http_pool import get_http_clients
+from services.rate_limit import get_limiter
+from services.tracing import record_embedding
+from utils.config import settings
+from utils.logging import logger
+
+
+def cache_key(model: str, text: str) -> str:
+    """Cache key for one text under one embedding model."""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Disk-backed embedding store with least-recently-used eviction by total size."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        (self._size,) = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Returns the cached vectors for whichever of `keys` are present."""
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]) -> None:
+        """Stores vectors and evicts the least recently used ones if over the size cap."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, model, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        with self._lock:
+            # Replaced rows no longer count towards the size
+            replaced = 0
+            keys = list(items)
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                (nbytes,) = self._conn.execute(
+                    "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                    f"WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchone()
+                replaced += nbytes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._size += sum(len(row[2]) for row in rows) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes the oldest entries until the cache is back to 90% of its cap."""
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        evicted: list[tuple[str]] = []
+        size = self._size
+        for key, nbytes in cursor:
+            if size <= target:
+                break
+            evicted.append((key,))
+            size -= nbytes
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._size = size
+        logger.info("Embedding cache evicted %d entries (%.1f MB)", len(evicted), size / 1e6)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that consults an LRU (queries) and a disk cache before the API."""
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model: str,
+        cache: EmbeddingCache | None = None,
+        query_cache_size: int = 1024,
+    ):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache
+        self.query_cache_size = query_cache_size
+        self._query_lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._inflight: dict[str, threading.Event] = {}
+        self._ainflight: dict[str, asyncio.Event] = {}  # only touched from the event loop
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def stats(self) -> dict[str, float]:
+        """Hit/miss counters since startup, plus the overall hit rate."""
+        with self._lock:
+            stats: dict[str, float] = dict(self._stats)
+        total = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (total - stats["misses"]) / total if total else 0.0
+        return stats
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embeds texts, calling the API only for texts not found in the disk cache."""
+        keys = [cache_key(self.model, text) for text in texts]
+        found = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        # Repeats of a missing text in the batch are neither hits nor extra API calls
+        disk_hits = sum(key in found for key in keys)
+        if missing:
+            get_limiter("embeddings").acquire()
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            if self.cache:
+                self.cache.put_many(self.model, fresh)
+            found.update(fresh)
+
+        self._count(disk_hits=disk_hits, misses=len(missing))
+        return [found[key] for key in keys]
+
+    def _lru_get(self, key: str) -> list[float] | None:
+        with self._lock:
+            if key in self._query_lru:
+                self._query_lru.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._query_lru[key]
+        return None
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embeds a query, checking the in-memory LRU and then the disk cache first.
+
+        Concurrent calls for the same text (the parallel per-ticker searches of a
+        comparison) wait for the first one instead of each calling the API.
+        """
+        key = cache_key(self.model, text)
+        if (vector := self._lru_get(key)) is not None:
+            record_embedding("cache")
+            return vector
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._inflight[key] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            if (vector := self._lru_get(key)) is not None:
+                record_embedding("cache")
+                return vector
+            return self._embed_query_uncached(key, text)  # the first call failed
+
+        try:
+            return self._embed_query_uncached(key, text)
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def _embed_query_uncached(self, key: str, text: str) -> list[float]:
+        if (vector := self._disk_get(key)) is None:
+            get_limiter("embeddings").acquire()
+            vector = self.underlying.embed_query(text)
+            self._store(key, vector)
+        return self._remember(key, vector)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Async `embed_query` for the async graph path, with the same caches.
+
+        Concurrent calls for the same text are coalesced like in `embed_query`; all of
+        them run on the shared event loop, so no lock is needed around `_ainflight`.
+        """
+        key = cache_key(self.model, text)
+        if (vector := self._lru_get(key)) is not None:
+            record_embedding("cache")
+            return vector
+
+        pending = self._ainflight.get(key)
+        if pending is not None:
+            await pending.wait()
+            if (vector := self._lru_get(key)) is not None:
+                record_embedding("cache")
+                return vector
+            return await self._aembed_query_uncached(key, text)  # the first call failed
+
+        self._ainflight[key] = asyncio.Event()
+        try:
+            return await self._aembed_query_uncached(key, text)
+        finally:
+            self._ainflight.pop(key).set()
+
+    async def _aembed_query_uncached(self, key: str, text: str) -> list[float]:
+        # SQLite calls wait on the cache lock (shared with the indexer) and may evict and
+        # commit, so they run on a worker thread instead of stalling the event loop
+        if (vector := await asyncio.to_thread(self._disk_get, key)) is None:
+            await get_limiter("embeddings").aacquire()
+            vector = await self.underlying.aembed_query(text)
+            await asyncio.to_thread(self._store, key, vector)
+        return self._remember(key, vector)
+
+    def _disk_get(self, key: str) -> list[float] | None:
+        cached = self.cache.get_many([key]) if self.cache else {}
+        if key not in cached:
+            return None
+        self._count(disk_hits=1)
+        record_embedding("cache")
+        return cached[key]
+
+    def _store(self, key: str, vector: list[float]) -> None:
+        if self.cache:
+            self.cache.put_many(self.model, {key: vector})
+        self._count(misses=1)
+        record_embedding("api")
+
+    def _remember(self, key: str, vector: list[float]) -> list[float]:
+        with self._lock:
+            self._query_lru[key] = vector
+            if len(self._query_lru) > self.query_cache_size:
+                self._query_lru.popitem(last=False)
+        return vector
+
+
+_embeddings: CachedEmbeddings | None = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """Returns the process-wide cached embeddings client."""
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            http_client, http_async_client = get_http_clients()
+            _embeddings = CachedEmbeddings(
+                underlying=OpenAIEmbeddings(
+                    model=settings.EMBEDDING_MODEL,
+                    api_key=settings.OPENAI_API_KEY,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                ),
+                model=settings.EMBEDDING_MODEL,
+                cache=EmbeddingCache(
+                    settings.EMBEDDING_CACHE_PATH,
+                    max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+                ),
+                query_cache_size=settings.QUERY_EMBEDDING_LRU_SIZE,
+            )
+        return _embeddings
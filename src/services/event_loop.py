@@ -0,0 +1,64 @@
+"""The process-wide event loop the async graph path runs on.
+
+Streamlit runs every session's script in its own thread, and the pooled async HTTP
+client (services/http_pool.py) must stay on one loop. So instead of `asyncio.run` per
+request, coroutines are submitted to a single loop running in a daemon thread, where
+any number of in-flight questions wait on network I/O without holding a thread each.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import AsyncIterator, Awaitable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Returns the shared loop, starting its thread on first use."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="event-loop", daemon=True).start()
+        return _loop
+
+
+def run(coro: Awaitable[T]) -> T:
+    """Runs `coro` on the shared loop and blocks the calling thread until it finishes.
+
+    The caller's context variables (e.g. the request trace) are carried over.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+def iterate(stream: AsyncIterator[T]) -> Iterator[T]:
+    """Consumes an async iterator on the shared loop from synchronous code."""
+    items: queue.Queue = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in stream:
+                items.put(item)
+        except BaseException as e:  # re-raised in the consuming thread
+            items.put(_Failure(e))
+        finally:
+            items.put(_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while (item := items.get()) is not _DONE:
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        future.cancel()  # the consumer stopped early: stop the graph too
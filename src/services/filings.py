@@ -0,0 +1,228 @@
+"""Per-filing metadata written by scripts/ingest_sec.py (`{TICKER}_metadata.json`).
+
+Indexed chunks only carry `ticker`, `section` and a compact `filing_id`. Everything that
+is the same for every chunk of a filing (URLs, accession number, period, sector) lives
+once in the filing table `INDEX_DIR/filings.json`, written by scripts/index.py and
+joined back onto retrieved chunks with `get_filing_table().hydrate()`.
+
+Older 10-Ks live apart from the latest ones: `RAW_DATA_DIR/history/` holds
+`{TICKER}_{section}_{FY}.txt` and `{TICKER}_{FY}_metadata.json`, indexed into the
+history partition `INDEX_DIR/history` with its own filing table.
+
+`scripts/ingest_sec.py --refresh` records the tickers whose raw files changed in a
+change set next to the raw files (`data/changeset.json`), so `scripts/index.py --changeset` only revisits
+those files instead of re-reading and hashing the whole universe.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from utils.config import settings
+from utils.logging import logger
+
+
+def default_history_raw_dir(raw_dir: Path | None = None) -> Path:
+    """Where scripts/ingest_sec.py keeps the 10-Ks older than the latest one."""
+    return (raw_dir or settings.RAW_DATA_DIR) / "history"
+
+
+def fiscal_year(doc_metadata: dict) -> int | None:
+    """Fiscal year of a filing: the calendar year its reporting period ends in."""
+    if year := doc_metadata.get("fiscal_year"):
+        return int(year)
+    period = str(doc_metadata.get("period_of_report") or "")
+    return int(period[:4]) if period[:4].isdigit() else None
+
+
+def load_filing_metadata(raw_data_dir: Path) -> dict[str, dict]:
+    """
+    Load document metadata containing SEC filing URLs for each ticker.
+
+    Returns:
+        dict: A dictionary mapping ticker (`{TICKER}_{FY}` in the history directory)
+        to document metadata
+    """
+    metadata_map = {}
+
+    for metadata_file in raw_data_dir.glob("*_metadata.json"):
+        try:
+            ticker = metadata_file.stem.replace("_metadata", "")
+            with open(metadata_file, "r", encoding="utf-8") as f:
+                metadata_map[ticker] = json.load(f)
+        except Exception as e:
+            logger.debug("No metadata file for %s or failed to load: %s", metadata_file, e)
+
+    return metadata_map
+
+
+class FilingCatalog:
+    """In-memory view of the filing metadata, reloaded from disk at most every `refresh_seconds`."""
+
+    def __init__(self, raw_data_dir: Path, refresh_seconds: float = 60.0):
+        self.raw_data_dir = raw_data_dir
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._filings: dict[str, dict] = {}
+        self._loaded_at = float("-inf")
+
+    def filings(self) -> dict[str, dict]:
+        """Ticker → metadata, refreshed if the in-memory copy is stale."""
+        with self._lock:
+            if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+                self._filings = load_filing_metadata(self.raw_data_dir)
+                self._loaded_at = time.monotonic()
+            return self._filings
+
+    def accession_number(self, ticker: str) -> str | None:
+        """Accession number of the filing currently indexed for `ticker`."""
+        return self.filings().get(ticker, {}).get("accession_number")
+
+    def fiscal_year(self, ticker: str) -> int | None:
+        """Fiscal year of the latest filing of `ticker`, the one in the main index."""
+        return fiscal_year(self.filings().get(ticker, {}))
+
+
+catalog = FilingCatalog(settings.RAW_DATA_DIR)
+
+
+# Per-filing attributes kept in the filing table instead of on every chunk
+FILING_ATTRIBUTES = (
+    "filing_url",
+    "accession_number",
+    "period_of_report",
+    "homepage_url",
+    "gics_sector",
+    "fiscal_year",
+)
+
+
+def filing_id(ticker: str, doc_metadata: dict) -> str:
+    """Compact ID shared by all chunks of one filing: its accession number, else the ticker."""
+    return doc_metadata.get("accession_number") or ticker
+
+
+def default_filings_path(index_dir: Path | None = None) -> Path:
+    """Where scripts/index.py writes the filing table: next to the Chroma index."""
+    return (index_dir or settings.INDEX_DIR) / "filings.json"
+
+
+def filing_entry(ticker: str, doc_metadata: dict) -> dict:
+    """The filing table row for one ticker's `{TICKER}_metadata.json`."""
+    entry = {"ticker": ticker}
+    entry.update({k: doc_metadata[k] for k in FILING_ATTRIBUTES if doc_metadata.get(k)})
+    if (year := fiscal_year(doc_metadata)) is not None:
+        entry["fiscal_year"] = year
+    return entry
+
+
+def load_filing_table(path: Path) -> dict[str, dict]:
+    """filing_id → attributes, or an empty table if the index has none yet."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_filing_table(path: Path, filings: dict[str, dict]) -> None:
+    """Atomically writes filing_id → attributes, like the indexing manifest."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(filings, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+class FilingTable:
+    """In-memory filing table, reloaded only when the indexer rewrites the file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._filings: dict[str, dict] = {}
+        self._mtime: float | None = None
+
+    def filings(self) -> dict[str, dict]:
+        """filing_id → attributes; empty if the index has no filing table yet."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._mtime:
+                self._filings = load_filing_table(self.path)
+                self._mtime = mtime
+                logger.info("📇 Loaded %d filings from %s", len(self._filings), self.path)
+            return self._filings
+
+    def hydrate(self, chunks: list[dict]) -> list[dict]:
+        """Adds the attributes of each chunk's filing (and its source file name) to its metadata.
+
+        Chunks indexed before the filing table existed already carry the attributes and
+        pass through unchanged.
+        """
+        filings = self.filings()
+        hydrated = []
+        for chunk in chunks:
+            metadata = chunk["metadata"]
+            ticker, section = metadata.get("ticker"), metadata.get("section", "unknown")
+            attributes = filings.get(metadata.get("filing_id"), {})
+            hydrated.append(
+                {
+                    **chunk,
+                    "metadata": {"source": f"{ticker}_{section}.txt", **attributes, **metadata},
+                }
+            )
+        return hydrated
+
+
+_tables: dict[Path, FilingTable] = {}
+_table_lock = threading.Lock()
+
+
+def get_filing_table(index_dir: Path | None = None) -> FilingTable:
+    """Returns the process-wide filing table of an index (default: the main one).
+
+    Loaded on first use.
+    """
+    path = default_filings_path(index_dir)
+    with _table_lock:
+        if path not in _tables:
+            _tables[path] = FilingTable(path)
+        return _tables[path]
+
+
+def default_changeset_path(raw_dir: Path | None = None) -> Path:
+    """Where refreshed filings of `raw_dir` (default: RAW_DATA_DIR) wait for the indexer.
+
+    Kept next to the raw files, so a benchmark on a temporary corpus has its own.
+    """
+    return (raw_dir or settings.RAW_DATA_DIR).parent / "changeset.json"
+
+
+def load_changeset(path: Path) -> dict[str, dict]:
+    """ticker → {"change": "added" | "updated" | "removed", accession numbers}; empty if none."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["tickers"]
+
+
+def record_changes(path: Path, changes: dict[str, dict]) -> dict[str, dict]:
+    """Merges `changes` into the pending change set and returns it.
+
+    Refreshes between two index runs accumulate; a ticker's latest change wins.
+    """
+    pending = {**load_changeset(path), **changes}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(
+        json.dumps(
+            {"updated_at": datetime.now(timezone.utc).isoformat(), "tickers": pending},
+            indent=2,
+            sort_keys=True,
+        ),
+        encoding="utf-8",
+    )
+    tmp_path.replace(path)
+    return pending
@@ -0,0 +1,33 @@
+"""Pooled HTTP clients shared by every OpenAI chat and embeddings client.
+
+One sync and one async httpx client per process, so concurrent requests reuse
+keep-alive connections instead of each client opening its own. The async client is
+bound to the event loop it first runs on, which is why the async graph path always
+runs on the shared loop of services/event_loop.py.
+"""
+
+import threading
+
+import httpx
+
+from utils.config import settings
+
+_clients: tuple[httpx.Client, httpx.AsyncClient] | None = None
+_lock = threading.Lock()
+
+
+def get_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Returns the process-wide (sync, async) clients, creating them on first use."""
+    global _clients
+    with _lock:
+        if _clients is None:
+            limits = httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            )
+            timeout = httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=10.0)
+            _clients = (
+                httpx.Client(limits=limits, timeout=timeout),
+                httpx.AsyncClient(limits=limits, timeout=timeout),
+            )
+        return _clients
@@ -0,0 +1,140 @@
+"""BM25 inverted index over the indexed chunks, partitioned by ticker and section.
+
+scripts/index.py writes one small JSON partition per raw file (`{TICKER}_{section}.json`)
+next to the Chroma index. A filtered lookup only loads the partitions it needs, so
+exact financial terms, segment names and figures can be matched cheaply alongside
+the dense vector search. The history partition (older 10-Ks) has its own directory,
+with one partition per file as well: `{TICKER}_{section}_{FY}.json`.
+"""
+
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from utils.config import settings
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*%?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this "
+    "to was were which will with we what how does do did about their they".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word/number tokens (keeps "3.5", "1,200" and "12%" intact), minus stopwords."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def build_partition(ids: list[str], texts: list[str]) -> dict:
+    """Builds the postings for one partition (all chunks of one raw file)."""
+    postings: dict[str, list[list[int]]] = {}
+    lengths = []
+    for doc_index, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append([doc_index, tf])
+    return {"ids": ids, "lengths": lengths, "postings": postings}
+
+
+def default_bm25_dir(index_dir: Path | None = None) -> Path:
+    """Where scripts/index.py writes the partitions: next to the Chroma index."""
+    return (index_dir or settings.INDEX_DIR) / "bm25"
+
+
+def partition_path(bm25_dir: Path, partition: str) -> Path:
+    return bm25_dir / f"{partition}.json"
+
+
+def write_partition(bm25_dir: Path, partition: str, ids: list[str], texts: list[str]) -> None:
+    """Atomically (re)writes one partition."""
+    bm25_dir.mkdir(parents=True, exist_ok=True)
+    path = partition_path(bm25_dir, partition)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(build_partition(ids, texts)), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def delete_partition(bm25_dir: Path, partition: str) -> None:
+    partition_path(bm25_dir, partition).unlink(missing_ok=True)
+
+
+class LexicalIndex:
+    """Read side of the BM25 index; partitions are loaded lazily and kept in an LRU."""
+
+    def __init__(self, bm25_dir: Path, cache_size: int = 256):
+        self.bm25_dir = bm25_dir
+        self._load = lru_cache(maxsize=cache_size)(self._load_partition)
+
+    def _load_partition(self, partition: str, mtime: float) -> dict | None:
+        # mtime is part of the cache key so re-indexed partitions are picked up
+        path = partition_path(self.bm25_dir, partition)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _partitions(
+        self, ticker: str, section: str | None, fiscal_year: int | None = None
+    ) -> list[dict]:
+        pattern = f"{ticker}_{section or '*'}"
+        pattern += f"_{fiscal_year}.json" if fiscal_year is not None else ".json"
+        loaded = []
+        for path in self.bm25_dir.glob(pattern):
+            partition = self._load(path.stem, path.stat().st_mtime)
+            if partition is not None:
+                loaded.append(partition)
+        return loaded
+
+    def search(
+        self,
+        query: str,
+        ticker: str | None,
+        section: str | None,
+        k: int,
+        fiscal_year: int | None = None,
+    ) -> list[tuple[str, float]]:
+        """Top-k (chunk id, BM25 score) within the ticker (and section, fiscal year) partitions.
+
+        Statistics are pooled across the selected partitions so scores stay comparable.
+        Unfiltered queries return nothing: scanning every partition is the dense path's job.
+        """
+        if not ticker:
+            return []
+        partitions = self._partitions(ticker, section, fiscal_year)
+        terms = set(tokenize(query))
+        if not partitions or not terms:
+            return []
+
+        n_docs = sum(len(p["ids"]) for p in partitions)
+        avg_len = sum(sum(p["lengths"]) for p in partitions) / max(n_docs, 1)
+        doc_freq = {t: sum(len(p["postings"].get(t, ())) for p in partitions) for t in terms}
+
+        scores: dict[str, float] = {}
+        for partition in partitions:
+            ids, lengths, postings = partition["ids"], partition["lengths"], partition["postings"]
+            for term in terms:
+                if not doc_freq[term]:
+                    continue
+                idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                for doc_index, tf in postings.get(term, ()):
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_index] / avg_len)
+                    term_score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    scores[ids[doc_index]] = scores.get(ids[doc_index], 0.0) + term_score
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    """Fuses several ranked id lists: score(d) = Σ 1 / (k + rank of d in each list)."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
@@ -0,0 +1,68 @@
+"""Shared, lazily created chat model clients.
+
+Nodes ask for their client at call time instead of building it at import, so importing
+the graph stays cheap. Every node using the same model shares one client, and all
+clients share the connection pools of services/http_pool.py. Nodes call `invoke` on the
+sync graph path and `ainvoke` on the async one.
+"""
+
+import threading
+from typing import Callable
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from services.http_pool import get_http_clients
+from services.rate_limit import get_limiter
+from services.tracing import token_usage
+from utils.config import settings
+
+
+def _openai_client(model: str) -> BaseChatModel:
+    http_client, http_async_client = get_http_clients()
+    # stream_usage: streamed replies report their token usage too; every request first
+    # takes a permit from the process-wide chat completions bucket
+    return ChatOpenAI(
+        model=model,
+        api_key=settings.OPENAI_API_KEY,
+        stream_usage=True,
+        rate_limiter=get_limiter("chat"),
+        callbacks=[token_usage],
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+_factory: Callable[[str], BaseChatModel] = _openai_client
+_clients: dict[str, BaseChatModel] = {}
+_structured: dict[tuple[str, type[BaseModel]], Runnable] = {}
+_lock = threading.Lock()
+
+
+def get_llm(model: str) -> BaseChatModel:
+    """Returns the process-wide client for `model`, creating it on first use."""
+    with _lock:
+        if model not in _clients:
+            _clients[model] = _factory(model)
+        return _clients[model]
+
+
+def get_structured_llm(model: str, schema: type[BaseModel]) -> Runnable:
+    """Returns `model` bound to a JSON-schema structured output of type `schema`."""
+    llm = get_llm(model)
+    with _lock:
+        key = (model, schema)
+        if key not in _structured:
+            _structured[key] = llm.with_structured_output(schema, method="json_schema")
+        return _structured[key]
+
+
+def set_llm_factory(factory: Callable[[str], BaseChatModel]) -> None:
+    """Replaces how clients are built (e.g. offline fakes) and drops the cached ones."""
+    global _factory
+    with _lock:
+        _factory = factory
+        _clients.clear()
+        _structured.clear()
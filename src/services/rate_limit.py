@@ -1,9 +1,48 @@
-"""Rate limiting service."""
+"""Rate limiting and admission control.
 
+Three layers, from the user inwards:
+
+- `check_rate_limit()`: per-session message limits kept in `st.session_state`.
+- `admission`: a process-wide controller in front of the graph. At most
+  ADMISSION_MAX_ACTIVE questions run at once; the rest wait in a bounded queue that is
+  served round-robin across sessions, so one busy session cannot starve the others.
+  When the queue is full, or a session already holds its quota, the question is
+  rejected immediately with an estimate of how long to wait.
+- `get_limiter(upstream)`: one token bucket per upstream API (chat completions,
+  embeddings, EDGAR) shared by every thread and coroutine of the process, so a burst
+  is smoothed out here instead of coming back as 429s.
+
+Queue depth, admission waits, rejections and upstream throttling are exported through
+services/metrics.py.
+"""
+
+import asyncio
+import math
+import threading
 import time
-from collections import deque
+from collections import OrderedDict, defaultdict, deque
 
-import streamlit as st
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from services.metrics import registry
+from utils.config import settings
+from utils.token_bucket import TokenBucket
+
+queue_depth = registry.gauge(
+    "admission_queue_depth", "Questions waiting for a free graph slot."
+)
+active_requests = registry.gauge(
+    "admission_active_requests", "Questions currently running through the graph."
+)
+admission_wait_seconds = registry.histogram(
+    "admission_wait_seconds", "Seconds a question waited in the queue before it ran."
+)
+rejections_total = registry.counter(
+    "admission_rejections_total", "Questions rejected by admission control, by reason."
+)
+throttle_seconds = registry.histogram(
+    "upstream_throttle_seconds", "Seconds a call waited for its upstream token bucket."
+)
 
 
 def check_rate_limit() -> tuple[bool, str]:
@@ -11,6 +50,8 @@ def check_rate_limit() -> tuple[bool, str]:
     Returns (is_allowed, error_message).
     Limits: 1 msg/sec and 10 msgs/min.
     """
+    import streamlit as st  # only the chat needs it; scripts import the limiters below
+
     now = time.time()
 
     if "msg_timestamps" not in st.session_state:
@@ -33,3 +74,215 @@ def check_rate_limit() -> tuple[bool, str]:
 
     timestamps.append(now)
     return True, ""
+
+
+class Ticket:
+    """A question's place in the admission queue.
+
+    `wait()` blocks until the controller grants it a slot; `release()` frees the slot
+    (or leaves the queue) and must be called exactly once the question is done.
+    """
+
+    def __init__(self, controller: "AdmissionController", session_id: str, estimated_wait: float):
+        self.controller = controller
+        self.session_id = session_id
+        self.estimated_wait = estimated_wait
+        self.enqueued_at = time.monotonic()
+        self.granted_at: float | None = None
+        self.released = False
+
+    @property
+    def granted(self) -> bool:
+        return self.granted_at is not None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until granted; False if `timeout` expired first (the ticket is dropped)."""
+        return self.controller._wait(self, timeout)
+
+    def release(self) -> None:
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """Bounded, session-fair queue in front of a fixed number of concurrent graph runs.
+
+    Each session has its own FIFO; a freed slot goes to the head of the session that
+    was served least recently. Wait estimates use a moving average of how long a
+    granted question holds its slot.
+    """
+
+    def __init__(self, max_active: int, max_queued: int, session_quota: int):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.session_quota = session_quota
+        self._cond = threading.Condition()
+        self._running = 0
+        self._held: dict[str, int] = defaultdict(int)  # running + queued, per session
+        self._queues: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self._queued = 0
+        self._service_seconds = 10.0  # seed for the moving average before any run finished
+
+    def admit(self, session_id: str) -> tuple[Ticket | None, str]:
+        """Returns (ticket, "") or, when the question must be rejected, (None, reason).
+
+        The ticket is either granted already or queued; call `wait()` on a queued one.
+        """
+        with self._cond:
+            if self._held[session_id] >= self.session_quota:
+                rejections_total.inc(reason="session_quota")
+                return None, (
+                    f"You already have {self._held[session_id]} question(s) in progress. "
+                    "Please wait for them to finish."
+                )
+            if self._running < self.max_active and not self._queued:
+                ticket = Ticket(self, session_id, estimated_wait=0.0)
+                self._held[session_id] += 1
+                self._grant(ticket)
+                return ticket, ""
+            if self._queued >= self.max_queued:
+                rejections_total.inc(reason="queue_full")
+                wait = self._estimate(self._queued + 1)
+                return None, (
+                    f"The service is busy ({self._queued} questions queued). "
+                    f"Please try again in about {math.ceil(wait)}s."
+                )
+
+            ticket = Ticket(self, session_id, estimated_wait=self._estimate(self._queued + 1))
+            self._held[session_id] += 1
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            self._queued += 1
+            queue_depth.set(self._queued)
+            return ticket, ""
+
+    def stats(self) -> dict[str, float]:
+        """Running and queued questions, plus the current per-question service estimate."""
+        with self._cond:
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "sessions_waiting": len(self._queues),
+                "service_seconds": self._service_seconds,
+            }
+
+    def _estimate(self, position: int) -> float:
+        # Slots free up max_active at a time, each after about one service time
+        return math.ceil(position / self.max_active) * self._service_seconds
+
+    def _grant(self, ticket: Ticket) -> None:
+        ticket.granted_at = time.monotonic()
+        self._running += 1
+        active_requests.set(self._running)
+        admission_wait_seconds.observe(ticket.granted_at - ticket.enqueued_at)
+
+    def _dispatch(self) -> None:
+        """Hands free slots to queued tickets, one session at a time in round-robin order."""
+        while self._running < self.max_active and self._queues:
+            session_id, tickets = next(iter(self._queues.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            self._queued -= 1
+            self._grant(ticket)
+        queue_depth.set(self._queued)
+        self._cond.notify_all()
+
+    def _dequeue(self, ticket: Ticket) -> None:
+        tickets = self._queues[ticket.session_id]
+        tickets.remove(ticket)
+        if not tickets:
+            del self._queues[ticket.session_id]
+        self._queued -= 1
+        queue_depth.set(self._queued)
+
+    def _wait(self, ticket: Ticket, timeout: float | None) -> bool:
+        with self._cond:
+            if self._cond.wait_for(lambda: ticket.granted, timeout):
+                return True
+            rejections_total.inc(reason="timeout")
+        ticket.release()
+        return False
+
+    def _release(self, ticket: Ticket) -> None:
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._held[ticket.session_id] -= 1
+            if not self._held[ticket.session_id]:
+                del self._held[ticket.session_id]
+            if not ticket.granted:
+                self._dequeue(ticket)
+                return
+            held_for = time.monotonic() - ticket.granted_at
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_for
+            self._running -= 1
+            active_requests.set(self._running)
+            self._dispatch()
+
+
+admission = AdmissionController(
+    max_active=settings.ADMISSION_MAX_ACTIVE,
+    max_queued=settings.ADMISSION_QUEUE_SIZE,
+    session_quota=settings.ADMISSION_SESSION_QUOTA,
+)
+
+
+class UpstreamLimiter(BaseRateLimiter):
+    """Process-wide token bucket for one upstream API, usable from threads and coroutines.
+
+    Also a LangChain rate limiter, so chat models take it as `rate_limiter=` and wait
+    for a permit before every request. `rate` <= 0 disables throttling.
+    """
+
+    def __init__(self, upstream: str, rate: float, burst: float | None = None):
+        self.upstream = upstream
+        self.bucket = TokenBucket(rate=rate, capacity=burst) if rate > 0 else None
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        if self.bucket is None:
+            return True
+        if not blocking:
+            return self.bucket.try_acquire() == 0
+        throttle_seconds.observe(self.bucket.acquire(), upstream=self.upstream)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if self.bucket is None:
+            return True
+        waited = 0.0
+        while (delay := self.bucket.try_acquire()) > 0:
+            if not blocking:
+                return False
+            await asyncio.sleep(delay)
+            waited += delay
+        throttle_seconds.observe(waited, upstream=self.upstream)
+        return True
+
+
+UPSTREAM_RATES = {
+    "chat": lambda: settings.CHAT_REQUESTS_PER_SECOND,
+    "embeddings": lambda: settings.EMBEDDING_REQUESTS_PER_SECOND,
+    "edgar": lambda: settings.EDGAR_REQUESTS_PER_SECOND,
+}
+
+# EDGAR counts requests in any one-second window: a full bucket of `rate` permits on
+# top of the refill would let twice the rate through in the first second
+UPSTREAM_BURSTS = {"edgar": 1.0}
+
+_limiters: dict[str, UpstreamLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(upstream: str, rate: float | None = None) -> UpstreamLimiter:
+    """Returns the shared limiter for `upstream` ("chat", "embeddings" or "edgar").
+
+    The rate comes from settings unless `rate` is given; either way it is fixed by
+    the first call, and later callers share that bucket.
+    """
+    with _limiters_lock:
+        if upstream not in _limiters:
+            rate = rate if rate is not None else UPSTREAM_RATES[upstream]()
+            _limiters[upstream] = UpstreamLimiter(upstream, rate, UPSTREAM_BURSTS.get(upstream))
+        return _limiters[upstream]
@@ -0,0 +1,99 @@
+"""Cross-encoder reranking of retrieved chunks with a local FlashRank ONNX model.
+
+The search node over-fetches candidates and this module rescores them on CPU, so only
+the most relevant chunks reach the reply prompt. Candidates are scored in batches in
+their retrieval order, and scoring stops once the latency budget would be exceeded.
+Whatever was not scored keeps its retrieval order behind the scored chunks.
+"""
+
+import threading
+import time
+
+from flashrank import Ranker, RerankRequest
+
+from graph.state import DocumentChunk
+from services.metrics import registry
+from utils.config import settings
+from utils.logging import logger
+
+rerank_seconds = registry.histogram(
+    "rerank_seconds",
+    "Time spent scoring candidates with the cross-encoder.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5),
+)
+rerank_candidates = registry.counter(
+    "rerank_candidates_total", "Candidates seen by the reranker, by whether they were scored."
+)
+
+_ranker: Ranker | None = None
+_ranker_lock = threading.Lock()
+
+
+def get_ranker() -> Ranker:
+    """Returns the process-wide FlashRank model, loading (and downloading) it on first use."""
+    global _ranker
+    with _ranker_lock:
+        if _ranker is None:
+            start = time.perf_counter()
+            settings.RERANK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            _ranker = Ranker(
+                model_name=settings.RERANK_MODEL, cache_dir=str(settings.RERANK_CACHE_DIR)
+            )
+            logger.info(
+                "🔃 Loaded reranker %s in %.2fs",
+                settings.RERANK_MODEL,
+                time.perf_counter() - start,
+            )
+        return _ranker
+
+
+def rerank(
+    query: str,
+    chunks: list[DocumentChunk],
+    top_n: int,
+    batch_size: int = 10,
+    latency_budget_ms: float = 150.0,
+) -> list[DocumentChunk]:
+    """Returns the `top_n` chunks most relevant to `query`.
+
+    Args:
+        query: The user's question.
+        chunks: Candidates in retrieval order (best first).
+        top_n: Number of chunks to keep.
+        batch_size: Candidates scored per model call.
+        latency_budget_ms: Scoring stops before a batch that would overrun this budget.
+            The first batch is always scored.
+    """
+    if len(chunks) <= 1:
+        return chunks[:top_n]
+
+    ranker = get_ranker()
+    budget = latency_budget_ms / 1000
+    start = time.perf_counter()
+    scores: dict[int, float] = {}
+    batch_seconds = 0.0
+
+    for offset in range(0, len(chunks), batch_size):
+        elapsed = time.perf_counter() - start
+        if scores and elapsed + batch_seconds > budget:
+            break
+        batch_start = time.perf_counter()
+        passages = [
+            {"id": offset + i, "text": chunk["content"]}
+            for i, chunk in enumerate(chunks[offset : offset + batch_size])
+        ]
+        for result in ranker.rerank(RerankRequest(query=query, passages=passages)):
+            scores[result["id"]] = float(result["score"])
+        batch_seconds = time.perf_counter() - batch_start
+
+    elapsed = time.perf_counter() - start
+    rerank_seconds.observe(elapsed)
+    rerank_candidates.inc(len(scores), scored="true")
+    rerank_candidates.inc(len(chunks) - len(scores), scored="false")
+    logger.info(
+        "Reranked %d/%d candidates in %.1f ms", len(scores), len(chunks), elapsed * 1000
+    )
+
+    scored = sorted(scores, key=scores.__getitem__, reverse=True)
+    unscored = [i for i in range(len(chunks)) if i not in scores]
+    return [chunks[i] for i in (scored + unscored)[:top_n]]
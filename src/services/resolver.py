@@ -0,0 +1,359 @@
+"""In-process company and section resolver used by the extractor node.
+
+Built once from the `{TICKER}_metadata.json` files, it maps a question to tickers by
+exact ticker symbol, exact company name or alias, and finally fuzzy character-trigram
+matching, and picks the filing section from a keyword rule table. Names and aliases
+only match capitalized words ("Target", not "target price"). Single-word names and
+automatic aliases are often ordinary words too ("Visa", "Block", "Discover"), so their
+matches get a confidence below RESOLVER_CONFIDENCE and the extractor LLM confirms them.
+Questions that name no company but a GICS sector ("tech companies", "utilities")
+resolve to that sector. Only tickers in the indexed universe can ever be returned.
+
+`resolve_fiscal_years` picks the fiscal years of a question about earlier filings
+("since 2022", "FY2023 vs FY2024", "year over year") for the history search.
+"""
+
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from utils.logging import logger
+
+# Words dropped from company names before matching ("Apple Inc." → "apple")
+_NAME_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "companies", "plc",
+    "ltd", "limited", "holdings", "holding", "group", "the", "class", "a", "b", "c",
+    "sa", "nv", "ag", "lp", "llc", "trust",
+}  # fmt: skip
+
+# First words too generic to serve as an alias on their own ("American Express" ≠ "american")
+_GENERIC_FIRST_WORDS = {
+    "american", "general", "first", "united", "international", "global", "public",
+    "southern", "national", "federal", "texas", "western", "eastern", "northern", "new",
+    "digital", "advanced", "applied", "intercontinental", "universal", "consolidated",
+    "realty", "principal", "state", "best", "live", "booking", "health", "capital",
+}  # fmt: skip
+
+# Well-known names that do not appear in the official company names
+_EXTRA_ALIASES = {
+    "google": "GOOGL",
+    "facebook": "META",
+    "berkshire": "BRK-B",
+    "jpmorgan": "JPM",
+    "jp morgan": "JPM",
+    "coca cola": "KO",
+    "coke": "KO",
+    "exxon": "XOM",
+    "walmart": "WMT",
+    "disney": "DIS",
+    "amex": "AXP",
+    "goldman": "GS",
+    "p&g": "PG",
+}
+
+# Uppercase words that look like tickers but are almost always ordinary words
+_TICKER_STOPWORDS = {
+    "A", "I", "IT", "ALL", "ON", "ARE", "SO", "NOW", "KEY", "CEO", "CFO", "AI", "US",
+    "USA", "SEC", "MD", "GDP", "EPS", "ESG", "IPO", "CASH", "CAN", "FAST", "HAS", "ONE",
+}  # fmt: skip
+
+# Confidence of a match on a single-word name or an automatic alias: below any sensible
+# RESOLVER_CONFIDENCE, so the extractor LLM decides whether the word means the company
+AMBIGUOUS_MATCH_CONFIDENCE = 0.5
+
+SECTION_KEYWORDS = {
+    "risks": [
+        "risk", "risks", "threat", "threats", "challenge", "challenges", "uncertainty",
+        "uncertainties", "exposure", "vulnerab", "litigation", "headwind",
+    ],
+    "business": [
+        "business", "product", "products", "strategy", "competition", "competitor",
+        "competitors", "customers", "segments", "what does", "operate", "employees",
+        "market share", "services",
+    ],
+    "mnda": [
+        "revenue", "revenues", "profit", "profits", "income", "margin", "margins",
+        "earnings", "financial", "financials", "cash flow", "liquidity", "results",
+        "md&a", "management discussion", "expenses", "guidance", "sales",
+    ],
+}  # fmt: skip
+
+_TICKER_PATTERN = re.compile(r"\$?\b[A-Z]{1,5}(?:[.-][A-Z])?\b")
+
+_YEAR_PATTERN = re.compile(r"\b(?:fy\s?)?((?:19|20)\d{2})\b", re.IGNORECASE)
+# A single year in a question with one of these is compared with the latest filing
+_CHANGE_PATTERN = re.compile(
+    r"\b(since|chang\w*|compar\w*|vs\.?|versus|evolv\w*|differ\w*|trend\w*|over time)\b",
+    re.IGNORECASE,
+)
+_YEAR_OVER_YEAR_PATTERN = re.compile(
+    r"\b(year[- ]over[- ]year|yoy|last year|prior year|previous year|a year ago)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_name(text: str) -> str:
+    """Lowercases, strips possessives and punctuation, and drops corporate suffixes."""
+    text = re.sub(r"['’]s\b", "", text.lower())
+    words = re.sub(r"[^\w&]+", " ", text).split()
+    return " ".join(w for w in words if w not in _NAME_SUFFIXES)
+
+
+def _question_words(question: str) -> list[tuple[str, bool]]:
+    """Words of `question` as `normalize_name` keeps them, each with whether it had a capital."""
+    text = re.sub(r"['’]s\b", "", question, flags=re.IGNORECASE)
+    words = re.sub(r"[^\w&]+", " ", text).split()
+    return [(w.lower(), w != w.lower()) for w in words if w.lower() not in _NAME_SUFFIXES]
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+# Phrases (whole words) that point a company-less question at a GICS sector
+# (keys match the sector names in services/sectors.py)
+SECTOR_KEYWORDS = {
+    "Communication Services": [
+        "communication services", "telecom", "telecoms", "media companies", "social media",
+        "entertainment companies",
+    ],
+    "Consumer Discretionary": [
+        "consumer discretionary", "retailers", "automakers", "carmakers", "restaurants",
+        "hotels", "homebuilders", "e-commerce companies",
+    ],
+    "Consumer Staples": [
+        "consumer staples", "food companies", "beverage companies", "grocers", "tobacco",
+        "household products",
+    ],
+    "Energy": ["energy sector", "energy companies", "oil and gas", "oil companies", "oil majors"],
+    "Financials": [
+        "financials", "financial sector", "banks", "banking sector", "insurers",
+        "insurance companies", "asset managers",
+    ],
+    "Health Care": [
+        "health care sector", "healthcare sector", "healthcare companies", "pharma",
+        "pharmaceutical companies", "biotech", "medical device", "medical devices", "managed care",
+    ],
+    "Industrials": [
+        "industrials", "industrial companies", "aerospace", "defense contractors", "airlines",
+        "railroads",
+    ],
+    "Information Technology": [
+        "information technology", "tech companies", "tech sector", "technology companies",
+        "technology sector", "big tech", "software companies", "semiconductor companies",
+        "chipmakers", "semiconductors",
+    ],
+    "Materials": [
+        "materials sector", "chemical companies", "chemicals", "miners", "mining companies",
+    ],
+    "Real Estate": ["real estate", "reits", "reit"],
+    "Utilities": ["utilities", "utility companies", "power companies", "electric utilities"],
+}  # fmt: skip
+
+_SECTOR_PATTERNS = {
+    sector: re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b")
+    for sector, keywords in SECTOR_KEYWORDS.items()
+}
+
+
+@dataclass
+class Resolution:
+    """Result of resolving a question against the indexed universe."""
+
+    tickers: list[str] = field(default_factory=list)  # in order of appearance
+    section: str | None = None
+    confidence: float = 0.0
+    method: str = "none"  # "ticker", "name", "alias", "fuzzy", "sector" or "none"
+    sector: str | None = None  # GICS sector, only when no company was named
+
+
+class EntityResolver:
+    """Exact, alias and fuzzy (trigram) company matcher over the indexed tickers."""
+
+    def __init__(self, filings: dict[str, dict], fuzzy_threshold: float = 0.4):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.tickers = set(filings)
+        self.names: dict[str, str] = {}  # normalized phrase → ticker
+        self.aliases: dict[str, str] = {}
+        self._auto_aliases: set[str] = set()  # first words of names, not curated
+        self._trigram_index: dict[str, set[str]] = defaultdict(set)
+        self._trigram_counts: dict[str, int] = {}
+
+        first_words: Counter[str] = Counter()
+        for ticker in sorted(filings):
+            name = normalize_name(filings[ticker].get("company_name") or "")
+            if not name:
+                continue
+            self.names.setdefault(name, ticker)
+            first_words[name.split()[0]] += 1
+            grams = _trigrams(name)
+            self._trigram_counts[name] = len(grams)
+            for gram in grams:
+                self._trigram_index[gram].add(name)
+
+        for name, ticker in self.names.items():
+            first = name.split()[0]
+            if (
+                first != name
+                and first_words[first] == 1
+                and len(first) >= 4
+                and first not in _GENERIC_FIRST_WORDS
+            ):
+                self.aliases.setdefault(first, ticker)
+                self._auto_aliases.add(first)
+        for alias, ticker in _EXTRA_ALIASES.items():
+            if ticker in self.tickers:
+                self.aliases[alias] = ticker
+                self._auto_aliases.discard(alias)
+
+        self._max_phrase_words = max((len(n.split()) for n in self.names), default=1)
+        logger.info(
+            "Entity resolver ready: %d tickers, %d names, %d aliases",
+            len(self.tickers),
+            len(self.names),
+            len(self.aliases),
+        )
+
+    def is_known(self, ticker: str | None) -> bool:
+        """Whether `ticker` belongs to the indexed universe."""
+        return bool(ticker) and ticker.upper().replace(".", "-") in self.tickers
+
+    def _match_tickers(self, question: str) -> list[str]:
+        found = []
+        for token in _TICKER_PATTERN.findall(question):
+            symbol = token.lstrip("$").replace(".", "-")
+            explicit = token.startswith("$") or symbol not in _TICKER_STOPWORDS
+            if symbol in self.tickers and explicit:
+                found.append(symbol)
+        return found
+
+    def _match_phrases(self, words: list[tuple[str, bool]]) -> tuple[list[str], str, bool]:
+        """Longest-first exact lookup of word n-grams against names, then aliases.
+
+        A phrase must start with a capitalized word. Also returns whether any match was
+        ambiguous (a single-word name or an automatic alias).
+        """
+        found: list[str] = []
+        method = "none"
+        ambiguous = False
+        i = 0
+        while i < len(words):
+            if not words[i][1]:
+                i += 1
+                continue
+            for size in range(min(self._max_phrase_words, len(words) - i), 0, -1):
+                phrase = " ".join(word for word, _ in words[i : i + size])
+                if phrase in self.names:
+                    found.append(self.names[phrase])
+                    method = "name" if method in ("none", "name") else method
+                    ambiguous = ambiguous or size == 1
+                    break
+                if phrase in self.aliases:
+                    found.append(self.aliases[phrase])
+                    method = "alias"
+                    ambiguous = ambiguous or phrase in self._auto_aliases
+                    break
+            else:
+                i += 1
+                continue
+            i += size
+        return found, method, ambiguous
+
+    def _match_fuzzy(self, question: str) -> tuple[str | None, float]:
+        """Best trigram-Jaccard match of any capitalized phrase against company names."""
+        phrases = re.findall(r"\b[A-Z][\w&'’.-]*(?:\s+[A-Z][\w&'’.-]*)*", question)
+        best_ticker, best_score = None, 0.0
+        for phrase in phrases:
+            name = normalize_name(phrase)
+            if len(name) < 4:
+                continue
+            grams = _trigrams(name)
+            overlaps: Counter[str] = Counter()
+            for gram in grams:
+                overlaps.update(self._trigram_index.get(gram, ()))
+            for candidate, shared in overlaps.items():
+                score = shared / (len(grams) + self._trigram_counts[candidate] - shared)
+                if score > best_score:
+                    best_ticker, best_score = self.names[candidate], score
+        return best_ticker, best_score
+
+    @staticmethod
+    def detect_section(question: str) -> str | None:
+        """Section whose keywords appear most often, or None on a tie or no match."""
+        text = question.lower()
+        scores = {
+            section: sum(keyword in text for keyword in keywords)
+            for section, keywords in SECTION_KEYWORDS.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if ranked[0][1] == 0 or ranked[0][1] == ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+    @staticmethod
+    def detect_sector(question: str) -> str | None:
+        """GICS sector whose keywords appear most often, or None on a tie or no match."""
+        text = question.lower()
+        scores = {
+            sector: len(pattern.findall(text)) for sector, pattern in _SECTOR_PATTERNS.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if ranked[0][1] == 0 or ranked[0][1] == ranked[1][1]:
+            return None
+        return ranked[0][0]
+
+    def resolve(self, question: str) -> Resolution:
+        """Resolves tickers and section for a question. Takes well under a millisecond."""
+        start = time.perf_counter()
+        section = self.detect_section(question)
+
+        tickers = self._match_tickers(question)
+        phrase_tickers, method, ambiguous = self._match_phrases(_question_words(question))
+        if tickers:
+            method = "ticker"
+        tickers = list(dict.fromkeys(tickers + phrase_tickers))
+
+        sector = None
+        if tickers:
+            confidence = 1.0 if method in ("ticker", "name") else 0.9
+            if ambiguous:
+                confidence = AMBIGUOUS_MATCH_CONFIDENCE
+        elif sector := self.detect_sector(question):
+            # "tech companies" must not fuzzy-match some company with "Tech" in its name
+            confidence, method = 1.0, "sector"
+        else:
+            fuzzy_ticker, confidence = self._match_fuzzy(question)
+            if fuzzy_ticker and confidence >= self.fuzzy_threshold:
+                tickers, method = [fuzzy_ticker], "fuzzy"
+            else:
+                confidence = 0.0
+
+        resolution = Resolution(tickers, section, confidence, method, sector)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        logger.debug("Resolved %r → %s in %.0fµs", question, resolution, elapsed_us)
+        return resolution
+
+
+def resolve_fiscal_years(
+    question: str, latest_year: int | None, limit: int, history_years: int
+) -> list[int]:
+    """Fiscal years a question compares or targets, oldest first, at most `limit`.
+
+    Empty when only the latest filing is needed, which is the common case and keeps
+    the search on the latest-year index. `latest_year` is the fiscal year of the
+    company's latest indexed filing. Only the `history_years` years before it are
+    indexed, so other numbers ("2000 suppliers", "the 1990s") are not years to search.
+    """
+    if latest_year is None:
+        return []
+    indexed = range(latest_year - history_years, latest_year + 1)
+    years = {int(year) for year in _YEAR_PATTERN.findall(question) if int(year) in indexed}
+    if _YEAR_OVER_YEAR_PATTERN.search(question):
+        years |= {year for year in (latest_year - 1, latest_year) if year in indexed}
+    elif len(years) == 1 and _CHANGE_PATTERN.search(question):
+        years.add(latest_year)
+    if years <= {latest_year}:
+        return []
+    return sorted(years)[-limit:]
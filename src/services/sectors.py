@@ -0,0 +1,154 @@
+"""Per-company centroid vectors used to shortlist companies for sector-level questions.
+
+scripts/index.py keeps one mean embedding per (ticker, section) in `centroids.npz`
+next to the Chroma index, tagged with the company's GICS sector. A sector question
+is scored against the ~50 centroids of that sector instead of every chunk in it;
+only the best matching companies then get a full filtered search.
+"""
+
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from utils.config import settings
+from utils.logging import logger
+
+GICS_SECTORS = (
+    "Communication Services",
+    "Consumer Discretionary",
+    "Consumer Staples",
+    "Energy",
+    "Financials",
+    "Health Care",
+    "Industrials",
+    "Information Technology",
+    "Materials",
+    "Real Estate",
+    "Utilities",
+)
+
+Centroids = dict[tuple[str, str], tuple[str, int, np.ndarray]]  # (ticker, section) → entry
+
+
+def default_centroids_path() -> Path:
+    """Where scripts/index.py writes the centroids: next to the Chroma index."""
+    return settings.INDEX_DIR / "centroids.npz"
+
+
+def load_centroids(path: Path) -> Centroids:
+    """Reads the centroid file; (ticker, section) → (sector, chunk count, mean vector)."""
+    if not path.exists():
+        return {}
+    with np.load(path) as data:
+        return {
+            (ticker, section): (sector, int(count), vector)
+            for ticker, section, sector, count, vector in zip(
+                data["tickers"], data["sections"], data["sectors"], data["counts"], data["vectors"]
+            )
+        }
+
+
+def save_centroids(path: Path, centroids: Centroids) -> None:
+    """Atomically writes the centroid file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    keys = sorted(centroids)
+    tmp_path = path.with_suffix(".npz.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            tickers=np.array([ticker for ticker, _ in keys], dtype=str),
+            sections=np.array([section for _, section in keys], dtype=str),
+            sectors=np.array([centroids[key][0] for key in keys], dtype=str),
+            counts=np.array([centroids[key][1] for key in keys], dtype=np.int64),
+            vectors=np.stack([centroids[key][2] for key in keys]).astype(np.float32),
+        )
+    tmp_path.replace(path)
+
+
+def update_centroids(
+    path: Path, collection, tickers: set[str], sector_of: dict[str, str | None]
+) -> int:
+    """Recomputes the centroids of `tickers` from their chunk embeddings in Chroma.
+
+    Tickers without chunks anymore are dropped. Returns the number of centroids written.
+    """
+    centroids = {key: entry for key, entry in load_centroids(path).items() if key[0] not in tickers}
+
+    for ticker in sorted(tickers):
+        result = collection.get(where={"ticker": ticker}, include=["embeddings", "metadatas"])
+        if not result["ids"]:
+            continue
+        vectors = np.asarray(result["embeddings"], dtype=np.float32)
+        sections = np.array([m.get("section", "unknown") for m in result["metadatas"]])
+        sector = sector_of.get(ticker) or "Unknown"
+        for section in np.unique(sections):
+            rows = vectors[sections == section]
+            centroids[(ticker, str(section))] = (sector, len(rows), rows.mean(axis=0))
+
+    if centroids:
+        save_centroids(path, centroids)
+    else:
+        path.unlink(missing_ok=True)
+    logger.info("📍 Updated centroids for %d companies (%d total)", len(tickers), len(centroids))
+    return len(centroids)
+
+
+class CentroidIndex:
+    """Read side of the centroid file, reloaded whenever scripts/index.py rewrites it."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._by_section: dict[str | None, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def _load(self) -> None:
+        mtime = self.path.stat().st_mtime if self.path.exists() else None
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        self._by_section = {}
+
+        company: dict[str, list] = {}  # ticker → [sector, count, weighted sum]
+        per_section: dict[str, list[tuple[str, str, np.ndarray]]] = {}
+        for (ticker, section), (sector, count, vector) in load_centroids(self.path).items():
+            entry = company.setdefault(ticker, [sector, 0, np.zeros_like(vector)])
+            entry[1] += count
+            entry[2] = entry[2] + vector * count
+            per_section.setdefault(section, []).append((ticker, sector, vector))
+
+        rows = {None: [(t, s, total / n) for t, (s, n, total) in company.items()]}
+        rows.update(per_section)
+        for section, entries in rows.items():
+            if not entries:
+                continue
+            matrix = np.stack([vector for _, _, vector in entries])
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+            self._by_section[section] = (
+                np.array([t for t, _, _ in entries]),
+                np.array([s for _, s, _ in entries]),
+                matrix,
+            )
+
+    def shortlist(
+        self, query: list[float], sector: str, section: str | None, k: int
+    ) -> list[tuple[str, float]]:
+        """Top-k (ticker, cosine similarity) within `sector`.
+
+        Uses the section centroids when a section is given, the whole-company ones otherwise.
+        """
+        with self._lock:
+            self._load()
+            table = self._by_section.get(section) or self._by_section.get(None)
+        if table is None:
+            return []
+
+        tickers, sectors, matrix = table
+        in_sector = sectors == sector
+        if not in_sector.any():
+            return []
+        vector = np.asarray(query, dtype=np.float32)
+        scores = matrix[in_sector] @ (vector / (np.linalg.norm(vector) or 1.0))
+        best = np.argsort(-scores)[:k]
+        return [(str(tickers[in_sector][i]), float(scores[i])) for i in best]
@@ -0,0 +1,252 @@
+"""Per-node tracing, LLM token accounting and the matching Prometheus metrics.
+
+Every node registered in graph/blueprint.py is wrapped with `traced`, which opens a
+`Span` for the duration of the node. Code running inside a node adds to that span with
+`record` (embedding calls, vector store time and hits, ...) and `annotate`; LLM token
+usage and cost arrive through the `token_usage` callback attached to every chat client.
+
+Spans always feed the process-wide metrics. When the caller opens a `trace()` around
+a graph run, they are also collected into a per-request `Trace`, which the chat UI
+shows under "Execution Steps". Spans live in context variables, which LangGraph copies
+into the threads running the nodes, so parallel searches each get their own span.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from services.metrics import registry
+from utils.logging import logger
+
+# USD per million tokens (prompt, completion); model names match by prefix
+MODEL_PRICES = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+node_seconds = registry.histogram("graph_node_seconds", "Wall time of each graph node.")
+node_errors = registry.counter("graph_node_errors_total", "Graph nodes that raised, by node.")
+llm_tokens = registry.counter(
+    "llm_tokens_total", "LLM tokens by node, model and kind (prompt / completion)."
+)
+llm_cost = registry.counter("llm_cost_usd_total", "Estimated LLM spend in USD by node and model.")
+embedding_requests = registry.counter(
+    "embedding_requests_total", "Query embeddings by node and source (api / cache)."
+)
+vector_store_seconds = registry.histogram(
+    "vector_store_query_seconds",
+    "Vector store search / get latency by node.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+vector_store_results = registry.counter(
+    "vector_store_results_total", "Chunks returned by the vector store, by node."
+)
+
+
+def price_per_million(model: str) -> tuple[float, float]:
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_PRICES[prefix]
+    return 0.0, 0.0
+
+
+@dataclass
+class Span:
+    """One execution of one node."""
+
+    node: str
+    offset: float  # seconds from the start of the trace
+    seconds: float = 0.0
+    error: str | None = None
+    counts: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    attributes: dict[str, str] = field(default_factory=dict)
+
+    def describe(self) -> str:
+        """One line for the Execution Steps panel, e.g. `search [AAPL]: 182 ms · ...`."""
+        label = self.node + "".join(f" [{v}]" for v in self.attributes.values())
+        parts = [f"{label}: {self.seconds * 1000:.0f} ms"]
+        c = self.counts
+        if c["llm_calls"]:
+            parts.append(
+                f"{c['prompt_tokens']:.0f}→{c['completion_tokens']:.0f} tokens"
+                f" (${c['cost_usd']:.5f})"
+            )
+        if c["embedding_calls"]:
+            parts.append(
+                f"{c['embedding_calls']:.0f} embedding ({c['embedding_api_calls']:.0f} API)"
+            )
+        if c["vector_queries"]:
+            parts.append(
+                f"vector store {c['vector_seconds'] * 1000:.0f} ms, {c['vector_results']:.0f} hits"
+            )
+        if self.error:
+            parts.append(f"failed: {self.error}")
+        return " · ".join(parts)
+
+
+class Trace:
+    """Spans of one request, in completion order. Thread-safe."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def totals(self) -> dict[str, float]:
+        totals: dict[str, float] = defaultdict(float)
+        with self._lock:
+            for span in self.spans:
+                for name, amount in span.counts.items():
+                    totals[name] += amount
+        totals["seconds"] = time.perf_counter() - self.started
+        return dict(totals)
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            lines = [span.describe() for span in self.spans]
+        t = self.totals()
+        tokens = t.get("prompt_tokens", 0) + t.get("completion_tokens", 0)
+        cost = t.get("cost_usd", 0)
+        lines.append(f"Total: {t['seconds']:.2f}s, {tokens:.0f} tokens (${cost:.5f})")
+        return lines
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """Collects the spans of every node that runs inside the block."""
+    request_trace = Trace()
+    token = _current_trace.set(request_trace)
+    try:
+        yield request_trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_node() -> str:
+    span = _current_span.get()
+    return span.node if span else "none"
+
+
+def record(**amounts: float) -> None:
+    """Adds to the counts of the node currently running (no-op outside a node)."""
+    span = _current_span.get()
+    if span is not None:
+        for name, amount in amounts.items():
+            span.counts[name] += amount
+
+
+def annotate(**attributes: Any) -> None:
+    """Labels the current span, e.g. `annotate(ticker="AAPL")` in a per-ticker search."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update({k: str(v) for k, v in attributes.items() if v is not None})
+
+
+def record_embedding(source: str) -> None:
+    """One query embedding served from the `api` or the `cache`."""
+    embedding_requests.inc(node=current_node(), source=source)
+    record(embedding_calls=1, embedding_api_calls=int(source == "api"))
+
+
+def record_vector_query(seconds: float, results: int) -> None:
+    node = current_node()
+    vector_store_seconds.observe(seconds, node=node)
+    vector_store_results.inc(results, node=node)
+    record(vector_queries=1, vector_seconds=seconds, vector_results=results)
+
+
+@contextmanager
+def _node_span(name: str) -> Iterator[Span]:
+    request_trace = _current_trace.get()
+    offset = time.perf_counter() - request_trace.started if request_trace else 0.0
+    span = Span(node=name, offset=offset)
+    token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span.error = repr(e)
+        node_errors.inc(node=name)
+        raise
+    finally:
+        span.seconds = time.perf_counter() - start
+        _current_span.reset(token)
+        node_seconds.observe(span.seconds, node=name)
+        if request_trace is not None:
+            request_trace.add(span)
+        logger.info("⏱️ %s", span.describe())
+
+
+def traced(name: str, func: Callable) -> Callable:
+    """Wraps a node function (sync or async) so each run is timed and collected as a span."""
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(state):
+            with _node_span(name):
+                return await func(state)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state):
+        with _node_span(name):
+            return func(state)
+
+    return wrapper
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Adds the prompt / completion tokens and cost of every LLM call to its node."""
+
+    run_inline = True  # keep the node's context variables
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if not usage:
+                    continue
+                model = (
+                    message.response_metadata.get("model_name")
+                    or (response.llm_output or {}).get("model_name")
+                    or "unknown"
+                )
+                self._record(model, usage["input_tokens"], usage["output_tokens"])
+
+    @staticmethod
+    def _record(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        prompt_price, completion_price = price_per_million(model)
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+        node = current_node()
+        llm_tokens.inc(prompt_tokens, node=node, model=model, kind="prompt")
+        llm_tokens.inc(completion_tokens, node=node, model=model, kind="completion")
+        llm_cost.inc(cost, node=node, model=model)
+        record(
+            llm_calls=1,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=cost,
+        )
+
+
+token_usage = TokenUsageCallback()
@@ -0,0 +1,493 @@
+"""Vector stores the search node can read from (VECTOR_BACKEND).
+
+- `chroma` (default) runs a metadata-filtered HNSW query over the single `sec_filings`
+  collection.
+- `sharded` reads the small per-(ticker, section) shards that scripts/index.py exports
+  to `data/index/shards/`. A question only touches its own ticker's shards, which are
+  loaded on demand behind an LRU with a memory cap, and filtered search is exact.
+- `quantized` scans int8 vectors memory-mapped from `data/index/quantized/` and
+  re-scores the best candidates against the float32 vectors on disk.
+
+All three hold only the latest 10-K of each company. Older fiscal years are kept in a
+separate Chroma database (`data/index/history/`, `get_history_store()`), so the size
+of the history never reaches the latest-year queries.
+"""
+
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+
+import chromadb
+import numpy as np
+
+from graph.state import DocumentChunk
+from utils.config import settings
+from utils.logging import logger
+
+COLLECTION_NAME = "sec_filings"
+
+Hit = tuple[str, DocumentChunk]  # (chunk id, chunk)
+
+
+class VectorStore(Protocol):
+    def search(
+        self, vector: list[float], ticker: str | None, section: str | None, k: int
+    ) -> list[Hit]:
+        """Top-k chunks closest to `vector`, filtered by ticker and optionally section."""
+        ...
+
+    def get(self, ids: list[str]) -> list[Hit]:
+        """Chunks by id; unknown ids are skipped."""
+        ...
+
+    def warm(self) -> None:
+        """Loads whatever the first query would otherwise have to wait for."""
+        ...
+
+
+def metadata_filter(
+    ticker: str | None, section: str | None, fiscal_year: int | None = None
+) -> dict | None:
+    """Chroma `where` clause for the ticker / section / fiscal year filters."""
+    if not ticker:
+        return None
+    clauses = [{"ticker": {"$eq": ticker}}]
+    if section:
+        clauses.append({"section": {"$eq": section}})
+    if fiscal_year is not None:
+        clauses.append({"fiscal_year": {"$eq": fiscal_year}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class ChromaStore:
+    """Filtered HNSW search over the whole collection."""
+
+    def __init__(self, index_dir: Path, collection_name: str = COLLECTION_NAME):
+        client = chromadb.PersistentClient(path=str(index_dir))
+        self.collection = client.get_or_create_collection(
+            collection_name, embedding_function=None
+        )
+
+    def search(
+        self,
+        vector: list[float],
+        ticker: str | None,
+        section: str | None,
+        k: int,
+        fiscal_year: int | None = None,
+    ) -> list[Hit]:
+        result = self.collection.query(
+            query_embeddings=[vector],
+            n_results=k,
+            where=metadata_filter(ticker, section, fiscal_year),
+            include=["documents", "metadatas"],
+        )
+        return [
+            (chunk_id, {"content": content, "metadata": metadata})
+            for chunk_id, content, metadata in zip(
+                result["ids"][0], result["documents"][0], result["metadatas"][0]
+            )
+        ]
+
+    def warm(self) -> None:
+        # Chroma loads the HNSW segment on the first query, not when the client opens
+        sample = self.collection.peek(1)
+        if len(sample["ids"]):
+            self.collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1)
+
+    def get(self, ids: list[str]) -> list[Hit]:
+        result = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return [
+            (chunk_id, {"content": content, "metadata": metadata})
+            for chunk_id, content, metadata in zip(
+                result["ids"], result["documents"], result["metadatas"]
+            )
+        ]
+
+
+def default_shard_dir() -> Path:
+    """Where scripts/index.py exports the shards: next to the Chroma index."""
+    return settings.INDEX_DIR / "shards"
+
+
+def shard_path(shard_dir: Path, partition: str) -> Path:
+    return shard_dir / f"{partition}.npz"
+
+
+def write_shard(
+    shard_dir: Path,
+    partition: str,
+    ids: list[str],
+    vectors,
+    documents: list[str],
+    metadatas: list[dict],
+) -> None:
+    """Atomically (re)writes one shard; vectors are stored unit-normalized."""
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+    path = shard_path(shard_dir, partition)
+    tmp_path = path.with_suffix(".npz.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            ids=np.array(ids, dtype=str),
+            vectors=matrix,
+            documents=np.array(documents, dtype=str),
+            metadatas=np.array([json.dumps(m) for m in metadatas], dtype=str),
+        )
+    tmp_path.replace(path)
+
+
+def delete_shard(shard_dir: Path, partition: str) -> None:
+    shard_path(shard_dir, partition).unlink(missing_ok=True)
+
+
+@dataclass
+class Shard:
+    """One loaded shard: all chunks of one raw file."""
+
+    ids: np.ndarray
+    vectors: np.ndarray
+    documents: np.ndarray
+    metadatas: np.ndarray  # JSON strings, parsed only for returned hits
+    mtime: float
+
+    def __post_init__(self):
+        self.rows = {str(chunk_id): row for row, chunk_id in enumerate(self.ids)}
+        self.nbytes = self.ids.nbytes + self.vectors.nbytes + self.documents.nbytes
+        self.nbytes += self.metadatas.nbytes
+
+    def hit(self, row: int) -> Hit:
+        content, metadata = str(self.documents[row]), json.loads(self.metadatas[row])
+        return str(self.ids[row]), {"content": content, "metadata": metadata}
+
+
+class ShardedStore:
+    """Exact search over per-(ticker, section) shards loaded lazily into a size-capped LRU."""
+
+    def __init__(self, shard_dir: Path, max_bytes: int):
+        self.shard_dir = shard_dir
+        self.max_bytes = max_bytes
+        self._shards: OrderedDict[str, Shard] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _load(self, partition: str) -> Shard | None:
+        path = shard_path(self.shard_dir, partition)
+        if not path.exists():
+            return None
+        mtime = path.stat().st_mtime
+        with self._lock:
+            shard = self._shards.get(partition)
+            if shard is not None and shard.mtime == mtime:
+                self._shards.move_to_end(partition)
+                return shard
+
+        # Read outside the lock so one cold shard does not block queries on warm ones
+        with np.load(path) as data:
+            shard = Shard(
+                ids=data["ids"],
+                vectors=data["vectors"],
+                documents=data["documents"],
+                metadatas=data["metadatas"],
+                mtime=mtime,
+            )
+
+        with self._lock:
+            previous = self._shards.pop(partition, None)
+            if previous is not None:
+                self._size -= previous.nbytes
+            self._shards[partition] = shard
+            self._size += shard.nbytes
+            # Always keep the shard just loaded, even if it alone exceeds the cap
+            while self._size > self.max_bytes and len(self._shards) > 1:
+                _, evicted = self._shards.popitem(last=False)
+                self._size -= evicted.nbytes
+        logger.debug(
+            "Loaded shard %s (%.1f MB, cache %.1f MB)",
+            partition,
+            shard.nbytes / 1e6,
+            self._size / 1e6,
+        )
+        return shard
+
+    def search(
+        self, vector: list[float], ticker: str | None, section: str | None, k: int
+    ) -> list[Hit]:
+        if not ticker:
+            logger.warning("Sharded store needs a ticker; unfiltered search returns nothing")
+            return []
+        if section:
+            partitions = [f"{ticker}_{section}"]
+        else:
+            partitions = [path.stem for path in self.shard_dir.glob(f"{ticker}_*.npz")]
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scored: list[tuple[float, Shard, int]] = []
+        for partition in partitions:
+            shard = self._load(partition)
+            if shard is None or not len(shard.ids):
+                continue
+            scores = shard.vectors @ query
+            top = np.argsort(-scores)[:k]
+            scored.extend((float(scores[row]), shard, int(row)) for row in top)
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [shard.hit(row) for _, shard, row in scored[:k]]
+
+    def warm(self) -> None:
+        pass  # shards are loaded on demand by design
+
+    def get(self, ids: list[str]) -> list[Hit]:
+        hits = []
+        for chunk_id in ids:
+            # Chunk ids start with "{ticker}:{section}:", which names their shard
+            ticker, section = chunk_id.split(":", 2)[:2]
+            shard = self._load(f"{ticker}_{section}")
+            if shard is not None and chunk_id in shard.rows:
+                hits.append(shard.hit(shard.rows[chunk_id]))
+        return hits
+
+
+def default_quantized_dir() -> Path:
+    """Where scripts/index.py exports the quantized store: next to the Chroma index."""
+    return settings.INDEX_DIR / "quantized"
+
+
+def build_quantized_store(
+    store_dir: Path, collection, partitions: list[tuple[str, str]]
+) -> int:
+    """Exports the collection into a quantized store, replacing any previous one.
+
+    Rows are laid out sorted by (ticker, section), so every ticker and ticker/section
+    filter is one contiguous row range. Files written:
+
+    - `int8.npy` / `scales.npy`: per-row symmetric int8 quantization of the unit vectors
+    - `float32.npy`: the unit vectors at full precision, only read for re-scoring
+    - `ids.npy`, `sorted_ids.npy`, `id_order.npy`: chunk ids and a sorted lookup for `get`
+    - `chunks.jsonl` / `offsets.npy`: chunk text and metadata, read one row at a time
+    - `partitions.json`: "{ticker}_{section}" → [start, end) row range
+
+    Returns the number of rows written.
+    """
+    counts = [
+        len(collection.get(where=metadata_filter(ticker, section), include=[])["ids"])
+        for ticker, section in partitions
+    ]
+    total = sum(counts)
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    int8 = float32 = None
+    scales = np.zeros(total, dtype=np.float32)
+    ids: list[str] = []
+    offsets = [0]
+    ranges: dict[str, list[int]] = {}
+    row = 0
+
+    with open(tmp_dir / "chunks.jsonl", "wb") as table:
+        for (ticker, section), count in zip(partitions, counts):
+            if not count:
+                continue
+            result = collection.get(
+                where=metadata_filter(ticker, section),
+                include=["embeddings", "documents", "metadatas"],
+            )
+            vectors = np.asarray(result["embeddings"], dtype=np.float32)
+            n = len(vectors)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+            if int8 is None:
+                shape = (total, vectors.shape[1])
+                int8 = np.lib.format.open_memmap(tmp_dir / "int8.npy", "w+", np.int8, shape)
+                float32 = np.lib.format.open_memmap(
+                    tmp_dir / "float32.npy", "w+", np.float32, shape
+                )
+
+            row_scales = np.abs(vectors).max(axis=1).clip(min=1e-12) / 127
+            int8[row : row + n] = np.round(vectors / row_scales[:, None]).astype(np.int8)
+            float32[row : row + n] = vectors
+            scales[row : row + n] = row_scales
+            ids.extend(result["ids"])
+            for content, metadata in zip(result["documents"], result["metadatas"]):
+                line = json.dumps({"content": content, "metadata": metadata}).encode("utf-8")
+                table.write(line + b"\n")
+                offsets.append(offsets[-1] + len(line) + 1)
+            ranges[f"{ticker}_{section}"] = [row, row + n]
+            row += n
+
+    if int8 is None:  # empty collection
+        np.save(tmp_dir / "int8.npy", np.zeros((0, 0), dtype=np.int8))
+        np.save(tmp_dir / "float32.npy", np.zeros((0, 0), dtype=np.float32))
+    else:
+        int8.flush()
+        float32.flush()
+    id_array = np.array(ids, dtype=str)
+    id_order = np.argsort(id_array)
+    np.save(tmp_dir / "scales.npy", scales[:row])
+    np.save(tmp_dir / "ids.npy", id_array)
+    np.save(tmp_dir / "sorted_ids.npy", id_array[id_order])
+    np.save(tmp_dir / "id_order.npy", id_order)
+    np.save(tmp_dir / "offsets.npy", np.array(offsets, dtype=np.int64))
+    (tmp_dir / "partitions.json").write_text(json.dumps(ranges), encoding="utf-8")
+
+    # Swap directories; open readers keep their memory maps of the old files
+    old_dir = store_dir.with_name(store_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if store_dir.exists():
+        store_dir.rename(old_dir)
+    tmp_dir.rename(store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(
+        "🗜️  Quantized store: %d chunks in %d partitions at %s", row, len(ranges), store_dir
+    )
+    return row
+
+
+class QuantizedStore:
+    """int8 first-pass scan over memory-mapped vectors, re-scored at full precision.
+
+    Nothing is read into memory up front: the OS pages in the int8 rows of the scanned
+    range (a quarter of the float32 size) and the float32 rows of the few candidates.
+    """
+
+    SCAN_BLOCK_ROWS = 65_536  # bounds the float32 temporary of one scan step
+
+    def __init__(self, store_dir: Path, rescore_factor: int = 4):
+        self.store_dir = store_dir
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._version: float | None = None
+
+    def load(self) -> bool:
+        """(Re)opens the memory maps when the store was rebuilt. False if it doesn't exist."""
+        marker = self.store_dir / "partitions.json"
+        if not marker.exists():
+            return False
+        version = marker.stat().st_mtime
+        with self._lock:
+            if version == self._version:
+                return True
+
+            def load(name: str) -> np.ndarray:
+                return np.load(self.store_dir / f"{name}.npy", mmap_mode="r")
+
+            self.int8, self.scales, self.float32 = load("int8"), load("scales"), load("float32")
+            self.ids, self.sorted_ids = load("ids"), load("sorted_ids")
+            self.id_order, self.offsets = load("id_order"), load("offsets")
+            if self._version is not None:
+                self.table.close()
+            self.table = open(self.store_dir / "chunks.jsonl", "rb")
+
+            partitions = json.loads(marker.read_text(encoding="utf-8"))
+            self.ranges = {key: (start, end) for key, (start, end) in partitions.items()}
+            # Partitions are sorted by ticker, so each ticker is one contiguous range too
+            for key, (start, end) in partitions.items():
+                ticker = key.split("_")[0]
+                lo, hi = self.ranges.get(ticker, (start, end))
+                self.ranges[ticker] = (min(lo, start), max(hi, end))
+            self._version = version
+        return True
+
+    def _row_range(self, ticker: str | None, section: str | None) -> tuple[int, int] | None:
+        if not ticker:
+            return 0, len(self.ids)
+        return self.ranges.get(f"{ticker}_{section}" if section else ticker)
+
+    def _hit(self, row: int) -> Hit:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        chunk = json.loads(os.pread(self.table.fileno(), end - start, start))
+        return str(self.ids[row]), chunk
+
+    def search(
+        self, vector: list[float], ticker: str | None, section: str | None, k: int
+    ) -> list[Hit]:
+        if not self.load():
+            logger.warning("Quantized store not found at %s", self.store_dir)
+            return []
+        bounds = self._row_range(ticker, section)
+        if bounds is None or bounds[0] == bounds[1]:
+            return []
+        start, end = bounds
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        # First pass: approximate scores from the int8 rows, block by block
+        approx = np.empty(end - start, dtype=np.float32)
+        for block in range(start, end, self.SCAN_BLOCK_ROWS):
+            stop = min(block + self.SCAN_BLOCK_ROWS, end)
+            approx[block - start : stop - start] = (
+                self.int8[block:stop].astype(np.float32) @ query
+            ) * self.scales[block:stop]
+
+        # Second pass: exact scores for the best candidates, read in row order
+        n_candidates = min(k * self.rescore_factor, end - start)
+        candidates = np.argpartition(-approx, n_candidates - 1)[:n_candidates] + start
+        candidates.sort()
+        exact = self.float32[candidates] @ query
+        best = candidates[np.argsort(-exact)[:k]]
+        return [self._hit(int(row)) for row in best]
+
+    def warm(self) -> None:
+        self.load()
+
+    def get(self, ids: list[str]) -> list[Hit]:
+        if not self.load() or not ids:
+            return []
+        positions = np.searchsorted(self.sorted_ids, ids)
+        hits = []
+        for chunk_id, position in zip(ids, positions):
+            if position < len(self.sorted_ids) and self.sorted_ids[position] == chunk_id:
+                hits.append(self._hit(int(self.id_order[position])))
+        return hits
+
+
+def open_vector_store(backend: str = settings.VECTOR_BACKEND) -> VectorStore:
+    """Opens the store selected by VECTOR_BACKEND."""
+    if backend == "sharded":
+        logger.info("📦 Using sharded vector store at %s", default_shard_dir())
+        max_bytes = settings.SHARD_CACHE_MAX_MB * 1024 * 1024
+        return ShardedStore(default_shard_dir(), max_bytes=max_bytes)
+    if backend == "quantized":
+        logger.info("🗜️  Using quantized vector store at %s", default_quantized_dir())
+        return QuantizedStore(
+            default_quantized_dir(), rescore_factor=settings.QUANTIZED_RESCORE_FACTOR
+        )
+    return ChromaStore(settings.INDEX_DIR)
+
+
+def default_history_dir() -> Path:
+    """The history partition: a Chroma database (and BM25 partitions) of older 10-Ks."""
+    return settings.INDEX_DIR / "history"
+
+
+_store: VectorStore | None = None
+_history_store: ChromaStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """Returns the process-wide store, opening it on first use (or during warm-up)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_vector_store()
+        return _store
+
+
+def get_history_store() -> ChromaStore:
+    """Returns the process-wide history store, opening it on the first historical question."""
+    global _history_store
+    with _store_lock:
+        if _history_store is None:
+            logger.info("🗄️  Opening filing history at %s", default_history_dir())
+            _history_store = ChromaStore(default_history_dir())
+        return _history_store
@@ -0,0 +1,155 @@
+"""Background warm-up of the heavy singletons, plus a readiness probe.
+
+Importing the graph pulls in LangChain, the OpenAI clients, Chroma and the node modules,
+and the vector store loads its index on first use. app.py therefore renders the login
+page first and then starts this warm-up in a daemon thread, so a cold container shows
+something immediately and is usually warm by the time the user has signed in.
+
+The readiness probe listens on READINESS_PORT next to the Streamlit server:
+`GET /ready` returns 200 once every warm-up step succeeded (503 before, with the
+per-step status), `GET /healthz` always returns 200 and `GET /metrics` serves the
+process metrics (services/metrics.py) in the Prometheus text format.
+"""
+
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.metrics import registry
+from utils.config import settings
+from utils.logging import logger
+
+
+def _load_graph() -> None:
+    importlib.import_module("graph.blueprint")  # imports every node and compiles the graph
+
+
+def _load_resolver() -> None:
+    from nodes.extractor import get_resolver
+
+    get_resolver()
+
+
+def _load_embeddings() -> None:
+    from services.embeddings import get_embeddings
+
+    get_embeddings()
+
+
+def _load_vector_store() -> None:
+    from services.filings import get_filing_table
+    from services.vector_store import get_vector_store
+
+    get_vector_store().warm()
+    get_filing_table().filings()
+
+
+def _load_reranker() -> None:
+    if settings.RERANK_ENABLED:
+        from services.rerank import get_ranker
+
+        get_ranker()
+
+
+# Run in order; later steps reuse the modules the graph step imported
+STEPS = (
+    ("graph", _load_graph),
+    ("resolver", _load_resolver),
+    ("embeddings", _load_embeddings),
+    ("vector_store", _load_vector_store),
+    ("reranker", _load_reranker),
+)
+
+
+class WarmupState:
+    """Thread-safe status of each warm-up step: pending, running, ready or failed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps = {name: {"status": "pending", "seconds": None} for name, _ in STEPS}
+
+    def set(self, name: str, status: str, seconds: float | None = None, error: str = "") -> None:
+        with self._lock:
+            self.steps[name] = {"status": status, "seconds": seconds}
+            if error:
+                self.steps[name]["error"] = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            steps = {name: dict(step) for name, step in self.steps.items()}
+        return {"ready": all(s["status"] == "ready" for s in steps.values()), "steps": steps}
+
+
+state = WarmupState()
+_started = False
+_start_lock = threading.Lock()
+
+
+def run_warmup() -> dict:
+    """Runs every step in the calling thread and returns the final snapshot."""
+    for name, step in STEPS:
+        state.set(name, "running")
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:  # keep going: the app still works, just colder
+            state.set(name, "failed", time.perf_counter() - start, error=repr(e))
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            continue
+        elapsed = time.perf_counter() - start
+        state.set(name, "ready", elapsed)
+        logger.info("🔥 Warm-up: %s ready in %.2fs", name, elapsed)
+    return state.snapshot()
+
+
+class _ProbeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, registry.render().encode("utf-8"), "text/plain; version=0.0.4")
+            return
+        if self.path == "/healthz":
+            code, body = 200, {"alive": True}
+        elif self.path == "/ready":
+            body = state.snapshot()
+            code = 200 if body["ready"] else 503
+        else:
+            code, body = 404, {"error": "not found"}
+        self._send(code, json.dumps(body).encode("utf-8"), "application/json")
+
+    def _send(self, code: int, payload: bytes, content_type: str) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # probes hit this every few seconds
+
+
+def start_readiness_server(port: int) -> ThreadingHTTPServer | None:
+    """Serves /ready, /healthz and /metrics from a daemon thread; None if the port is taken."""
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _ProbeHandler)
+    except OSError as e:
+        logger.warning("Readiness probe not started on port %d: %s", port, e)
+        return None
+    threading.Thread(target=server.serve_forever, name="readiness", daemon=True).start()
+    logger.info("🩺 Readiness probe on :%d/ready", port)
+    return server
+
+
+def start_warmup() -> None:
+    """Starts the probe and the warm-up thread once per process; later calls are no-ops."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+
+    if settings.READINESS_PORT:
+        start_readiness_server(settings.READINESS_PORT)
+    if settings.WARMUP_ENABLED:
+        threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
@@ -1,6 +1,7 @@
 """Configuration settings for the application."""
 
 from pathlib import Path
+from typing import Literal
 
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +17,82 @@ class Settings(BaseSettings):
     DATA_DIR: Path = Path("data")
     RAW_DATA_DIR: Path = DATA_DIR / "raw"
     INDEX_DIR: Path = DATA_DIR / "index"
+    CACHE_DIR: Path = DATA_DIR / "cache"
+
+    # Embeddings (shared by scripts/index.py and nodes/search.py)
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_CACHE_PATH: Path = CACHE_DIR / "embeddings.sqlite"
+    EMBEDDING_CACHE_MAX_MB: int = 2048
+    QUERY_EMBEDDING_LRU_SIZE: int = 1024
+    EMBEDDING_CONCURRENCY: int = 4  # embedding requests in flight while indexing
+    EMBEDDING_BATCH_TOKENS: int = 50_000  # approximate tokens per embedding request
+
+    # Local ticker/section resolver (services/resolver.py); below this the extractor asks the LLM
+    RESOLVER_CONFIDENCE: float = 0.85
+
+    # Start extraction + query embedding alongside the supervisor (graph/blueprint.py)
+    SPECULATIVE_EXECUTION: bool = False
+
+    # Answer cache in front of the graph (services/answer_cache.py)
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_SIMILARITY: float = 0.97  # cosine similarity for near-duplicate questions
+
+    # Vector store read by nodes/search.py (services/vector_store.py)
+    VECTOR_BACKEND: Literal["chroma", "sharded", "quantized"] = "chroma"
+    SHARD_CACHE_MAX_MB: int = 512  # loaded per-ticker shards kept in memory
+    QUANTIZED_RESCORE_FACTOR: int = 4  # int8 candidates re-scored in float32, per result
+
+    # Retrieval (nodes/search.py): dense + BM25 candidates fused with reciprocal rank fusion
+    HYBRID_SEARCH: bool = True
+    RETRIEVAL_CANDIDATES: int = 20  # per path, before fusion
+    RETRIEVAL_TOP_K: int = 5  # chunks passed to the reply node
+    RRF_K: int = 60
+
+    # Comparison questions: one parallel search per ticker, merged under one context budget
+    MAX_COMPARE_TICKERS: int = 4
+    MAX_COMPARE_YEARS: int = 3  # fiscal years searched for a question about earlier filings
+    CONTEXT_TOKEN_BUDGET: int = 4000  # ≈16 chunks of 1000 characters; also caps the reply context
+    SECTOR_SHORTLIST_SIZE: int = 4  # companies searched for a sector question
+
+    # Cross-encoder reranking (services/rerank.py): RERANK_CANDIDATES in, RETRIEVAL_TOP_K out
+    RERANK_ENABLED: bool = True
+    RERANK_MODEL: str = "ms-marco-MiniLM-L-12-v2"
+    RERANK_CACHE_DIR: Path = CACHE_DIR / "flashrank"
+    RERANK_CANDIDATES: int = 30
+    RERANK_BATCH_SIZE: int = 10
+    RERANK_LATENCY_BUDGET_MS: float = 150.0
+
+    # Cold start (services/warmup.py): background warm-up after the login page renders
+    WARMUP_ENABLED: bool = True
+    READINESS_PORT: int = 8081  # GET /ready, /healthz; 0 disables the probe
+
+    # Async graph path (services/event_loop.py) and the pooled OpenAI HTTP clients
+    ASYNC_GRAPH: bool = True  # the chat runs app.astream on the shared event loop
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_TIMEOUT_SECONDS: float = 60.0
+
+    # Admission control (services/rate_limit.py): concurrent graph runs and the fair queue
+    ADMISSION_MAX_ACTIVE: int = 8
+    ADMISSION_QUEUE_SIZE: int = 32  # beyond this, questions are rejected with a wait estimate
+    ADMISSION_SESSION_QUOTA: int = 2  # running + queued questions per browser session
+    ADMISSION_MAX_WAIT_SECONDS: float = 120.0
+
+    # Batch question answering (python src/main.py --batch questions.jsonl)
+    BATCH_CONCURRENCY: int = 8
+
+    # Process-wide token buckets per upstream API; 0 disables one
+    CHAT_REQUESTS_PER_SECOND: float = 20.0
+    EMBEDDING_REQUESTS_PER_SECOND: float = 40.0
+
+    # EDGAR ingestion (scripts/ingest_sec.py). SEC allows 10 req/s per client.
+    EDGAR_MAX_WORKERS: int = 4
+    EDGAR_REQUESTS_PER_SECOND: float = 8.0
+    EDGAR_MAX_RETRIES: int = 3
+    CONSTITUENTS_MAX_AGE_HOURS: float = 24.0  # cached S&P 500 list (data/constituents.json)
+    HISTORY_YEARS: int = 3  # earlier 10-Ks kept per company in data/raw/history
 
     # Tell Pydantic to read from the .env file at the root
     model_config = SettingsConfigDict(
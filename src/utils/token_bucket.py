@@ -0,0 +1,46 @@
+"""Thread-safe token bucket used to pace calls to rate-limited upstream APIs."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` permits refill per second, up to `capacity`.
+
+    A single instance can be shared by any number of threads; each caller blocks in
+    `acquire()` until enough permits are available, so the aggregate request rate
+    never exceeds `rate` regardless of how many workers are running.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self, permits: float = 1.0) -> float:
+        """Takes `permits` if available and returns 0, otherwise returns the seconds to wait."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= permits:
+                self._tokens -= permits
+                return 0.0
+            return (permits - self._tokens) / self.rate
+
+    def acquire(self, permits: float = 1.0) -> float:
+        """Blocks until `permits` are available. Returns the total time spent waiting."""
+        if permits > self.capacity:
+            raise ValueError(f"Cannot acquire {permits} permits from a bucket of {self.capacity}")
+        waited = 0.0
+        while (delay := self.try_acquire(permits)) > 0:
+            time.sleep(delay)
+            waited += delay
+        return waited
@@ -0,0 +1,9 @@
+"""Cheap token estimates for budgeting requests and prompts."""
+
+# OpenAI's rule of thumb for English text. Good enough for budgets; never used for billing.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` without loading a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN + 1